@@ -12,6 +12,8 @@ JRDBの基準クラス（4歳1勝クラス = 500万下）を地方競馬のク
 from typing import Dict, Tuple, Optional
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -616,13 +618,150 @@ BABA_CORRECTION = {
 
 
 # ============================
-# 5. ヘルパー関数
+# 5. 基準タイムの参照テーブル（事前コンパイル）
+# ============================
+
+# BASE_TIMES はネストした辞書で、距離の完全一致がなければ最も近い距離を探す必要がある。
+# 指数計算では1頭あたり数回参照するため、読み込み時に一度だけ
+#   - (競馬場, 距離, クラス, タイム種別) の基準タイム配列（クラスのフォールバック解決済み）
+#   - (競馬場, 整数距離) → 最も近い距離の位置 の索引
+# を作り、get_base_time / get_base_times はこれを引く。
+
+# タイム種別
+BASE_TIME_TYPES = ('zenhan_3f', 'kohan_3f')
+
+# クラス別データのキー
+BASE_TIME_CLASSES = ('上位クラス', 'E級', '一般戦')
+
+# 上位クラスとして扱う grade_code（'E' は E級、その他は一般戦）
+UPPER_GRADE_CODES = ('A', 'B', 'C', 'D', 'P', 'Q', 'R', 'S', 'T')
+
+# クラスの位置（BASE_TIME_CLASSES の位置 + grade_code 指定なし）
+_GRADE_UPPER, _GRADE_E, _GRADE_GENERAL, _GRADE_NONE = range(4)
+
+# クラス別でないデータ（{'zenhan_3f': ..., 'kohan_3f': ...}）の位置
+_PLAIN = 3
+
+_base_time_venues = {}         # 競馬場コード → 位置
+_base_time_distances = []      # 競馬場ごとの距離（BASE_TIMES の定義順）
+_base_time_table = None        # (競馬場, 距離, クラス, タイム種別) → 基準タイム（なしは NaN）
+_base_time_table_list = []     # 同じ内容の list（スカラー参照用）
+_nearest_distance_index = None  # (競馬場, 整数距離) → 最も近い距離の位置
+_nearest_distance_index_list = []
+_max_indexed_kyori = 0
+_logged_fallbacks = set()
+
+
+def _default_base_time(time_type: str) -> float:
+    """基準タイムがない場合の値"""
+    return 36.5 if time_type == 'zenhan_3f' else 39.0
+
+
+def _grade_position(grade_code) -> int:
+    """grade_code → クラスの位置"""
+    if not grade_code:
+        return _GRADE_NONE
+    if grade_code == 'E':
+        return _GRADE_E
+    if grade_code in UPPER_GRADE_CODES:
+        return _GRADE_UPPER
+    return _GRADE_GENERAL
+
+
+def _nearest_distance_position(venue: int, kyori) -> int:
+    """最も近い距離の位置（同距離差なら BASE_TIMES の定義順で先のもの）"""
+    distances = _base_time_distances[venue]
+    return min(range(len(distances)), key=lambda i: abs(distances[i] - kyori))
+
+
+def compile_base_times():
+    """
+    BASE_TIMES から参照テーブルを作成（モジュール読み込み時に実行。BASE_TIMES を変更したら再実行）
+
+    クラスのフォールバックは従来の get_base_time と同じ順で解決しておく:
+    指定クラス（grade_code がある場合）→ 一般戦 → E級 → クラス別でないデータ → 既定値
+    """
+    global _base_time_table, _base_time_table_list
+    global _nearest_distance_index, _nearest_distance_index_list, _max_indexed_kyori
+
+    _base_time_venues.clear()
+    _base_time_distances.clear()
+    _logged_fallbacks.clear()
+
+    for keibajo_code, venue_times in BASE_TIMES.items():
+        _base_time_venues[keibajo_code] = len(_base_time_distances)
+        _base_time_distances.append(list(venue_times.keys()))
+
+    max_slots = max((len(distances) for distances in _base_time_distances), default=0)
+
+    # 定義されている値（クラス別 + クラス別でない）
+    raw = np.full((len(_base_time_distances), max(max_slots, 1), 4, len(BASE_TIME_TYPES)), np.nan)
+    for keibajo_code, venue_times in BASE_TIMES.items():
+        venue = _base_time_venues[keibajo_code]
+        for slot, data in enumerate(venue_times.values()):
+            for t, time_type in enumerate(BASE_TIME_TYPES):
+                if any(class_name in data for class_name in BASE_TIME_CLASSES):
+                    for c, class_name in enumerate(BASE_TIME_CLASSES):
+                        if class_name in data and time_type in data[class_name]:
+                            raw[venue, slot, c, t] = data[class_name][time_type]
+                if time_type in data:
+                    raw[venue, slot, _PLAIN, t] = data[time_type]
+
+    # クラスのフォールバックを解決
+    table = np.full(raw.shape, np.nan)
+    for grade in range(4):
+        chain = ([grade] if grade != _GRADE_NONE else []) + [_GRADE_GENERAL, _GRADE_E, _PLAIN]
+        for c in reversed(chain):
+            table[:, :, grade, :] = np.where(np.isnan(raw[:, :, c, :]), table[:, :, grade, :], raw[:, :, c, :])
+
+    # 整数距離 → 最も近い距離の位置（範囲外の距離は両端に丸めても結果は同じ）
+    _max_indexed_kyori = int(max((max(distances) for distances in _base_time_distances if distances), default=0))
+    nearest = np.zeros((len(_base_time_distances), _max_indexed_kyori + 1), dtype=np.int16)
+    kyori_range = np.arange(_max_indexed_kyori + 1)
+    for venue, distances in enumerate(_base_time_distances):
+        if distances:
+            # argmin は同じ差なら先頭（定義順で先）を返す
+            nearest[venue] = np.argmin(np.abs(np.array(distances)[:, None] - kyori_range[None, :]), axis=0)
+
+    _base_time_table = table
+    _base_time_table_list = table.tolist()
+    _nearest_distance_index = nearest
+    _nearest_distance_index_list = nearest.tolist()
+
+
+def _log_fallback(keibajo_code, kyori, slot: int):
+    """距離の完全一致がない場合のログ（同じ競馬場・距離は1回だけ）"""
+    key = (keibajo_code, kyori)
+    if key in _logged_fallbacks:
+        return
+    _logged_fallbacks.add(key)
+    closest_kyori = _base_time_distances[_base_time_venues[keibajo_code]][slot]
+    logger.info(f"{ORGANIZERS.get(keibajo_code, {}).get('name', keibajo_code)}競馬場: 距離{kyori}mの基準タイムなし。{closest_kyori}mを使用")
+
+
+def _log_unknown_venue(keibajo_code):
+    """未対応の競馬場コードのログ（同じ競馬場は1回だけ）"""
+    key = (keibajo_code, None)
+    if key in _logged_fallbacks:
+        return
+    _logged_fallbacks.add(key)
+    logger.warning(f"未対応の競馬場コード: {keibajo_code}、デフォルト値を使用")
+
+
+compile_base_times()
+
+
+# ============================
+# 6. ヘルパー関数
 # ============================
 
 def get_base_time(keibajo_code: str, kyori: int, time_type: str, grade_code: str = None) -> float:
     """
     基準タイムを取得（クラス別対応）
     
+    距離の完全一致がなければ最も近い距離、クラス別データは
+    指定クラス → 一般戦 → E級 の順で探す（compile_base_times() で作成した参照テーブルを使用）。
+    
     Args:
         keibajo_code: 競馬場コード（30-65）
         kyori: 距離（m）
@@ -632,74 +771,86 @@ def get_base_time(keibajo_code: str, kyori: int, time_type: str, grade_code: str
     Returns:
         基準タイム（秒）
     """
-    if keibajo_code not in BASE_TIMES:
-        logger.warning(f"未対応の競馬場コード: {keibajo_code}、デフォルト値を使用")
-        return 36.5 if time_type == 'zenhan_3f' else 39.0
+    venue = _base_time_venues.get(keibajo_code)
+    if venue is None:
+        _log_unknown_venue(keibajo_code)
+        return _default_base_time(time_type)
     
-    venue_times = BASE_TIMES[keibajo_code]
+    if time_type not in BASE_TIME_TYPES:
+        return _default_base_time(time_type)
     
-    # 完全一致
-    if kyori in venue_times:
-        base_time_data = venue_times[kyori]
-        
-        # クラス別データがある場合
-        if isinstance(base_time_data, dict) and any(k in base_time_data for k in ['上位クラス', 'E級', '一般戦']):
-            # grade_code がある場合、クラス名に変換
-            if grade_code:
-                if grade_code == 'E':
-                    class_name = 'E級'
-                elif grade_code in ['A', 'B', 'C', 'D', 'P', 'Q', 'R', 'S', 'T']:
-                    class_name = '上位クラス'
-                else:
-                    class_name = '一般戦'
-                
-                # クラス別データを返す
-                if class_name in base_time_data and time_type in base_time_data[class_name]:
-                    return base_time_data[class_name][time_type]
-            
-            # フォールバック: 一般戦を使用
-            if '一般戦' in base_time_data and time_type in base_time_data['一般戦']:
-                return base_time_data['一般戦'][time_type]
-            
-            # さらにフォールバック: E級を使用
-            if 'E級' in base_time_data and time_type in base_time_data['E級']:
-                return base_time_data['E級'][time_type]
-        
-        # 通常データ（クラス別でない）
-        if time_type in base_time_data:
-            return base_time_data[time_type]
+    if isinstance(kyori, (int, np.integer)) or (isinstance(kyori, float) and kyori.is_integer()):
+        slot = _nearest_distance_index_list[venue][min(max(int(kyori), 0), _max_indexed_kyori)]
+    else:
+        slot = _nearest_distance_position(venue, kyori)
+    if _base_time_distances[venue][slot] != kyori:
+        _log_fallback(keibajo_code, kyori, slot)
     
-    # 最も近い距離を検索
-    closest_kyori = min(venue_times.keys(), key=lambda k: abs(k - kyori))
-    logger.info(f"{ORGANIZERS.get(keibajo_code, {}).get('name', keibajo_code)}競馬場: 距離{kyori}mの基準タイムなし。{closest_kyori}mを使用")
+    value = _base_time_table_list[venue][slot][_grade_position(grade_code)][BASE_TIME_TYPES.index(time_type)]
+    if value != value:  # NaN: 該当データなし
+        return _default_base_time(time_type)
+    return value
+
+
+def get_base_times(keibajo_codes, kyori, time_type: str, grade_codes=None) -> np.ndarray:
+    """
+    基準タイムを配列でまとめて取得（get_base_time の配列版。結果は1件ずつ呼んだ場合と同じ）
     
-    closest_data = venue_times[closest_kyori]
+    Args:
+        keibajo_codes: 競馬場コードの配列
+        kyori: 距離（m）の配列
+        time_type: 'zenhan_3f' or 'kohan_3f'
+        grade_codes: グレードコードの配列（省略時は指定なし）
     
-    # クラス別データの処理（最も近い距離）
-    if isinstance(closest_data, dict) and any(k in closest_data for k in ['上位クラス', 'E級', '一般戦']):
-        if grade_code:
-            if grade_code == 'E':
-                class_name = 'E級'
-            elif grade_code in ['A', 'B', 'C', 'D', 'P', 'Q', 'R', 'S', 'T']:
-                class_name = '上位クラス'
-            else:
-                class_name = '一般戦'
-            
-            if class_name in closest_data and time_type in closest_data[class_name]:
-                return closest_data[class_name][time_type]
-        
-        # フォールバック
-        if '一般戦' in closest_data and time_type in closest_data['一般戦']:
-            return closest_data['一般戦'][time_type]
-        if 'E級' in closest_data and time_type in closest_data['E級']:
-            return closest_data['E級'][time_type]
+    Returns:
+        基準タイム（秒）の配列
+    """
+    keibajo_codes = np.asarray(keibajo_codes)
+    kyori = np.asarray(kyori, dtype=np.float64).reshape(-1)
+    size = len(kyori)
+    default = _default_base_time(time_type)
     
-    # 通常データ
-    if time_type in closest_data:
-        return closest_data[time_type]
+    if time_type not in BASE_TIME_TYPES or size == 0:
+        return np.full(size, default)
     
-    # 最終フォールバック
-    return 36.5 if time_type == 'zenhan_3f' else 39.0
+    # 競馬場コード → 位置（未対応は -1）
+    codes = keibajo_codes.reshape(-1)
+    if codes.dtype.kind == 'U':
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        venues = np.array([_base_time_venues.get(str(code), -1) for code in unique_codes], dtype=np.int64)
+        venues = venues[inverse.reshape(-1)]
+    else:
+        venues = np.array([_base_time_venues.get(code, -1) for code in codes.tolist()], dtype=np.int64)
+    for code in set(codes[venues < 0].tolist()):
+        _log_unknown_venue(code)
+    
+    # クラスの位置
+    if grade_codes is None:
+        grades = np.full(size, _GRADE_NONE, dtype=np.int64)
+    else:
+        grade_codes = np.asarray(grade_codes).reshape(-1)
+        if grade_codes.dtype.kind == 'U':
+            unique_grades, inverse = np.unique(grade_codes, return_inverse=True)
+            grades = np.array([_grade_position(str(grade_code)) for grade_code in unique_grades], dtype=np.int64)
+            grades = grades[inverse.reshape(-1)]
+        else:
+            grades = np.array([_grade_position(grade_code) for grade_code in grade_codes.tolist()], dtype=np.int64)
+    
+    # 最も近い距離の位置（整数距離は索引、それ以外は個別に探す）
+    known = venues >= 0
+    slots = np.zeros(size, dtype=np.int64)
+    integral = known & (kyori == np.trunc(kyori))
+    slots[integral] = _nearest_distance_index[
+        venues[integral],
+        np.clip(kyori[integral], 0, _max_indexed_kyori).astype(np.int64)
+    ]
+    for i in np.flatnonzero(known & ~integral):
+        slots[i] = _nearest_distance_position(venues[i], kyori[i])
+    
+    values = np.full(size, default)
+    values[known] = _base_time_table[venues[known], slots[known], grades[known], BASE_TIME_TYPES.index(time_type)]
+    values[np.isnan(values)] = default
+    return values
 
 
 def get_organizer_info(keibajo_code: str) -> Dict:
@@ -742,7 +893,7 @@ def get_class_hierarchy(keibajo_code: str) -> Dict:
 
 
 # ============================
-# 6. テスト用メイン関数
+# 7. テスト用メイン関数
 # ============================
 
 if __name__ == "__main__":
@@ -1,8 +1,18 @@
 """
 データベース接続設定
+
+接続はプロセス内で共有するコネクションプールから払い出す。
+get_db_connection() で取得した接続は close() でプールに返却される
+（実際の切断は close_connection_pool() 時）。
 """
 
+import os
+import threading
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from psycopg2.extras import RealDictCursor
 
 DB_CONFIG = {
@@ -13,15 +23,213 @@ DB_CONFIG = {
     'dbname': 'pckeiba'
 }
 
+# コネクションプール設定
+POOL_CONFIG = {
+    'minconn': 1,       # プール作成時に接続する数
+    'maxconn': 8,       # 同時に払い出す最大接続数（並列実行時の上限。返却後もこの数まで空き接続を保持）
+    'timeout': 60,      # 空き接続を待つ最大秒数
+}
+
+# 接続ごとに適用するセッション設定（SET name = value）
+SESSION_SETTINGS = {
+    'work_mem': '64MB',               # 集計・ソートをメモリ内で完結させる
+    'application_name': 'nar-ai-yoso',
+}
+
+# オンライン処理（main.py の予想生成）だけに追加するセッション設定
+# キューブ・前走テーブル・インデックスの構築など長時間のバッチ処理には適用しない
+ONLINE_SESSION_SETTINGS = {
+    'statement_timeout': '10min',     # 暴走クエリの打ち切り
+}
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """
+    プール管理下の接続
+
+    払い出し中に close() を呼ぶと切断せずプールへ返却する。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+        self._checked_out = False
+
+    def close(self):
+        pool = self._pool
+        if pool is not None and self._checked_out and not pool.closed:
+            pool.putconn(self)
+        else:
+            super().close()
+
+
+class ConnectionPool(ThreadedConnectionPool):
+    """
+    スレッドセーフなコネクションプール
+
+    - 上限（maxconn）に達した場合は PoolError にせず、空きが出るまで待機する
+    - 返却された接続は maxconn 本まで切断せずに保持する
+    - 新規接続時に session_settings を適用する
+    - 切断済みの接続は払い出し時に破棄して作り直す
+    """
+
+    def __init__(self, minconn, maxconn, timeout=None, session_settings=None, **kwargs):
+        self.timeout = timeout
+        self.session_settings = dict(session_settings or {})
+        self._slots = threading.BoundedSemaphore(int(maxconn))
+        kwargs['connection_factory'] = PooledConnection
+        super().__init__(minconn, maxconn, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        conn._pool = self
+        if self.session_settings:
+            with conn.cursor() as cursor:
+                for name, value in self.session_settings.items():
+                    cursor.execute(f"SET {name} = %s", (value,))
+            conn.commit()
+        return conn
+
+    def getconn(self, key=None):
+        """
+        空き接続を払い出す（上限到達時は timeout 秒まで待機）
+
+        Returns:
+            PooledConnection: データベース接続
+        """
+        if not self._slots.acquire(timeout=self.timeout if self.timeout is not None else -1):
+            raise PoolError(f"{self.timeout}秒待機しても空き接続がありません")
+        try:
+            conn = super().getconn(key)
+            while conn.closed:
+                super().putconn(conn, key, close=True)
+                conn = super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+        conn._checked_out = True
+        return conn
+
+    def putconn(self, conn, key=None, close=False):
+        """
+        接続をプールへ返却
+        """
+        conn._checked_out = False
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+    def _putconn(self, conn, key=None, close=False):
+        # 基底クラスは空き接続が minconn 本以上あると返却された接続を切断するため、
+        # 判定の間だけ minconn を maxconn にして、並列実行中の接続を使い回せるようにする
+        # （putconn() の self._lock 内で呼ばれる）
+        minconn, self.minconn = self.minconn, self.maxconn
+        try:
+            super()._putconn(conn, key, close)
+        finally:
+            self.minconn = minconn
+
+    def closeall(self):
+        """
+        全接続を切断してプールを閉じる
+        """
+        with self._lock:
+            for conn in list(self._used.values()):
+                conn._checked_out = False
+        super().closeall()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_session_settings = dict(SESSION_SETTINGS)
+
+
+def use_online_session_settings():
+    """
+    以降に作成する接続に ONLINE_SESSION_SETTINGS（statement_timeout など）を適用する
+
+    main.py の予想生成で、最初の接続を取得する前に呼ぶ。
+    バッチ処理のスクリプトは呼ばないため、長時間のクエリが打ち切られない。
+    """
+    global _session_settings
+
+    with _pool_lock:
+        _session_settings = {**SESSION_SETTINGS, **ONLINE_SESSION_SETTINGS}
+        if _pool is not None and not _pool.closed and _pool_pid == os.getpid():
+            _pool.session_settings = dict(_session_settings)
+
+
+def get_connection_pool():
+    """
+    プロセス共有のコネクションプールを取得（初回呼び出し時に作成）
+
+    fork した子プロセスでは親の接続を共有できないため、プロセスごとに作り直す。
+
+    Returns:
+        ConnectionPool: コネクションプール
+    """
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool.closed or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                POOL_CONFIG['minconn'],
+                POOL_CONFIG['maxconn'],
+                timeout=POOL_CONFIG['timeout'],
+                session_settings=_session_settings,
+                **DB_CONFIG
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def close_connection_pool():
+    """
+    コネクションプールの全接続を切断
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None and not _pool.closed and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
 
 def get_db_connection():
     """
-    データベース接続を取得
-    
+    データベース接続を取得（プールから払い出し）
+
+    使用後は conn.close() でプールに返却すること。
+
     Returns:
         psycopg2.connection: データベース接続オブジェクト
     """
-    return psycopg2.connect(**DB_CONFIG)
+    return get_connection_pool().getconn()
+
+
+@contextmanager
+def db_connection():
+    """
+    プールから接続を借りて、ブロック終了時に返却するコンテキストマネージャ
+
+    例外発生時は未コミットの変更をロールバックしてから返却する。
+
+    使用例:
+        with db_connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            ...
+    """
+    conn = get_db_connection()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 
 # 接続テスト用関数
@@ -2,8 +2,15 @@
 オッズ別補正係数マスタ
 
 CEOから提供された単勝配当補正係数と複勝配当補正係数を統合
+
+補正表は読み込み時に昇順の境界配列へ変換し、
+スカラー参照は二分探索（bisect）、配列参照は NumPy の searchsorted で行う。
 """
 
+from bisect import bisect_right
+
+import numpy as np
+
 # 単勝配当補正係数（123段階）
 TANSHO_CORRECTION = [
     (0.0, 1.0, 1.00),
@@ -242,10 +249,83 @@ FUKUSHO_CORRECTION = [
 ]
 
 
+def compile_correction_table(correction_table):
+    """
+    補正表を二分探索用の昇順配列に変換
+
+    Args:
+        correction_table: [(from_odds, to_odds, correction), ...]
+
+    Returns:
+        tuple: (下限オッズのリスト, 上限オッズのリスト, 補正係数のリスト)
+    """
+    rows = sorted(correction_table)
+    return (
+        [float(from_odds) for from_odds, _, _ in rows],
+        [float(to_odds) for _, to_odds, _ in rows],
+        [float(correction) for _, _, correction in rows],
+    )
+
+
+# 二分探索用に変換した補正表（単勝・複勝）
+_TANSHO_EDGES = compile_correction_table(TANSHO_CORRECTION)
+_FUKUSHO_EDGES = compile_correction_table(FUKUSHO_CORRECTION)
+
+# NumPy配列版（get_odds_corrections 用）
+_TANSHO_ARRAYS = tuple(np.asarray(values, dtype=np.float64) for values in _TANSHO_EDGES)
+_FUKUSHO_ARRAYS = tuple(np.asarray(values, dtype=np.float64) for values in _FUKUSHO_EDGES)
+
+
 def get_odds_correction(odds, is_fukusho=False):
     """
     オッズから補正係数を取得
     
+    from_odds <= odds < to_odds となる区間を二分探索で引く。
+    
+    Args:
+        odds: オッズ（float）
+        is_fukusho: 複勝の場合True、単勝の場合False
+    
+    Returns:
+        補正係数（float）
+    """
+    from_edges, to_edges, corrections = _FUKUSHO_EDGES if is_fukusho else _TANSHO_EDGES
+    
+    index = bisect_right(from_edges, odds) - 1
+    if index >= 0 and odds < to_edges[index]:
+        return corrections[index]
+    
+    # 該当しない場合は1.0（補正なし）
+    return 1.0
+
+
+def get_odds_corrections(odds, is_fukusho=False):
+    """
+    オッズ配列から補正係数の配列を一括取得（get_odds_correction の NumPy 版）
+    
+    Args:
+        odds: オッズの配列（array-like）
+        is_fukusho: 複勝の場合True、単勝の場合False
+    
+    Returns:
+        np.ndarray: 補正係数（該当区間がない・NaN の要素は1.0）
+    """
+    from_edges, to_edges, corrections = _FUKUSHO_ARRAYS if is_fukusho else _TANSHO_ARRAYS
+    odds = np.asarray(odds, dtype=np.float64)
+    
+    index = np.searchsorted(from_edges, odds, side='right') - 1
+    clipped = np.clip(index, 0, len(from_edges) - 1)
+    matched = (index >= 0) & (odds < to_edges[clipped])
+    
+    return np.where(matched, corrections[clipped], 1.0)
+
+
+def get_odds_correction_linear(odds, is_fukusho=False):
+    """
+    オッズから補正係数を取得（補正表を先頭から走査する旧実装）
+    
+    get_odds_correction / get_odds_corrections の検証・性能比較用。
+    
     Args:
         odds: オッズ（float）
         is_fukusho: 複勝の場合True、単勝の場合False
@@ -263,6 +343,20 @@ def get_odds_correction(odds, is_fukusho=False):
     return 1.0
 
 
+def get_odds_correction_factor(odds, bet_type='win'):
+    """
+    券種名を指定してオッズ補正係数を取得
+    
+    Args:
+        odds: オッズ（float）
+        bet_type: 'win'（単勝）または 'place'（複勝）
+    
+    Returns:
+        補正係数（float）
+    """
+    return get_odds_correction(odds, is_fukusho=(bet_type == 'place'))
+
+
 # 期間別重み係数（2016-2025の10年分）
 YEAR_WEIGHTS = {
     '2016': 1,
@@ -22,6 +22,14 @@ from config.odds_correction import (
     YEAR_WEIGHTS,
     TARGET_PAYOUT
 )
+from core.corrected_return_sql import build_correction_ctes, build_correction_join_sql
+from core.prepared_statements import execute_prepared
+from core.prev_race_table import (
+    PREV_RACE_ALIAS,
+    build_prev_race_join_sql,
+    is_prev_race_table_available,
+    uses_prev_race
+)
 
 
 def safe_float(value, default=0.0):
@@ -44,18 +52,81 @@ def safe_int(value, default=0):
         return default
 
 
-def build_factor_sql_condition(factor_name, factor_value):
+def safe_float_sql(expression):
+    """safe_float() のSQL版（数値として解釈できない値は0）"""
+    return (
+        f"CASE WHEN {expression}::text ~ '^\\s*[-+]?([0-9]+\\.?[0-9]*|\\.[0-9]+)\\s*$' "
+        f"THEN {expression}::text::float8 ELSE 0 END"
+    )
+
+
+def safe_int_sql(expression):
+    """safe_int() のSQL版（整数として解釈できない値は0）"""
+    return (
+        f"CASE WHEN {expression}::text ~ '^\\s*[-+]?[0-9]+\\s*$' "
+        f"THEN {expression}::text::integer ELSE 0 END"
+    )
+
+
+def code_variants(value):
+    """
+    着順・人気などの2桁コードを、ゼロ埋めあり・なしの両方の表記で返す
+    （例: 3 → ['3', '03']。前走テーブルは nvd_se の値をそのまま保持しているため）
+    """
+    number = safe_int(value)
+    return sorted({str(number), f"{number:02d}"})
+
+
+def prev_race_condition(column, value, missing_value=0):
+    """
+    前走テーブル（別名 pr）の1列の条件を生成
+    
+    factor_extractor は前走のない馬（初出走）に 0（馬場は '不明'）を返すが、
+    nar_prev_race は LEFT JOIN のため初出走の出走は pr.<列> が NULL になる。
+    missing_value と同じ値は IS NULL も含めて絞り込む。
+    着順・人気（prev_chakujun / prev_ninkijun）はゼロ埋めの有無を問わず一致させる。
+    
+    Args:
+        column: nar_prev_race の列名
+        value: ファクター値
+        missing_value: 前走がないときに factor_extractor が返す値
+    
+    Returns:
+        tuple: (WHERE条件文字列, パラメータリスト)
+    """
+    expression = f"{PREV_RACE_ALIAS}.{column}"
+    
+    if column in ('prev_chakujun', 'prev_ninkijun'):
+        condition, params = f"{expression} = ANY(%s)", [code_variants(value)]
+        is_missing = safe_int(value) == missing_value
+    elif column == 'prev_baba':
+        is_missing = str(value) == str(missing_value)
+        condition, params = f"{expression} = %s", ['' if is_missing else value]
+    else:
+        condition, params = f"{expression} = %s", [str(safe_int(value))]
+        is_missing = safe_int(value) == missing_value
+    
+    if is_missing:
+        condition = f"({expression} IS NULL OR {condition})"
+    return condition, params
+
+
+def build_factor_sql_condition(factor_name, factor_value, use_prev_race=True):
     """
     ファクター名と値からSQL WHERE条件を生成
     
+    前走系ファクター（F09〜F13, C12〜C14）は前走テーブル nar_prev_race（別名 pr）の
+    列で絞り込む（初出走の値は prev_race_condition を参照）。
+    use_prev_race=False（前走テーブル未構築）の場合は条件なし。
+    
     Args:
         factor_name: ファクター名（例: 'F01_kishu', 'C01_kishu_kyori'）
         factor_value: ファクター値（例: '05658', '05658_1300'）
+        use_prev_race: 前走テーブルで前走系ファクターを絞り込むか
     
     Returns:
         tuple: (WHERE条件文字列, パラメータリスト)
     """
-    
     # 単独ファクター
     if factor_name == 'F01_kishu':
         return "se.kishu_code = %s", [factor_value]
@@ -83,25 +154,30 @@ def build_factor_sql_condition(factor_name, factor_value):
     elif factor_name == 'F08_wakuban':
         return "se.wakuban = %s", [safe_int(factor_value)]
     
-    elif factor_name == 'F09_prev_chakujun':
-        # 前走着順（前走データの取得が必要、簡易実装: スキップ）
+    elif factor_name in ('F09_prev_chakujun', 'F10_prev_ninki', 'F11_prev_kyori',
+                         'F12_prev_baba', 'F13_kyuyo_weeks') and not use_prev_race:
+        # 前走テーブル未構築: スキップ
         return "1=1", []
     
+    elif factor_name == 'F09_prev_chakujun':
+        # 前走着順
+        return prev_race_condition('prev_chakujun', factor_value)
+    
     elif factor_name == 'F10_prev_ninki':
-        # 前走人気（前走データの取得が必要、簡易実装: スキップ）
-        return "1=1", []
+        # 前走人気
+        return prev_race_condition('prev_ninkijun', factor_value)
     
     elif factor_name == 'F11_prev_kyori':
-        # 前走距離（前走データの取得が必要、簡易実装: スキップ）
-        return "1=1", []
+        # 前走距離
+        return prev_race_condition('prev_kyori', factor_value)
     
     elif factor_name == 'F12_prev_baba':
-        # 前走馬場（前走データの取得が必要、簡易実装: スキップ）
-        return "1=1", []
+        # 前走馬場
+        return prev_race_condition('prev_baba', factor_value, missing_value='不明')
     
     elif factor_name == 'F13_kyuyo_weeks':
-        # 休養週数（前走データの取得が必要、簡易実装: スキップ）
-        return "1=1", []
+        # 休養週数
+        return prev_race_condition('kyuyo_weeks', factor_value)
     
     elif factor_name == 'F14_bataiju':
         # 馬体重（範囲検索が必要、簡易実装: 完全一致）
@@ -160,10 +236,28 @@ def build_factor_sql_condition(factor_name, factor_value):
             # 枠番×距離
             return "se.wakuban = %s AND ra.kyori = %s", [safe_int(parts[0]), safe_int(parts[1])]
         
-        elif factor_name in ['C12_prev_chakujun_kyuyo', 'C13_prev_ninki_chakujun', 'C14_zogen_kyuyo']:
-            # 前走系（スキップ）
+        elif factor_name in ['C12_prev_chakujun_kyuyo', 'C13_prev_ninki_chakujun', 'C14_zogen_kyuyo'] \
+                and not use_prev_race:
+            # 前走系（前走テーブル未構築: スキップ）
             return "1=1", []
         
+        elif factor_name == 'C12_prev_chakujun_kyuyo':
+            # 前走着順×休養週数
+            chakujun_condition, chakujun_params = prev_race_condition('prev_chakujun', parts[0])
+            kyuyo_condition, kyuyo_params = prev_race_condition('kyuyo_weeks', parts[1])
+            return f"{chakujun_condition} AND {kyuyo_condition}", chakujun_params + kyuyo_params
+        
+        elif factor_name == 'C13_prev_ninki_chakujun':
+            # 前走人気×前走着順
+            ninki_condition, ninki_params = prev_race_condition('prev_ninkijun', parts[0])
+            chakujun_condition, chakujun_params = prev_race_condition('prev_chakujun', parts[1])
+            return f"{ninki_condition} AND {chakujun_condition}", ninki_params + chakujun_params
+        
+        elif factor_name == 'C14_zogen_kyuyo':
+            # 馬体重増減×休養週数
+            kyuyo_condition, kyuyo_params = prev_race_condition('kyuyo_weeks', parts[1])
+            return f"se.zogen_sa = %s AND {kyuyo_condition}", [safe_int(parts[0])] + kyuyo_params
+        
         elif factor_name == 'C15_seibetsu_kyori':
             # 性別×距離
             return "se.seibetsu_code = %s AND ra.kyori = %s", [parts[0], safe_int(parts[1])]
@@ -199,49 +293,87 @@ def calculate_factor_corrected_return_rate(conn, keibajo_code, factor_name, fact
     """
     
     # SQL WHERE条件を生成
-    where_condition, params = build_factor_sql_condition(factor_name, factor_value)
+    where_condition, params = build_factor_sql_condition(
+        factor_name, factor_value, use_prev_race=is_prev_race_table_available(conn)
+    )
+    prev_race_join = build_prev_race_join_sql('se') if uses_prev_race(where_condition) else ""
+    
+    # 年度重み・オッズ補正の参照テーブル（集計はSQL側で実行）
+    ctes, cte_params = build_correction_ctes()
     
-    # 過去データ取得クエリ（2016-2025年）
+    # 過去データ集計クエリ（2016-2025年）
     query = f"""
-    SELECT 
-        se.kaisai_nen,
-        se.tansho_odds,
-        se.fukusho_odds,
-        se.kakutei_chakujun,
-        se.tansho_haito,
-        se.fukusho_haito
-    FROM nvd_se se
-    JOIN nvd_ra ra ON (
-        se.kaisai_nen = ra.kaisai_nen 
-        AND se.kaisai_tsukihi = ra.kaisai_tsukihi
-        AND se.keibajo_code = ra.keibajo_code
-        AND se.race_bango = ra.race_bango
+    WITH {ctes},
+    runs AS (
+        SELECT 
+            COALESCE(yw.weight, 0) as weight,
+            {safe_float_sql('se.tansho_odds')} as tansho_odds,
+            {safe_float_sql('se.fukusho_odds')} as fukusho_odds,
+            {safe_int_sql('se.kakutei_chakujun')} as chakujun,
+            {safe_float_sql('se.tansho_haito')} as tansho_haito,
+            {safe_float_sql('se.fukusho_haito')} as fukusho_haito
+        FROM nvd_se se
+        JOIN nvd_ra ra ON (
+            se.kaisai_nen = ra.kaisai_nen 
+            AND se.kaisai_tsukihi = ra.kaisai_tsukihi
+            AND se.keibajo_code = ra.keibajo_code
+            AND se.race_bango = ra.race_bango
+        )
+        {prev_race_join}
+        LEFT JOIN year_weights yw ON yw.year = se.kaisai_nen
+        WHERE se.keibajo_code = %s
+        AND se.kaisai_nen >= '2016' AND se.kaisai_nen <= '2025'
+        AND se.kakutei_chakujun IS NOT NULL
+        AND se.tansho_odds IS NOT NULL
+        AND {where_condition}
+    ),
+    weighted AS (
+        SELECT * FROM runs WHERE weight <> 0
     )
-    WHERE se.keibajo_code = %s
-    AND se.kaisai_nen >= '2016' AND se.kaisai_nen <= '2025'
-    AND se.kakutei_chakujun IS NOT NULL
-    AND se.tansho_odds IS NOT NULL
-    AND {where_condition}
-    ORDER BY se.kaisai_nen, se.kaisai_tsukihi
+    SELECT
+        -- 単勝
+        COUNT(*) FILTER (WHERE w.tansho_odds > 0) as win_total_count,
+        COUNT(*) FILTER (WHERE w.tansho_odds > 0 AND w.chakujun = 1 AND w.tansho_haito > 0)
+            as win_hit_count,
+        COALESCE(SUM(%s::float8 / w.tansho_odds * w.weight) FILTER (WHERE w.tansho_odds > 0), 0)
+            as total_win_weighted_bet,
+        COALESCE(SUM(w.tansho_haito * COALESCE(tc.correction, 1.0) * w.weight)
+            FILTER (WHERE w.tansho_odds > 0 AND w.chakujun = 1 AND w.tansho_haito > 0), 0)
+            as total_win_weighted_payout,
+        -- 複勝
+        COUNT(*) FILTER (WHERE w.fukusho_odds > 0) as place_total_count,
+        COUNT(*) FILTER (WHERE w.fukusho_odds > 0 AND w.chakujun IN (1, 2, 3) AND w.fukusho_haito > 0)
+            as place_hit_count,
+        COALESCE(SUM(%s::float8 / w.fukusho_odds * w.weight) FILTER (WHERE w.fukusho_odds > 0), 0)
+            as total_place_weighted_bet,
+        COALESCE(SUM(w.fukusho_haito * COALESCE(fc.correction, 1.0) * w.weight)
+            FILTER (WHERE w.fukusho_odds > 0 AND w.chakujun IN (1, 2, 3) AND w.fukusho_haito > 0), 0)
+            as total_place_weighted_payout
+    FROM weighted w
+    {build_correction_join_sql('tansho', 'w.tansho_odds', 'tc')}
+    {build_correction_join_sql('fukusho', 'w.fukusho_odds', 'fc')}
     """
     
-    cur = conn.cursor()
-    cur.execute(query, [keibajo_code] + params)
-    rows = cur.fetchall()
+    target = float(TARGET_PAYOUT)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    execute_prepared(cur, 'factor_return_v1', query, cte_params + [keibajo_code] + params + [target, target])
+    totals = cur.fetchone()
     cur.close()
     
-    if not rows or len(rows) == 0:
-        # データがない場合はデフォルト値を返す
-        return {
-            'rate_win_hit': 0.0,
-            'rate_place_hit': 0.0,
-            'adj_win_ret': 0.0,
-            'adj_place_ret': 0.0,
-            'cnt_win': 0,
-            'cnt_place': 0,
-            'total_count': 0
-        }
+    return build_factor_return_rate_result(**totals)
+
+
+def summarize_factor_return_rows(rows):
+    """
+    出走行から補正回収率を計算（Python版。SQL集計の検証用リファレンス）
+    
+    Args:
+        rows: (kaisai_nen, tansho_odds, fukusho_odds, kakutei_chakujun,
+               tansho_haito, fukusho_haito) のタプルのリスト
     
+    Returns:
+        dict: calculate_factor_corrected_return_rate() と同じ形式
+    """
     # 単勝・複勝の補正回収率を計算
     total_win_weighted_payout = 0.0
     total_win_weighted_bet = 0.0
@@ -298,6 +430,22 @@ def calculate_factor_corrected_return_rate(conn, keibajo_code, factor_name, fact
                 weighted_payout = corrected_payout * weight
                 total_place_weighted_payout += weighted_payout
     
+    return build_factor_return_rate_result(
+        win_total_count, win_hit_count, total_win_weighted_bet, total_win_weighted_payout,
+        place_total_count, place_hit_count, total_place_weighted_bet, total_place_weighted_payout
+    )
+
+
+def build_factor_return_rate_result(win_total_count, win_hit_count,
+                                    total_win_weighted_bet, total_win_weighted_payout,
+                                    place_total_count, place_hit_count,
+                                    total_place_weighted_bet, total_place_weighted_payout):
+    """
+    集計値から的中率・補正回収率を算出
+    
+    Returns:
+        dict: calculate_factor_corrected_return_rate() と同じ形式
+    """
     # 補正回収率を計算
     adj_win_ret = 0.0
     if total_win_weighted_bet > 0:
@@ -329,19 +477,11 @@ def calculate_factor_corrected_return_rate(conn, keibajo_code, factor_name, fact
 
 # テスト用
 if __name__ == '__main__':
-    import psycopg2
-    
-    DB_CONFIG = {
-        'host': 'localhost',
-        'port': 5432,
-        'user': 'postgres',
-        'password': 'keiba2025',
-        'dbname': 'pckeiba'
-    }
+    from config.db_config import get_db_connection
     
     try:
         print("🔌 データベース接続中...")
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_db_connection()
         
         print("\n" + "="*80)
         print("📊 Step 2: 補正回収率計算テスト")
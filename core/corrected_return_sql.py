@@ -0,0 +1,156 @@
+"""
+補正回収率のSQL集計モジュール
+
+年度重み（YEAR_WEIGHTS）とオッズ補正係数（TANSHO_CORRECTION / FUKUSHO_CORRECTION）を
+SQLの参照テーブル（CTE）として渡し、重み付け・補正・合計をサーバー側で行う。
+Python側へは集計結果の1行（またはグループごとの1行）だけが返る。
+
+参照テーブルは config/odds_correction.py の定義から毎回生成するため、
+補正係数・年度重みを変更してもDB側の更新は不要。
+"""
+
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.odds_correction import (
+    TANSHO_CORRECTION,
+    FUKUSHO_CORRECTION,
+    YEAR_WEIGHTS,
+    TARGET_PAYOUT
+)
+
+
+def build_correction_ctes():
+    """
+    年度重み・オッズ補正係数の参照テーブル（WITH句の要素）を生成
+
+    生成されるCTE:
+        year_weights(year, weight)
+        correction_edges(tansho, fukusho): 各補正表の下限オッズ配列（昇順）
+        tansho_correction(from_odds, to_odds, correction, bin)
+        fukusho_correction(from_odds, to_odds, correction, bin)
+
+    bin は下限オッズ配列に対する width_bucket() の値と一致するため、
+    範囲結合を bin の等価結合（ハッシュ結合）で行える（build_correction_join_sql）。
+
+    Returns:
+        tuple: (CTE文字列, パラメータリスト)
+    """
+    sql = """
+    year_weights AS (
+        SELECT * FROM unnest(%s::text[], %s::float8[]) AS t(year, weight)
+    ),
+    correction_edges AS (
+        SELECT %s::float8[] AS tansho, %s::float8[] AS fukusho
+    ),
+    tansho_correction AS (
+        SELECT * FROM unnest(%s::float8[], %s::float8[], %s::float8[])
+            WITH ORDINALITY AS t(from_odds, to_odds, correction, bin)
+    ),
+    fukusho_correction AS (
+        SELECT * FROM unnest(%s::float8[], %s::float8[], %s::float8[])
+            WITH ORDINALITY AS t(from_odds, to_odds, correction, bin)
+    )"""
+
+    tansho = sorted(TANSHO_CORRECTION)
+    fukusho = sorted(FUKUSHO_CORRECTION)
+
+    params = [
+        list(YEAR_WEIGHTS.keys()),
+        [float(weight) for weight in YEAR_WEIGHTS.values()],
+        [float(from_odds) for from_odds, _, _ in tansho],
+        [float(from_odds) for from_odds, _, _ in fukusho],
+    ]
+    for table in (tansho, fukusho):
+        params += [
+            [float(from_odds) for from_odds, _, _ in table],
+            [float(to_odds) for _, to_odds, _ in table],
+            [float(correction) for _, _, correction in table],
+        ]
+
+    return sql, params
+
+
+def build_correction_join_sql(table, odds_expression, alias):
+    """
+    オッズ補正表への範囲結合（LEFT JOIN）を生成
+
+    from_odds <= オッズ < to_odds の区間を引く。該当区間がない場合、
+    alias.correction は NULL になる（呼び出し側で COALESCE(..., 1.0) とする）。
+
+    Args:
+        table: 'tansho' または 'fukusho'
+        odds_expression: オッズのSQL式
+        alias: 結合する補正表の別名
+
+    Returns:
+        str: LEFT JOIN 句
+    """
+    return f"""
+    LEFT JOIN {table}_correction {alias}
+        ON {alias}.bin = width_bucket({odds_expression}, (SELECT {table} FROM correction_edges))
+        AND {odds_expression} >= {alias}.from_odds
+        AND {odds_expression} < {alias}.to_odds"""
+
+
+def float_sql(expression, default):
+    """
+    文字列列を float8 に変換するSQL式（NULL・空文字は default）
+
+    Args:
+        expression: 列（例: 'se.tansho_odds'）
+        default: NULL・空文字のときの値（SQLリテラル文字列）
+    """
+    return (
+        f"CASE WHEN NULLIF({expression}::text, '') IS NULL THEN {default} "
+        f"ELSE {expression}::text::float8 END"
+    )
+
+
+def int_sql(expression, default):
+    """
+    文字列列を integer に変換するSQL式（NULL・空文字は default）
+    """
+    return (
+        f"CASE WHEN NULLIF({expression}::text, '') IS NULL THEN {default} "
+        f"ELSE {expression}::text::integer END"
+    )
+
+
+def build_run_payouts_sql(source):
+    """
+    1出走ごとのベット額・補正後払戻金を付与するSELECT文を生成
+    （factor_stats_calculator.calculate_row_payouts の SQL 版）
+
+    source は year, odds（単勝オッズ）, finish（確定着順）列を持つこと。
+
+    付与される列:
+        weight: 年度重み（YEAR_WEIGHTS にない年は0）
+        bet_amount: TARGET_PAYOUT / 単勝オッズ（オッズ0以下は0）
+        win_payout: 1着なら TARGET_PAYOUT × 単勝補正係数
+        place_payout: 3着以内なら TARGET_PAYOUT × 0.4 × 複勝補正係数（単勝オッズ×0.4で参照）
+
+    Args:
+        source: 元になるテーブル・CTE名
+
+    Returns:
+        str: SELECT文
+    """
+    target = float(TARGET_PAYOUT)
+    return f"""
+    SELECT
+        r.*,
+        COALESCE(yw.weight, 0) AS weight,
+        CASE WHEN r.odds > 0 THEN {target!r}::float8 / r.odds ELSE 0 END AS bet_amount,
+        CASE WHEN r.finish = 1
+             THEN {target!r}::float8 * COALESCE(tc.correction, 1.0) ELSE 0 END AS win_payout,
+        CASE WHEN r.finish <= 3
+             THEN {target!r}::float8 * 0.4::float8 * COALESCE(fc.correction, 1.0) ELSE 0 END AS place_payout
+    FROM {source} r
+    LEFT JOIN year_weights yw ON yw.year = r.year
+    {build_correction_join_sql('tansho', 'r.odds', 'tc')}
+    {build_correction_join_sql('fukusho', 'r.odds * 0.4::float8', 'fc')}
+    """
@@ -9,6 +9,38 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime, timedelta
 
+from core.sql_conditions import build_date_sql_condition
+
+
+# 前走データとしてマージされるキー（前走なしの場合は None で埋める）
+PREV_RACE_KEYS = (
+    'prev_chakujun',
+    'prev_corner_1',
+    'prev_corner_2',
+    'prev_corner_3',
+    'prev_corner_4',
+    'prev_soha_time',
+    'prev_time_sa',
+    'prev_kohan_3f',
+    'prev_wakuban',
+    'prev_ninkijun',
+    'prev_keibajo_code',
+    'prev_race_date',
+)
+
+# 3代血統データのキー（B15〜B20）
+BLOODLINE_KEYS = (
+    'f_blood_no',
+    'm_blood_no',
+    'ff_blood_no',
+    'fm_blood_no',
+    'mf_blood_no',
+    'mm_blood_no',
+)
+
+# プロセス内の血統マップ {血統登録番号: (父ID, 母ID, 母父ID) または None}
+_PEDIGREE_MAP = {}
+
 
 def get_tomorrow_date():
     """
@@ -32,7 +64,9 @@ def get_tomorrow_races(conn, target_date=None):
     if target_date is None:
         target_date = get_tomorrow_date()
     
-    query = """
+    date_condition, date_params = build_date_sql_condition(None, '=', target_date)
+    
+    query = f"""
     SELECT 
         keibajo_code,
         race_bango,
@@ -51,13 +85,13 @@ def get_tomorrow_races(conn, target_date=None):
         kaisai_nen,
         kaisai_tsukihi
     FROM nvd_se
-    WHERE kaisai_nen || kaisai_tsukihi = %s
+    WHERE {date_condition}
       AND keibajo_code != '61'
     ORDER BY keibajo_code, race_bango, umaban
     """
     
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(query, (target_date,))
+        cur.execute(query, date_params)
         results = cur.fetchall()
     
     print(f"✅ 明日のレースデータ取得: {len(results)}頭")
@@ -77,7 +111,9 @@ def get_previous_race_by_id(conn, ketto_toroku_bango, keibajo_code, current_date
     Returns:
         dict: 前走データ（なければNone）
     """
-    query = """
+    date_condition, date_params = build_date_sql_condition('se', '<', current_date)
+    
+    query = f"""
     SELECT 
         kakutei_chakujun as prev_chakujun,
         corner_1 as prev_corner_1,
@@ -103,13 +139,13 @@ def get_previous_race_by_id(conn, ketto_toroku_bango, keibajo_code, current_date
         se.keibajo_code != '61' AND
         se.kakutei_chakujun IS NOT NULL AND
         se.kakutei_chakujun != '' AND
-        se.kaisai_nen || se.kaisai_tsukihi < %s
+        {date_condition}
     ORDER BY se.kaisai_nen DESC, se.kaisai_tsukihi DESC
     LIMIT 1
     """
     
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(query, (ketto_toroku_bango, keibajo_code, current_date))
+        cur.execute(query, [ketto_toroku_bango, keibajo_code] + date_params)
         result = cur.fetchone()
     
     return result
@@ -128,7 +164,9 @@ def get_race_info(conn, keibajo_code, kaisai_date, race_bango):
     Returns:
         dict: レース情報
     """
-    query = """
+    date_condition, date_params = build_date_sql_condition(None, '=', kaisai_date)
+    
+    query = f"""
     SELECT 
         kyori,
         track_code,
@@ -141,17 +179,56 @@ def get_race_info(conn, keibajo_code, kaisai_date, race_bango):
     FROM nvd_ra
     WHERE 
         keibajo_code = %s AND
-        kaisai_nen || kaisai_tsukihi = %s AND
+        {date_condition} AND
         race_bango = %s
     """
     
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(query, (keibajo_code, kaisai_date, race_bango))
+        cur.execute(query, [keibajo_code] + date_params + [race_bango])
         result = cur.fetchone()
     
     return result
 
 
+def get_race_infos_by_date(conn, target_date):
+    """
+    指定日付の全レース情報を1クエリで取得（nvd_ra から）
+
+    レースごとに get_race_info を呼ぶ代わりに、開催日の nvd_ra 全行を
+    kaisai_nen / kaisai_tsukihi の等価条件（インデックス利用可）で一括取得する。
+    get_race_info と同じキー（baba_jotai_code・joken_code）でも参照できるよう、
+    nvd_ra の列名（babajotai_code_dirt・kyoso_joken_code）を別名でも返す
+    （HQS計算・予想テキスト生成はこれらのキーでレース情報を参照する）。
+
+    Args:
+        conn: データベース接続
+        target_date: 対象日付（YYYYMMDD形式）
+
+    Returns:
+        dict: {(keibajo_code, race_bango): レース情報}
+    """
+    date_condition, date_params = build_date_sql_condition(None, '=', target_date)
+
+    query = f"""
+    SELECT
+        *,
+        babajotai_code_dirt AS baba_jotai_code,
+        kyoso_joken_code AS joken_code
+    FROM nvd_ra
+    WHERE {date_condition}
+    ORDER BY keibajo_code, race_bango
+    """
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(query, date_params)
+        results = cur.fetchall()
+
+    return {
+        (row['keibajo_code'], row['race_bango']): dict(row)
+        for row in results
+    }
+
+
 def get_races_by_date(conn, target_date):
     """
     指定日付のレース一覧を取得（レース単位）
@@ -163,19 +240,21 @@ def get_races_by_date(conn, target_date):
     Returns:
         list: レース情報のリスト
     """
-    query = """
+    date_condition, date_params = build_date_sql_condition(None, '=', target_date)
+    
+    query = f"""
     SELECT DISTINCT
         keibajo_code,
         race_bango,
         kaisai_nen || kaisai_tsukihi as kaisai_date
     FROM nvd_se
-    WHERE kaisai_nen || kaisai_tsukihi = %s
+    WHERE {date_condition}
       AND keibajo_code != '61'
     ORDER BY keibajo_code, race_bango
     """
     
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(query, (target_date,))
+        cur.execute(query, date_params)
         results = cur.fetchall()
     
     print(f"✅ 対象レース数: {len(results)}レース")
@@ -235,6 +314,121 @@ def enrich_horse_data_with_prev_race(conn, horses_data, current_date):
     return enriched_data
 
 
+def get_previous_races_by_ids(conn, horses_data, current_date):
+    """
+    出走表全馬の前走データを1クエリで一括取得
+
+    get_previous_race_by_id と同じ条件（同一競馬場・着順確定済み・今走より前の最新走）を
+    (血統登録番号, 競馬場コード) の配列に対する LATERAL JOIN で一度に解決する。
+
+    Args:
+        conn: データベース接続
+        horses_data: 出走馬データのリスト（ketto_toroku_bango, keibajo_code を含む）
+        current_date: 今走の日付（YYYYMMDD形式）
+
+    Returns:
+        dict: {(ketto_toroku_bango, keibajo_code): 前走データ}（前走なしの馬は含まない）
+    """
+    keys = sorted({
+        (horse['ketto_toroku_bango'], horse['keibajo_code'])
+        for horse in horses_data
+        if horse.get('ketto_toroku_bango')
+    })
+
+    if not keys:
+        return {}
+
+    date_condition, date_params = build_date_sql_condition('se', '<', current_date)
+
+    query = f"""
+    SELECT
+        t.ketto_toroku_bango as target_ketto_toroku_bango,
+        t.keibajo_code as target_keibajo_code,
+        prev.*
+    FROM unnest(%s::text[], %s::text[]) AS t(ketto_toroku_bango, keibajo_code)
+    CROSS JOIN LATERAL (
+        SELECT
+            se.kakutei_chakujun as prev_chakujun,
+            se.corner_1 as prev_corner_1,
+            se.corner_2 as prev_corner_2,
+            se.corner_3 as prev_corner_3,
+            se.corner_4 as prev_corner_4,
+            se.soha_time as prev_soha_time,
+            se.time_sa as prev_time_sa,
+            se.kohan_3f as prev_kohan_3f,
+            se.wakuban as prev_wakuban,
+            se.tansho_ninkijun as prev_ninkijun,
+            se.keibajo_code as prev_keibajo_code,
+            se.kaisai_nen || se.kaisai_tsukihi as prev_race_date
+        FROM nvd_se se
+        WHERE
+            se.ketto_toroku_bango = t.ketto_toroku_bango AND
+            se.keibajo_code = t.keibajo_code AND
+            se.keibajo_code != '61' AND
+            se.kakutei_chakujun IS NOT NULL AND
+            se.kakutei_chakujun != '' AND
+            {date_condition}
+        ORDER BY se.kaisai_nen DESC, se.kaisai_tsukihi DESC
+        LIMIT 1
+    ) prev
+    """
+
+    ketto_list = [key[0] for key in keys]
+    keibajo_list = [key[1] for key in keys]
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(query, [ketto_list, keibajo_list] + date_params)
+        rows = cur.fetchall()
+
+    prev_races = {}
+    for row in rows:
+        row = dict(row)
+        key = (row.pop('target_ketto_toroku_bango'), row.pop('target_keibajo_code'))
+        prev_races[key] = row
+
+    return prev_races
+
+
+def enrich_horse_data_with_prev_race_batch(conn, horses_data, current_date):
+    """
+    出走馬データに前走データを追加（一括取得版）
+
+    enrich_horse_data_with_prev_race と同じ prev_* キーを付与するが、
+    馬ごとのクエリではなく get_previous_races_by_ids の1クエリで前走を解決する。
+
+    Args:
+        conn: データベース接続
+        horses_data: 出走馬データのリスト
+        current_date: 今走の日付（YYYYMMDD形式）
+
+    Returns:
+        list: 前走データが追加された出走馬データ
+    """
+    prev_races = get_previous_races_by_ids(conn, horses_data, current_date)
+
+    enriched_data = []
+    prev_race_found = 0
+    prev_race_not_found = 0
+
+    for horse in horses_data:
+        prev_race = prev_races.get((horse.get('ketto_toroku_bango'), horse.get('keibajo_code')))
+
+        if prev_race:
+            # 前走データをマージ
+            enriched_data.append({**horse, **prev_race})
+            prev_race_found += 1
+        else:
+            # 前走データなし（新馬など）
+            horse.update(dict.fromkeys(PREV_RACE_KEYS))
+            enriched_data.append(horse)
+            prev_race_not_found += 1
+
+    print(f"  前走データあり: {prev_race_found}頭")
+    print(f"  前走データなし: {prev_race_not_found}頭")
+
+    return enriched_data
+
+
 def get_bloodline_data(conn, ketto_toroku_bango):
     """
     血統データを取得（nvd_um テーブルから）
@@ -316,6 +510,120 @@ def get_three_generation_bloodline(conn, ketto_toroku_bango):
     }
 
 
+def _fetch_pedigree_rows(conn, ketto_toroku_bango_list):
+    """
+    nvd_um の血統行を出走馬とその父・母の分まで1クエリで取得し、血統マップに格納
+
+    既に血統マップにある馬は問い合わせない。nvd_um に存在しない馬は None として記録し、
+    同じ馬を再度問い合わせないようにする。
+
+    Args:
+        conn: データベース接続
+        ketto_toroku_bango_list: 血統登録番号（馬ID）のリスト
+    """
+    runners = {k for k in ketto_toroku_bango_list if k and k not in _PEDIGREE_MAP}
+
+    # 血統マップ済みの馬で、父・母がまだ未取得のもの
+    parents = set()
+    for ketto_toroku_bango in ketto_toroku_bango_list:
+        row = _PEDIGREE_MAP.get(ketto_toroku_bango)
+        if row:
+            parents.update(p for p in row[:2] if p and p not in _PEDIGREE_MAP)
+
+    if not runners and not parents:
+        return
+
+    query = """
+    WITH target AS (
+        SELECT
+            ketto_toroku_bango,
+            fufu_ketto_toroku_bango,
+            bobo_ketto_toroku_bango,
+            hahachichi_ketto_toroku_bango
+        FROM nvd_um
+        WHERE ketto_toroku_bango = ANY(%s::text[])
+    )
+    SELECT * FROM target
+    UNION
+    SELECT
+        um.ketto_toroku_bango,
+        um.fufu_ketto_toroku_bango,
+        um.bobo_ketto_toroku_bango,
+        um.hahachichi_ketto_toroku_bango
+    FROM nvd_um um
+    WHERE um.ketto_toroku_bango IN (
+        SELECT fufu_ketto_toroku_bango FROM target
+        UNION
+        SELECT bobo_ketto_toroku_bango FROM target
+        UNION
+        SELECT unnest(%s::text[])
+    )
+    """
+
+    with conn.cursor() as cur:
+        cur.execute(query, (sorted(runners), sorted(parents)))
+        rows = cur.fetchall()
+
+    for ketto_toroku_bango, fufu, bobo, hahachichi in rows:
+        _PEDIGREE_MAP[ketto_toroku_bango] = (fufu, bobo, hahachichi)
+
+    # 今回取得した出走馬の父・母も問い合わせ済みとして扱う
+    for ketto_toroku_bango in list(runners):
+        row = _PEDIGREE_MAP.get(ketto_toroku_bango)
+        if row:
+            parents.update(p for p in row[:2] if p)
+
+    for ketto_toroku_bango in runners | parents:
+        _PEDIGREE_MAP.setdefault(ketto_toroku_bango, None)
+
+
+def get_three_generation_bloodlines(conn, ketto_toroku_bango_list):
+    """
+    複数馬の3代血統データを一括取得
+
+    get_three_generation_bloodline と同じ B15〜B20 を返すが、nvd_um の自己結合を
+    馬ごとに発行せず、出走馬・父・母の行を1回の問い合わせで取得して
+    プロセス内の血統マップから組み立てる。レースをまたいで共通する馬・祖先は一度しか引かない。
+
+    Args:
+        conn: データベース接続
+        ketto_toroku_bango_list: 血統登録番号（馬ID）のリスト
+
+    Returns:
+        dict: {血統登録番号: 3代血統データ}（キーは get_three_generation_bloodline と同じ）
+    """
+    _fetch_pedigree_rows(conn, ketto_toroku_bango_list)
+
+    bloodlines = {}
+    for ketto_toroku_bango in ketto_toroku_bango_list:
+        row = _PEDIGREE_MAP.get(ketto_toroku_bango)
+        if not row:
+            bloodlines[ketto_toroku_bango] = dict.fromkeys(BLOODLINE_KEYS)
+            continue
+
+        fufu, bobo, hahachichi = row
+        sire = _PEDIGREE_MAP.get(fufu) or (None, None, None)
+        dam = _PEDIGREE_MAP.get(bobo) or (None, None, None)
+
+        bloodlines[ketto_toroku_bango] = {
+            'f_blood_no': fufu,
+            'm_blood_no': bobo,
+            'ff_blood_no': sire[0],
+            'fm_blood_no': sire[1],
+            'mf_blood_no': hahachichi,
+            'mm_blood_no': dam[1]
+        }
+
+    return bloodlines
+
+
+def clear_pedigree_map():
+    """
+    プロセス内の血統マップを破棄（nvd_um 更新後の再取得用）
+    """
+    _PEDIGREE_MAP.clear()
+
+
 def enrich_horse_data_with_bloodline(conn, horses_data):
     """
     出走馬データに血統データを追加
@@ -331,35 +639,22 @@ def enrich_horse_data_with_bloodline(conn, horses_data):
     bloodline_found = 0
     bloodline_not_found = 0
     
+    # 全出走馬の3代血統データを一括取得
+    bloodlines = get_three_generation_bloodlines(
+        conn,
+        [horse['ketto_toroku_bango'] for horse in horses_data if horse.get('ketto_toroku_bango')]
+    )
+    
     for horse in horses_data:
-        ketto_toroku_bango = horse.get('ketto_toroku_bango')
+        bloodline = bloodlines.get(horse.get('ketto_toroku_bango'))
         
-        if ketto_toroku_bango:
-            # 3代血統データを取得
-            bloodline = get_three_generation_bloodline(conn, ketto_toroku_bango)
-            
-            if bloodline and bloodline['f_blood_no']:
-                horse.update(bloodline)
-                enriched_data.append(horse)
-                bloodline_found += 1
-            else:
-                # 血統データがない場合は None で埋める
-                horse['f_blood_no'] = None
-                horse['m_blood_no'] = None
-                horse['ff_blood_no'] = None
-                horse['fm_blood_no'] = None
-                horse['mf_blood_no'] = None
-                horse['mm_blood_no'] = None
-                enriched_data.append(horse)
-                bloodline_not_found += 1
+        if bloodline and bloodline['f_blood_no']:
+            horse.update(bloodline)
+            enriched_data.append(horse)
+            bloodline_found += 1
         else:
-            # ketto_toroku_bango がない場合
-            horse['f_blood_no'] = None
-            horse['m_blood_no'] = None
-            horse['ff_blood_no'] = None
-            horse['fm_blood_no'] = None
-            horse['mf_blood_no'] = None
-            horse['mm_blood_no'] = None
+            # 血統データがない場合（ketto_toroku_bango がない場合を含む）は None で埋める
+            horse.update(dict.fromkeys(BLOODLINE_KEYS))
             enriched_data.append(horse)
             bloodline_not_found += 1
     
@@ -373,10 +668,10 @@ def enrich_horse_data_with_bloodline(conn, horses_data):
 if __name__ == '__main__':
     import sys
     sys.path.append('/home/user/webapp/nar-ai-yoso')
-    from config.db_config import DB_CONFIG
+    from config.db_config import get_db_connection
     
     # データベース接続
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = get_db_connection()
     
     try:
         # 明日の日付
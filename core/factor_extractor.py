@@ -7,6 +7,8 @@ sys.path.append('/home/user/webapp/nar-ai-yoso')
 
 from datetime import datetime, timedelta
 
+from core.sql_conditions import build_date_sql_condition
+
 
 def safe_int(value, default=0):
     """
@@ -131,7 +133,8 @@ def get_previous_race_data(conn, ketto_toroku_bango, current_race_date):
         
         # 前走データを取得（今回より前の最新レース）
         # Phase 1: F22（前走タイム差）、F23（前走上がり3F）を追加
-        query = """
+        date_condition, date_params = build_date_sql_condition('se', '<', current_race_date)
+        query = f"""
             SELECT 
                 se.kakutei_chakujun as chakujun,
                 se.ninkijun as ninki,
@@ -148,12 +151,12 @@ def get_previous_race_data(conn, ketto_toroku_bango, current_race_date):
                 AND se.race_bango = ra.race_bango
             )
             WHERE se.ketto_toroku_bango = %s
-            AND se.kaisai_nen || se.kaisai_tsukihi < %s
+            AND {date_condition}
             ORDER BY se.kaisai_nen DESC, se.kaisai_tsukihi DESC
             LIMIT 1
         """
         
-        cur.execute(query, (ketto_toroku_bango, current_race_date))
+        cur.execute(query, [ketto_toroku_bango] + date_params)
         row = cur.fetchone()
         
         if row:
@@ -0,0 +1,188 @@
+"""
+ファクター統計キャッシュ（LRU）モジュール
+
+同じファクター値は1日の中で何度も現れる（騎手は同じ競馬場で8〜10レース騎乗、
+枠番1〜8は同じ距離の全レースで共通）。
+(競馬場, 距離, ファクター名, ファクター値) をキーに統計をメモ化し、
+レース・出走馬をまたいで再利用する。
+
+上限件数を超えた場合は最も古く参照されたものから破棄する。
+スレッドセーフ（並列スコアリングから共有可能）。
+
+attach_store() で永続キャッシュ（core/factor_stats_store.py）を接続すると、
+メモリにない統計はファイルから読み、登録した統計はファイルにも書く（実行をまたいで再利用）。
+"""
+
+import threading
+from collections import OrderedDict
+
+# デフォルトの最大保持件数
+DEFAULT_MAX_SIZE = 50000
+
+
+class FactorStatsCache:
+    """
+    ファクター統計のLRUキャッシュ
+
+    使用例:
+        cache = FactorStatsCache(max_size=10000)
+        stats = cache.get(keibajo_code, kyori, factor_name, factor_value)
+        if stats is None:
+            stats = ...  # DBから取得
+            cache.put(keibajo_code, kyori, factor_name, factor_value, stats)
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.store_hits = 0
+        self._store = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(keibajo_code, kyori, factor_name, factor_value):
+        return (str(keibajo_code), str(kyori), factor_name, str(factor_value))
+
+    def get(self, keibajo_code, kyori, factor_name, factor_value):
+        """
+        キャッシュから統計を取得
+
+        Returns:
+            dict or None: 統計（未登録の場合は None）
+        """
+        key = self.make_key(keibajo_code, kyori, factor_name, factor_value)
+        with self._lock:
+            stats = self._entries.get(key)
+            if stats is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(stats)
+            store = self._store
+
+        # メモリにない場合は永続キャッシュを参照（ファイルI/O中はロックを保持しない）
+        stats = store.get(key) if store is not None else None
+        with self._lock:
+            if stats is None:
+                self.misses += 1
+                return None
+            self._set(key, stats)
+            self.hits += 1
+            self.store_hits += 1
+            return dict(stats)
+
+    def put(self, keibajo_code, kyori, factor_name, factor_value, stats):
+        """
+        統計をキャッシュに登録（上限超過時は最も古いものを破棄）
+        """
+        key = self.make_key(keibajo_code, kyori, factor_name, factor_value)
+        with self._lock:
+            self._set(key, stats)
+            store = self._store
+        if store is not None:
+            store.put(key, stats)
+
+    def _set(self, key, stats):
+        # _lock 保持中に呼ぶこと
+        self._entries[key] = dict(stats)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def attach_store(self, store):
+        """
+        永続キャッシュ（FactorStatsStore）を接続（None で切り離し）
+
+        Returns:
+            FactorStatsStore or None: それまで接続していた永続キャッシュ
+        """
+        with self._lock:
+            previous, self._store = self._store, store
+            return previous
+
+    def invalidate(self, keibajo_code=None, kyori=None, factor_name=None):
+        """
+        条件に一致するエントリを破棄（指定しない条件は全件一致）
+
+        メモリ上のエントリだけが対象。永続キャッシュはデータの版（namespace）で無効化される。
+
+        例: invalidate(keibajo_code='44')  # 大井の統計をすべて破棄
+
+        Returns:
+            int: 破棄した件数
+        """
+        with self._lock:
+            targets = [
+                key for key in self._entries
+                if (keibajo_code is None or key[0] == str(keibajo_code))
+                and (kyori is None or key[1] == str(kyori))
+                and (factor_name is None or key[2] == factor_name)
+            ]
+            for key in targets:
+                del self._entries[key]
+            return len(targets)
+
+    def clear(self):
+        """
+        全エントリとカウンタをリセット（永続キャッシュの接続は維持）
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.store_hits = 0
+
+    def stats(self):
+        """
+        キャッシュの利用状況を取得
+
+        Returns:
+            dict: {'size', 'max_size', 'hits', 'misses', 'evictions', 'hit_rate',
+                   'store_hits'（hits のうち永続キャッシュから読んだ件数）}
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'store_hits': self.store_hits,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups > 0 else 0.0
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# プロセス共有のキャッシュ
+_FACTOR_STATS_CACHE = FactorStatsCache()
+
+
+def get_factor_stats_cache():
+    """
+    プロセス共有のファクター統計キャッシュを取得
+    """
+    return _FACTOR_STATS_CACHE
+
+
+def clear_factor_stats_cache():
+    """
+    プロセス共有のファクター統計キャッシュを破棄（実行開始時・統計更新後に使用）
+    """
+    _FACTOR_STATS_CACHE.clear()
+
+
+def invalidate_factor_stats_cache(keibajo_code=None, kyori=None, factor_name=None):
+    """
+    プロセス共有キャッシュから条件に一致するエントリを破棄
+
+    Returns:
+        int: 破棄した件数
+    """
+    return _FACTOR_STATS_CACHE.invalidate(keibajo_code, kyori, factor_name)
@@ -18,6 +18,22 @@ from config.odds_correction import (
     calculate_bet_amount,
     TARGET_PAYOUT
 )
+from core.factor_stats_cube import (
+    get_factor_stats_from_cube,
+    get_factor_stats_from_cube_batch,
+    resolve_cube_key,
+    CUBE_FACTOR_COLUMNS,
+    CUBE_ALL
+)
+from core.corrected_return_sql import build_correction_ctes, build_run_payouts_sql, float_sql, int_sql
+from core.prepared_statements import execute_prepared
+from core.prev_race_table import (
+    PREV_RACE_ALIAS,
+    PREV_RACE_FACTOR_COLUMNS,
+    build_prev_race_join_sql,
+    is_prev_race_table_available,
+    uses_prev_race
+)
 
 
 def calculate_corrected_return_rate(conn, keibajo_code, kyori, factor_name, factor_value):
@@ -50,46 +66,147 @@ def calculate_corrected_return_rate(conn, keibajo_code, kyori, factor_name, fact
         }
     """
     
-    # データ取得クエリ（2016-2025の10年分）
-    query = """
-    SELECT 
-        se.kaisai_nen as year,
-        se.tansho_odds as win_odds,
-        se.kakutei_chakujun as finish_position,
-        se.kakutoku_honshokin as prize_money
-    FROM nvd_se se
-    LEFT JOIN nvd_ra ra ON
-        se.keibajo_code = ra.keibajo_code AND
-        se.kaisai_nen = ra.kaisai_nen AND
-        se.kaisai_tsukihi = ra.kaisai_tsukihi AND
-        se.race_bango = ra.race_bango
-    WHERE 
-        se.keibajo_code = %s AND
-        se.kaisai_nen >= '2016' AND
-        se.kaisai_nen <= '2025' AND
-        ra.kyori = %s AND
-        {factor_condition}
-    ORDER BY se.kaisai_nen, se.kaisai_tsukihi, se.race_bango
+    # 年度重み・オッズ補正・合計はSQL側で実行し、集計結果の1行だけを受け取る
+    ctes, cte_params = build_correction_ctes()
+    
+    # ファクター条件の構築（値はパラメータで渡し、SQLはファクターの種類ごとに同一）
+    factor_condition, factor_params = build_factor_condition(
+        factor_name, factor_value, use_prev_race=is_prev_race_table_available(conn)
+    )
+    
+    query = build_corrected_return_query(ctes, factor_condition)
+    
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        execute_prepared(
+            cur, 'factor_return', query,
+            cte_params + [keibajo_code, str(kyori)] + factor_params
+        )
+        totals = cur.fetchone()
+    
+    return build_return_rate_result(**totals)
+
+
+def calculate_corrected_return_rates(conn, keibajo_code, kyori, column, factor_values):
+    """
+    1列について、複数の値の補正回収率を1回のクエリで計算
+    
+    calculate_corrected_return_rate() を値ごとに呼ぶのと同じ結果を、
+    <列> = ANY(値リスト) で絞り込んだ GROUP BY で一括取得する。
+    前走ファクターの列は nar_prev_race（別名 pr）の列で絞り込む。
+    前走テーブルが未構築の場合は、従来どおり条件なしの集計を全値で共有する。
+    
+    Args:
+        conn: データベース接続
+        keibajo_code: 競馬場コード
+        kyori: 距離
+        column: nvd_se の列名（CUBE_FACTOR_COLUMNS）または前走ファクター名（PREV_RACE_FACTOR_COLUMNS）
+        factor_values: ファクター値（文字列）のリスト
+    
+    Returns:
+        dict: {ファクター値: calculate_corrected_return_rate() と同じ形式}
+              出現のない値は total_count=0 の結果
     """
+    if column in CUBE_FACTOR_COLUMNS:
+        expression = f"se.{column}"
+    elif column in PREV_RACE_FACTOR_COLUMNS:
+        if not is_prev_race_table_available(conn):
+            stats = calculate_corrected_return_rate(conn, keibajo_code, kyori, column, None)
+            return {str(value): dict(stats) for value in factor_values}
+        expression = f"{PREV_RACE_ALIAS}.{column}"
+    else:
+        raise ValueError(f"値で絞り込めない列です: {column}")
     
-    # ファクター条件の構築
-    factor_condition = build_factor_condition(factor_name, factor_value)
-    query = query.format(factor_condition=factor_condition)
+    factor_values = [str(value) for value in factor_values]
+    ctes, cte_params = build_correction_ctes()
+    
+    query = build_corrected_return_query(
+        ctes, f"{expression} = ANY(%s)", group_expression=expression
+    )
     
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(query, (keibajo_code, kyori))
-        results = cur.fetchall()
+        execute_prepared(
+            cur, 'factor_returns', query,
+            cte_params + [keibajo_code, str(kyori), factor_values]
+        )
+        rows = cur.fetchall()
     
-    if not results:
-        return {
-            'win_rate': 0,
-            'place_rate': 0,
-            'total_count': 0,
-            'corrected_win_return': 0,
-            'corrected_place_return': 0,
-            'confidence': 0
-        }
+    results = {value: build_return_rate_result(0, 0, 0, 0, 0, 0) for value in factor_values}
+    for row in rows:
+        factor_value = row.pop('factor_value')
+        results[factor_value] = build_return_rate_result(**row)
+    
+    return results
+
+
+def build_corrected_return_query(ctes, factor_condition, group_expression=None):
+    """
+    補正回収率の集計クエリを生成（2016-2025の10年分）
     
+    パラメータ順: CTEのパラメータ, 競馬場コード, 距離, factor_condition 内のパラメータ
+    factor_condition / group_expression が pr.（前走テーブル）を参照する場合は
+    nar_prev_race を結合する。
+    
+    Args:
+        ctes: build_correction_ctes() のCTE文字列
+        factor_condition: ファクター条件（WHERE句）
+        group_expression: 指定時はこの式の値（factor_value 列）ごとに1行を返す
+    
+    Returns:
+        str: SQL
+    """
+    group_select = f"{group_expression} as factor_value," if group_expression else ""
+    prev_race_join = (
+        build_prev_race_join_sql('se') if uses_prev_race(factor_condition, group_expression) else ""
+    )
+    group_output = "factor_value," if group_expression else ""
+    group_by = "GROUP BY factor_value" if group_expression else ""
+    
+    return f"""
+    WITH {ctes},
+    runs AS (
+        SELECT 
+            {group_select}
+            se.kaisai_nen as year,
+            {float_sql('se.tansho_odds', '1.0')} as odds,
+            {int_sql('se.kakutei_chakujun', '99')} as finish
+        FROM nvd_se se
+        LEFT JOIN nvd_ra ra ON
+            se.keibajo_code = ra.keibajo_code AND
+            se.kaisai_nen = ra.kaisai_nen AND
+            se.kaisai_tsukihi = ra.kaisai_tsukihi AND
+            se.race_bango = ra.race_bango
+        {prev_race_join}
+        WHERE 
+            se.keibajo_code = %s AND
+            se.kaisai_nen >= '2016' AND
+            se.kaisai_nen <= '2025' AND
+            ra.kyori = %s AND
+            {factor_condition}
+    ),
+    payouts AS ({build_run_payouts_sql('runs')})
+    SELECT
+        {group_output}
+        COUNT(*) as total_count,
+        COUNT(*) FILTER (WHERE weight <> 0 AND finish = 1) as win_count,
+        COUNT(*) FILTER (WHERE weight <> 0 AND finish <= 3) as place_count,
+        COALESCE(SUM(bet_amount * weight), 0) as total_weighted_bet,
+        COALESCE(SUM(win_payout * weight), 0) as total_weighted_win_payout,
+        COALESCE(SUM(place_payout * weight), 0) as total_weighted_place_payout
+    FROM payouts
+    {group_by}
+    """
+
+
+def summarize_corrected_return_rows(results):
+    """
+    出走行から補正回収率を計算（Python版。SQL集計の検証用リファレンス）
+    
+    Args:
+        results: 出走行（dict）のリスト。各行は year, win_odds, finish_position を持つ
+    
+    Returns:
+        dict: calculate_corrected_return_rate() と同じ形式
+    """
     # 補正回収率の計算
     total_weighted_win_payout = 0
     total_weighted_place_payout = 0
@@ -108,31 +225,8 @@ def calculate_corrected_return_rate(conn, keibajo_code, kyori, factor_name, fact
         if year_weight == 0:
             continue
         
-        # ベット額（均等払戻方式）
-        bet_amount = calculate_bet_amount(win_odds)
-        
-        # 単勝補正係数
-        win_correction = get_odds_correction(win_odds, is_fukusho=False)
-        
-        # 複勝補正係数（オッズを0.4倍にして使用）
-        place_odds = win_odds * 0.4
-        place_correction = get_odds_correction(place_odds, is_fukusho=True)
-        
-        # 単勝的中フラグ（1着）
-        win_flag = 1 if finish == 1 else 0
-        
-        # 複勝的中フラグ（3着以内）
-        place_flag = 1 if finish <= 3 else 0
-        
-        # 単勝払戻金
-        win_payout = TARGET_PAYOUT * win_flag
-        
-        # 複勝払戻金（簡易計算：単勝オッズの40%として計算）
-        place_payout = TARGET_PAYOUT * 0.4 * place_flag
-        
-        # 補正後払戻金
-        corrected_win_payout = win_payout * win_correction
-        corrected_place_payout = place_payout * place_correction
+        bet_amount, corrected_win_payout, corrected_place_payout, win_flag, place_flag = \
+            calculate_row_payouts(win_odds, finish)
         
         # 重み付き払戻金
         weighted_win_payout = corrected_win_payout * year_weight
@@ -151,6 +245,30 @@ def calculate_corrected_return_rate(conn, keibajo_code, kyori, factor_name, fact
         if place_flag:
             place_count += 1
     
+    return build_return_rate_result(
+        total_count, win_count, place_count,
+        total_weighted_bet, total_weighted_win_payout, total_weighted_place_payout
+    )
+
+
+def build_return_rate_result(total_count, win_count, place_count, total_weighted_bet,
+                             total_weighted_win_payout, total_weighted_place_payout):
+    """
+    集計値から勝率・補正回収率・信頼度を算出
+    
+    Returns:
+        dict: calculate_corrected_return_rate() と同じ形式
+    """
+    if not total_count:
+        return {
+            'win_rate': 0,
+            'place_rate': 0,
+            'total_count': 0,
+            'corrected_win_return': 0,
+            'corrected_place_return': 0,
+            'confidence': 0
+        }
+    
     # 補正回収率の計算
     if total_weighted_bet > 0:
         corrected_win_return = (total_weighted_win_payout / total_weighted_bet) * 100
@@ -160,8 +278,8 @@ def calculate_corrected_return_rate(conn, keibajo_code, kyori, factor_name, fact
         corrected_place_return = 0
     
     # 勝率・連対率
-    win_rate = (win_count / total_count) * 100 if total_count > 0 else 0
-    place_rate = (place_count / total_count) * 100 if total_count > 0 else 0
+    win_rate = (win_count / total_count) * 100
+    place_rate = (place_count / total_count) * 100
     
     # 信頼度の計算（CEO式）
     avg_return = (corrected_win_return + corrected_place_return) / 2
@@ -177,48 +295,91 @@ def calculate_corrected_return_rate(conn, keibajo_code, kyori, factor_name, fact
     }
 
 
-def build_factor_condition(factor_name, factor_value):
+def calculate_row_payouts(win_odds, finish):
+    """
+    1出走分のベット額・補正後払戻金を計算（年度重み適用前）
+    
+    Args:
+        win_odds: 単勝オッズ（float）
+        finish: 確定着順（int、不明時は99）
+    
+    Returns:
+        tuple: (ベット額, 補正後単勝払戻金, 補正後複勝払戻金, 単勝的中フラグ, 複勝的中フラグ)
+    """
+    # ベット額（均等払戻方式）
+    bet_amount = calculate_bet_amount(win_odds)
+    
+    # 単勝補正係数
+    win_correction = get_odds_correction(win_odds, is_fukusho=False)
+    
+    # 複勝補正係数（オッズを0.4倍にして使用）
+    place_odds = win_odds * 0.4
+    place_correction = get_odds_correction(place_odds, is_fukusho=True)
+    
+    # 単勝的中フラグ（1着）
+    win_flag = 1 if finish == 1 else 0
+    
+    # 複勝的中フラグ（3着以内）
+    place_flag = 1 if finish <= 3 else 0
+    
+    # 単勝払戻金
+    win_payout = TARGET_PAYOUT * win_flag
+    
+    # 複勝払戻金（簡易計算：単勝オッズの40%として計算）
+    place_payout = TARGET_PAYOUT * 0.4 * place_flag
+    
+    # 補正後払戻金
+    corrected_win_payout = win_payout * win_correction
+    corrected_place_payout = place_payout * place_correction
+    
+    return bet_amount, corrected_win_payout, corrected_place_payout, win_flag, place_flag
+
+
+def build_factor_condition(factor_name, factor_value, use_prev_race=True):
     """
     ファクター条件のSQL WHERE句を構築
     
+    値はSQLに埋め込まずパラメータで返すため、WHERE句はファクターの種類ごとに
+    同じ文字列になる（プリペアドステートメントの計画を値をまたいで再利用できる）。
+    前走ファクターは nar_prev_race（別名 pr）の列で絞り込む（build_corrected_return_query が結合）。
+    
     Args:
         factor_name: ファクター名
         factor_value: ファクター値
+        use_prev_race: False の場合は前走ファクターを条件なし（前走テーブル未構築時）
     
     Returns:
-        SQL WHERE句（文字列）
+        tuple: (SQL WHERE句, パラメータリスト)
     """
     
     # 単独ファクター
-    if factor_name == 'wakuban':
-        return f"se.wakuban = '{factor_value}'"
-    elif factor_name == 'umaban':
-        return f"se.umaban = '{factor_value}'"
-    elif factor_name == 'seibetsu_code':
-        return f"se.seibetsu_code = '{factor_value}'"
-    elif factor_name == 'barei':
-        return f"se.barei = '{factor_value}'"
-    elif factor_name == 'kishumei_ryakusho':
-        return f"se.kishumei_ryakusho = '{factor_value}'"
-    elif factor_name == 'chokyoshimei_ryakusho':
-        return f"se.chokyoshimei_ryakusho = '{factor_value}'"
-    
-    # 前走データファクター（前走の条件を別途取得する必要あり）
+    if factor_name in CUBE_FACTOR_COLUMNS:
+        return f"se.{factor_name} = %s", [str(factor_value)]
+    
+    # 前走データファクター（前走テーブルで絞り込む）
+    elif factor_name in PREV_RACE_FACTOR_COLUMNS:
+        if not use_prev_race:
+            return "1=1", []
+        return f"{PREV_RACE_ALIAS}.{factor_name} = %s", [str(factor_value)]
+    
+    # 前走テーブルにない前走データファクター
     elif factor_name.startswith('prev_'):
-        # 前走データは別途処理が必要（ここでは簡易実装）
-        return "1=1"  # 暫定
+        return "1=1", []
     
     # 組み合わせファクター
     elif '_x_' in factor_name:
         factors = factor_name.split('_x_')
-        values = factor_value.split('_x_')
+        values = str(factor_value).split('_x_')
         conditions = []
+        params = []
         for f, v in zip(factors, values):
-            conditions.append(build_factor_condition(f, v))
-        return ' AND '.join(conditions)
+            condition, condition_params = build_factor_condition(f, v, use_prev_race)
+            conditions.append(condition)
+            params += condition_params
+        return ' AND '.join(conditions), params
     
     else:
-        return "1=1"  # デフォルト
+        return "1=1", []  # デフォルト
 
 
 def get_factor_stats_summary(conn, keibajo_code, kyori, factor_name, factor_value):
@@ -242,12 +403,121 @@ def get_factor_stats_summary(conn, keibajo_code, kyori, factor_name, factor_valu
             'cnt_place': 複勝的中回数,
             'total_count': 総出現回数
         }
+    
+    キューブ（nar_factor_stats_cube）が構築済みならそこから取得し、
+    未構築・キューブで表現できないファクターの場合のみライブ計算する
     """
-    stats = calculate_corrected_return_rate(
+    stats = get_factor_stats_from_cube(
         conn, keibajo_code, kyori, factor_name, factor_value
     )
+    if stats is None:
+        stats = calculate_corrected_return_rate(
+            conn, keibajo_code, kyori, factor_name, factor_value
+        )
     
-    # AAS計算用の形式に変換
+    return to_summary(stats)
+
+
+def get_factor_stats_summaries(conn, keibajo_code, kyori, factor_name, factor_values):
+    """
+    1ファクターの複数の値について、ファクター統計のサマリを一括取得
+    
+    get_factor_stats_summary() を値ごとに呼ぶのと同じ結果を返す
+    （get_factor_stats_summaries_multi の1ファクター版）。
+    
+    Args:
+        conn: データベース接続
+        keibajo_code: 競馬場コード
+        kyori: 距離
+        factor_name: ファクター名
+        factor_values: ファクター値（文字列）のリスト
+    
+    Returns:
+        dict: {ファクター値: get_factor_stats_summary() と同じ形式}
+    """
+    summaries = get_factor_stats_summaries_multi(
+        conn, keibajo_code, kyori, {factor_name: factor_values}
+    )
+    return {
+        factor_value: summary
+        for (_, factor_value), summary in summaries.items()
+    }
+
+
+def get_factor_stats_summaries_multi(conn, keibajo_code, kyori, factor_values_by_name):
+    """
+    複数ファクター・複数の値について、ファクター統計のサマリを一括取得
+    
+    get_factor_stats_summary() を (ファクター, 値) ごとに呼ぶのと同じ結果を返す。
+    build_factor_condition() と同じ規則（resolve_cube_key）で、ファクターをまたいで
+    値を絞り込み列ごとにまとめる:
+    - 条件なし（1=1）のファクター: 全ファクター・全値で1回だけ集計して共有
+    - 1列で絞り込むファクター: 列ごとにキューブまたは GROUP BY クエリ1回で全値を取得
+      （前走ファクターはキューブに含まれないため、前走テーブルを結合した GROUP BY）
+    - 2列以上の組み合わせファクター: 値ごとに get_factor_stats_summary()
+    
+    Args:
+        conn: データベース接続
+        keibajo_code: 競馬場コード
+        kyori: 距離
+        factor_values_by_name: {ファクター名: ファクター値（文字列）のリスト}
+    
+    Returns:
+        dict: {(ファクター名, ファクター値): get_factor_stats_summary() と同じ形式}
+    """
+    summaries = {}
+    
+    # 絞り込み列ごとに値をまとめる（列 → {キューブ上の値: [(ファクター名, 元の値), ...]}）
+    grouped = {}
+    for factor_name, factor_values in factor_values_by_name.items():
+        for factor_value in factor_values:
+            key = resolve_cube_key(factor_name, factor_value)
+            if key is None:
+                summaries[(factor_name, factor_value)] = get_factor_stats_summary(
+                    conn, keibajo_code, kyori, factor_name, factor_value
+                )
+                continue
+            column, column_value = key
+            grouped.setdefault(column, {}).setdefault(column_value, []).append(
+                (factor_name, factor_value)
+            )
+    
+    for column, values in grouped.items():
+        column_values = list(values)
+        
+        stats_by_value = get_factor_stats_from_cube_batch(
+            conn, keibajo_code, kyori, column, column_values
+        )
+        if stats_by_value is None:
+            if column == CUBE_ALL:
+                factor_name, factor_value = values[CUBE_ALL][0]
+                stats = calculate_corrected_return_rate(
+                    conn, keibajo_code, kyori, factor_name, factor_value
+                )
+                stats_by_value = {CUBE_ALL: stats}
+            else:
+                stats_by_value = calculate_corrected_return_rates(
+                    conn, keibajo_code, kyori, column, column_values
+                )
+        
+        for column_value, factor_keys in values.items():
+            summary = to_summary(stats_by_value[column_value])
+            for factor_key in factor_keys:
+                summaries[factor_key] = dict(summary)
+    
+    return summaries
+
+
+def to_summary(stats):
+    """
+    補正回収率の計算結果をAAS計算用の形式に変換
+    
+    Args:
+        stats: calculate_corrected_return_rate() と同じ形式
+    
+    Returns:
+        dict: get_factor_stats_summary() の戻り値の形式
+    """
     return {
         'rate_win_hit': stats['win_rate'],
         'rate_place_hit': stats['place_rate'],
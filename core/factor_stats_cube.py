@@ -0,0 +1,281 @@
+"""
+ファクター統計キューブ（事前集計テーブル）モジュール
+
+calculate_corrected_return_rate() は1ファクターごとに nvd_se ⨝ nvd_ra の
+10年分を走査するため、1頭あたり約30クエリの全期間スキャンになる。
+このモジュールでは (競馬場, 距離, ファクター, 値, 年) 単位で
+的中数・ベット額・補正後払戻金を事前集計した nar_factor_stats_cube を参照し、
+ライブ計算を主キー検索に置き換える。
+
+年単位で保持しているため、YEAR_WEIGHTS を変更してもキューブの再構築は不要
+（重み付けは参照時に行う）。
+
+キューブの構築: python scripts/build_factor_stats_cube.py
+差分の反映:     python scripts/update_factor_stats_cube.py
+"""
+
+import sys
+import os
+
+# プロジェクトルートをパスに追加
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2.extras import RealDictCursor
+
+from config.odds_correction import get_year_weight
+from core.prepared_statements import execute_prepared
+from core.prev_race_table import PREV_RACE_FACTOR_COLUMNS
+
+CUBE_TABLE = 'nar_factor_stats_cube'
+
+# 反映済みの最終開催日（ハイウォーターマーク）を保持するテーブル
+CUBE_STATE_TABLE = 'nar_factor_stats_cube_state'
+
+# 集計期間（calculate_corrected_return_rate と同じ）
+CUBE_START_YEAR = '2016'
+CUBE_END_YEAR = '2025'
+
+# 値で絞り込むファクター（build_factor_condition で条件化される nvd_se の列）
+CUBE_FACTOR_COLUMNS = (
+    'wakuban',
+    'umaban',
+    'seibetsu_code',
+    'barei',
+    'kishumei_ryakusho',
+    'chokyoshimei_ryakusho',
+)
+
+# 条件なし（1=1）のファクターを集約するキー
+CUBE_ALL = '*'
+
+_cube_available = None
+
+
+def resolve_cube_key(factor_name, factor_value):
+    """
+    ファクター名・値をキューブのキー (factor_name, factor_value) に変換
+
+    build_factor_condition() と同じ規則で解決する:
+    - CUBE_FACTOR_COLUMNS の単独ファクター → (列名, 値)
+    - PREV_RACE_FACTOR_COLUMNS の前走ファクター → (ファクター名, 値)
+      （キューブには含まれず、前走テーブルを結合したライブ集計で取得する）
+    - それ以外（前走テーブルにない prev_*, 未対応ファクター）→ 条件なし ('*', '*')
+    - '_x_' 区切りの組み合わせ → 条件のある要素が1つ以下ならその要素、
+      2つ以上ならキューブでは表現できないため None
+
+    Args:
+        factor_name: ファクター名
+        factor_value: ファクター値
+
+    Returns:
+        tuple or None: (キューブ上のファクター名, ファクター値)
+    """
+    if '_x_' in factor_name:
+        keys = [
+            resolve_cube_key(name, value)
+            for name, value in zip(factor_name.split('_x_'), str(factor_value).split('_x_'))
+        ]
+        if any(key is None for key in keys):
+            return None
+        conditioned = [key for key in keys if key[0] != CUBE_ALL]
+        if len(conditioned) > 1:
+            return None
+        return conditioned[0] if conditioned else (CUBE_ALL, CUBE_ALL)
+
+    if factor_name in CUBE_FACTOR_COLUMNS or factor_name in PREV_RACE_FACTOR_COLUMNS:
+        return factor_name, str(factor_value)
+
+    return CUBE_ALL, CUBE_ALL
+
+
+def is_cube_column(cube_factor_name):
+    """
+    キューブに集計されているファクター名（CUBE_FACTOR_COLUMNS または '*'）かを判定
+    """
+    return cube_factor_name == CUBE_ALL or cube_factor_name in CUBE_FACTOR_COLUMNS
+
+
+def aggregate_cube_rows(rows):
+    """
+    キューブの年別行から補正回収率を算出（年度重みは参照時に適用）
+
+    Args:
+        rows: キューブの行（dict）のリスト。各行は year, total_count, win_hit,
+              place_hit, bet_sum, win_payout_sum, place_payout_sum を持つ
+
+    Returns:
+        dict: calculate_corrected_return_rate() と同じ形式
+    """
+    total_count = 0
+    win_count = 0
+    place_count = 0
+    total_weighted_bet = 0
+    total_weighted_win_payout = 0
+    total_weighted_place_payout = 0
+
+    for row in rows:
+        total_count += row['total_count']
+
+        year_weight = get_year_weight(row['year'])
+        if year_weight == 0:
+            continue
+
+        win_count += row['win_hit']
+        place_count += row['place_hit']
+        total_weighted_bet += row['bet_sum'] * year_weight
+        total_weighted_win_payout += row['win_payout_sum'] * year_weight
+        total_weighted_place_payout += row['place_payout_sum'] * year_weight
+
+    if total_count == 0:
+        return {
+            'win_rate': 0,
+            'place_rate': 0,
+            'total_count': 0,
+            'corrected_win_return': 0,
+            'corrected_place_return': 0,
+            'confidence': 0
+        }
+
+    if total_weighted_bet > 0:
+        corrected_win_return = (total_weighted_win_payout / total_weighted_bet) * 100
+        corrected_place_return = (total_weighted_place_payout / total_weighted_bet) * 100
+    else:
+        corrected_win_return = 0
+        corrected_place_return = 0
+
+    win_rate = (win_count / total_count) * 100
+    place_rate = (place_count / total_count) * 100
+
+    # 信頼度の計算（CEO式）
+    avg_return = (corrected_win_return + corrected_place_return) / 2
+    confidence = (avg_return - 80) * total_count
+
+    return {
+        'win_rate': round(win_rate, 2),
+        'place_rate': round(place_rate, 2),
+        'total_count': total_count,
+        'corrected_win_return': round(corrected_win_return, 2),
+        'corrected_place_return': round(corrected_place_return, 2),
+        'confidence': round(confidence, 2)
+    }
+
+
+def is_cube_available(conn):
+    """
+    キューブが構築済みかを確認（結果はプロセス内でキャッシュ）
+
+    Args:
+        conn: データベース接続
+
+    Returns:
+        bool: テーブルが存在し、1行以上あれば True
+    """
+    global _cube_available
+
+    if _cube_available is None:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (CUBE_TABLE,))
+            exists = cur.fetchone()[0]
+            if exists:
+                cur.execute(f"SELECT EXISTS (SELECT 1 FROM {CUBE_TABLE})")
+                exists = cur.fetchone()[0]
+        _cube_available = exists
+
+    return _cube_available
+
+
+def reset_cube_availability():
+    """
+    キューブ有無のキャッシュを破棄（キューブ構築直後などに使用）
+    """
+    global _cube_available
+    _cube_available = None
+
+
+def get_factor_stats_from_cube(conn, keibajo_code, kyori, factor_name, factor_value):
+    """
+    キューブから補正回収率を取得
+
+    Args:
+        conn: データベース接続
+        keibajo_code: 競馬場コード
+        kyori: 距離
+        factor_name: ファクター名
+        factor_value: ファクター値
+
+    Returns:
+        dict or None: calculate_corrected_return_rate() と同じ形式。
+                      キューブ未構築・キューブで表現できないファクターの場合は None
+    """
+    key = resolve_cube_key(factor_name, factor_value)
+    if key is None or not is_cube_column(key[0]):
+        return None
+
+    try:
+        kyori = int(kyori)
+    except (ValueError, TypeError):
+        return None
+
+    if not is_cube_available(conn):
+        return None
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        execute_prepared(cur, 'cube_lookup', f"""
+            SELECT year, total_count, win_hit, place_hit,
+                   bet_sum, win_payout_sum, place_payout_sum
+            FROM {CUBE_TABLE}
+            WHERE keibajo_code = %s
+              AND kyori = %s
+              AND factor_name = %s
+              AND factor_value = %s
+        """, (keibajo_code, kyori, key[0], key[1]))
+        rows = cur.fetchall()
+
+    return aggregate_cube_rows(rows)
+
+
+def get_factor_stats_from_cube_batch(conn, keibajo_code, kyori, cube_factor_name, cube_values):
+    """
+    キューブから1ファクターの複数の値の補正回収率を1回のクエリで取得
+
+    Args:
+        conn: データベース接続
+        keibajo_code: 競馬場コード
+        kyori: 距離
+        cube_factor_name: キューブ上のファクター名（resolve_cube_key の戻り値の1要素目）
+        cube_values: キューブ上のファクター値のリスト
+
+    Returns:
+        dict or None: {ファクター値: calculate_corrected_return_rate() と同じ形式}。
+                      キューブ未構築・キューブに含まれないファクター（前走ファクター）の場合は None
+    """
+    if not is_cube_column(cube_factor_name):
+        return None
+
+    try:
+        kyori = int(kyori)
+    except (ValueError, TypeError):
+        return None
+
+    if not is_cube_available(conn):
+        return None
+
+    cube_values = [str(value) for value in cube_values]
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        execute_prepared(cur, 'cube_lookup_batch', f"""
+            SELECT factor_value, year, total_count, win_hit, place_hit,
+                   bet_sum, win_payout_sum, place_payout_sum
+            FROM {CUBE_TABLE}
+            WHERE keibajo_code = %s
+              AND kyori = %s
+              AND factor_name = %s
+              AND factor_value = ANY(%s)
+        """, (keibajo_code, kyori, cube_factor_name, cube_values))
+        rows = cur.fetchall()
+
+    rows_by_value = {value: [] for value in cube_values}
+    for row in rows:
+        rows_by_value[row['factor_value']].append(row)
+
+    return {value: aggregate_cube_rows(value_rows) for value, value_rows in rows_by_value.items()}
@@ -0,0 +1,270 @@
+"""
+ファクター統計の永続キャッシュ（SQLite）モジュール
+
+core/factor_stats_cache.py のLRUキャッシュはプロセス内だけで有効なため、
+main.py を実行するたびに同じ過去統計を計算し直していた。
+このモジュールでは計算済みの統計を models/cache/factor_stats.sqlite3 に保存し、
+実行をまたいで再利用する（クラッシュ後の再実行・設定変更後の再実行が数秒で済む）。
+
+保存する統計は「データの版」（namespace）ごとに区別する。namespace は次から作る:
+- nvd_se の確定済み最終開催日とその日の確定出走数（新しい結果の取り込みで変わる）
+- ファクター統計キューブの反映済み最終開催日（nar_factor_stats_cube_state）
+- 前走テーブル（nar_prev_race）の最終開催日
+- 統計に影響する設定（年度重み・オッズ補正係数・目標払戻額）
+
+namespace が変わると古い統計は参照されず、開いた時点で削除される。
+統計に影響しない設定（ファクター重みなど）の変更ではキャッシュはそのまま使われる。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from config.odds_correction import (
+    TANSHO_CORRECTION,
+    FUKUSHO_CORRECTION,
+    YEAR_WEIGHTS,
+    TARGET_PAYOUT
+)
+from core.factor_stats_cube import CUBE_TABLE, CUBE_STATE_TABLE
+from core.prev_race_table import PREV_RACE_TABLE
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_STORE_PATH = os.path.join(PROJECT_ROOT, 'models', 'cache', 'factor_stats.sqlite3')
+
+# 保存形式・統計の計算方法を変えたら上げる（古いキャッシュを無効化）
+STORE_VERSION = 1
+
+# 書き込みをまとめてコミットする件数
+FLUSH_SIZE = 500
+
+
+class FactorStatsStore:
+    """
+    ファクター統計の永続キャッシュ（namespace ごとに分離）
+
+    FactorStatsCache.attach_store() でLRUキャッシュの裏に接続して使う。
+    書き込みはバッファしてまとめてコミットする（flush / close で確定）。
+    スレッドセーフ。
+
+    使用例:
+        store = FactorStatsStore(path, namespace)
+        stats = store.get(key)
+        store.put(key, stats)
+        store.close()
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, namespace=''):
+        self.path = path
+        self.namespace = namespace
+        self.hits = 0
+        self.writes = 0
+        self.purged = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS factor_stats (
+                namespace TEXT NOT NULL,
+                keibajo_code TEXT NOT NULL,
+                kyori TEXT NOT NULL,
+                factor_name TEXT NOT NULL,
+                factor_value TEXT NOT NULL,
+                stats TEXT NOT NULL,
+                PRIMARY KEY (namespace, keibajo_code, kyori, factor_name, factor_value)
+            )
+        """)
+        # 古いデータの版の統計を削除
+        cursor = self._db.execute("DELETE FROM factor_stats WHERE namespace != ?", (namespace,))
+        self.purged = cursor.rowcount
+        self._db.commit()
+
+    def get(self, key):
+        """
+        統計を取得
+
+        Args:
+            key: FactorStatsCache.make_key() のキー
+
+        Returns:
+            dict or None: 統計（未保存の場合は None）
+        """
+        with self._lock:
+            stats = self._pending.get(key)
+            if stats is None:
+                row = self._db.execute("""
+                    SELECT stats FROM factor_stats
+                    WHERE namespace = ? AND keibajo_code = ? AND kyori = ?
+                      AND factor_name = ? AND factor_value = ?
+                """, (self.namespace, *key)).fetchone()
+                if row is None:
+                    return None
+                stats = json.loads(row[0])
+            self.hits += 1
+            return dict(stats)
+
+    def put(self, key, stats):
+        """
+        統計を保存（FLUSH_SIZE 件ごとにコミット）
+        """
+        with self._lock:
+            self._pending[key] = dict(stats)
+            if len(self._pending) >= FLUSH_SIZE:
+                self._flush_locked()
+
+    def flush(self):
+        """
+        バッファ中の統計をコミット
+        """
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        self._db.executemany("""
+            INSERT OR REPLACE INTO factor_stats
+            (namespace, keibajo_code, kyori, factor_name, factor_value, stats)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (self.namespace, *key, json.dumps(stats))
+            for key, stats in self._pending.items()
+        ])
+        self._db.commit()
+        self.writes += len(self._pending)
+        self._pending.clear()
+
+    def close(self):
+        """
+        バッファをコミットしてファイルを閉じる
+        """
+        with self._lock:
+            self._flush_locked()
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) FROM factor_stats WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+            return row[0] + len(self._pending)
+
+
+def get_config_fingerprint():
+    """
+    統計に影響する設定（年度重み・オッズ補正係数・目標払戻額）のハッシュ
+
+    Returns:
+        str: 16進文字列
+    """
+    config = {
+        'tansho': [list(map(float, row)) for row in TANSHO_CORRECTION],
+        'fukusho': [list(map(float, row)) for row in FUKUSHO_CORRECTION],
+        'year_weights': {str(year): float(weight) for year, weight in YEAR_WEIGHTS.items()},
+        'target_payout': float(TARGET_PAYOUT),
+    }
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def get_data_watermark(conn):
+    """
+    過去データの版を表す値を取得
+
+    Args:
+        conn: データベース接続
+
+    Returns:
+        dict: {
+            'results': [確定済み最終開催日, その日の確定出走数],
+            'cube': キューブの反映済み最終開催日（未構築は None）,
+            'prev_race': 前走テーブルの最終開催日（未構築は None）
+        }
+    """
+    watermark = {'results': None, 'cube': None, 'prev_race': None}
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH latest AS (
+                SELECT kaisai_nen, kaisai_tsukihi
+                FROM nvd_se
+                WHERE kakutei_chakujun ~ '^[0-9]+$'
+                  AND kakutei_chakujun::integer > 0
+                ORDER BY kaisai_nen DESC, kaisai_tsukihi DESC
+                LIMIT 1
+            )
+            SELECT latest.kaisai_nen || latest.kaisai_tsukihi, COUNT(*)
+            FROM latest
+            JOIN nvd_se se ON
+                se.kaisai_nen = latest.kaisai_nen AND
+                se.kaisai_tsukihi = latest.kaisai_tsukihi
+            WHERE se.kakutei_chakujun ~ '^[0-9]+$'
+            GROUP BY 1
+        """)
+        row = cur.fetchone()
+        if row:
+            watermark['results'] = [row[0], row[1]]
+
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (CUBE_STATE_TABLE,))
+        if cur.fetchone()[0]:
+            cur.execute(
+                f"SELECT kaisai_nen || kaisai_tsukihi FROM {CUBE_STATE_TABLE} WHERE cube_name = %s",
+                (CUBE_TABLE,)
+            )
+            row = cur.fetchone()
+            watermark['cube'] = row[0] if row else None
+
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (PREV_RACE_TABLE,))
+        if cur.fetchone()[0]:
+            cur.execute(f"""
+                SELECT kaisai_nen || kaisai_tsukihi FROM {PREV_RACE_TABLE}
+                ORDER BY kaisai_nen DESC, kaisai_tsukihi DESC
+                LIMIT 1
+            """)
+            row = cur.fetchone()
+            watermark['prev_race'] = row[0] if row else None
+
+    return watermark
+
+
+def build_namespace(watermark, config_fingerprint=None):
+    """
+    データの版と設定から namespace を作る
+
+    Args:
+        watermark: get_data_watermark() の戻り値
+        config_fingerprint: get_config_fingerprint() の値（省略時は現在の設定）
+
+    Returns:
+        str: namespace
+    """
+    if config_fingerprint is None:
+        config_fingerprint = get_config_fingerprint()
+    payload = json.dumps(
+        {'version': STORE_VERSION, 'watermark': watermark, 'config': config_fingerprint},
+        sort_keys=True
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def open_factor_stats_store(conn, path=DEFAULT_STORE_PATH):
+    """
+    現在のデータの版に対応する永続キャッシュを開く
+
+    Args:
+        conn: データベース接続
+        path: SQLiteファイルのパス
+
+    Returns:
+        tuple: (FactorStatsStore, get_data_watermark() の戻り値)
+    """
+    watermark = get_data_watermark(conn)
+    return FactorStatsStore(path, build_namespace(watermark)), watermark
@@ -18,12 +18,41 @@ import numpy as np
 import sys
 sys.path.append('/home/user/webapp/nar-ai-yoso')
 
-from config.factor_weights import get_factor_weight
 from config.course_master import (
     get_course_type, 
     get_straight_length, 
     get_corner_count
 )
+from core.factor_stats_cache import get_factor_stats_cache
+from core.hqs_engine import build_factor_matrices, compute_hqs_matrix, get_factor_weight_vector
+
+
+# HQS計算対象のファクター
+SINGLE_FACTORS = [
+    'prev_chakujun', 'prev_corner_1', 'prev_corner_2', 'prev_corner_3',
+    'prev_corner_4', 'prev_time_sa', 'prev_kohan_3f', 'umaban', 'wakuban',
+    'seibetsu_code', 'bataiju', 'zogen_sa', 'barei', 'chokyoshi_mei', 'kishu_mei'
+]
+
+COMPOSITE_FACTORS = [
+    'kishu_wakuban', 'prev_kyori_current_kyori', 'baba_jotai_wakuban',
+    'joken_code_prev_joken', 'prev_chakujun_corner4', 'prev_chakujun_kohan3f',
+    'kishu_prev_chakujun', 'seibetsu_kyori', 'barei_prev_chakujun',
+    'wakuban_prev_wakuban', 'kishu_chokyoshi', 'course_type', 'mawari_code',
+    'straight_kohan3f', 'corner_count_corner'
+]
+
+ALL_FACTORS = SINGLE_FACTORS + COMPOSITE_FACTORS
+
+# ファクター統計の取得に失敗した場合の既定値
+DEFAULT_FACTOR_STATS = {
+    'cntWin': 10,
+    'cntPlace': 10,
+    'rateWinHit': 10.0,
+    'ratePlaceHit': 30.0,
+    'adjWinRet': 75.0,
+    'adjPlaceRet': 80.0
+}
 
 
 def safe_float(value, default=0.0):
@@ -50,11 +79,12 @@ def safe_int(value, default=0):
         return default
 
 
-def get_factor_stats(conn, keibajo_code, factor_name, factor_value, kyori=None):
+def get_factor_stats(conn, keibajo_code, factor_name, factor_value, kyori=None, cache=None):
     """
     ファクターの統計データ（補正回収率）を取得
     
     CEOの補正回収率計算ロジックを統合済み
+    取得結果はLRUキャッシュに保存し、同じ (競馬場, 距離, ファクター, 値) は再計算しない
     
     Args:
         conn: データベース接続
@@ -62,6 +92,7 @@ def get_factor_stats(conn, keibajo_code, factor_name, factor_value, kyori=None):
         factor_name: ファクター名
         factor_value: ファクター値
         kyori: 距離（オプション）
+        cache: FactorStatsCache（省略時はプロセス共有キャッシュ）
     
     Returns:
         dict: {
@@ -79,6 +110,13 @@ def get_factor_stats(conn, keibajo_code, factor_name, factor_value, kyori=None):
     if kyori is None:
         kyori = 1600
     
+    if cache is None:
+        cache = get_factor_stats_cache()
+    
+    cached = cache.get(keibajo_code, kyori, factor_name, factor_value)
+    if cached is not None:
+        return cached
+    
     try:
         # 補正回収率を計算
         stats = get_factor_stats_summary(
@@ -86,25 +124,88 @@ def get_factor_stats(conn, keibajo_code, factor_name, factor_value, kyori=None):
         )
         
         # HQS計算用の形式で返す（%値）
-        return {
-            'cntWin': stats['cnt_win'],
-            'cntPlace': stats['cnt_place'],
-            'rateWinHit': stats['rate_win_hit'],      # %値
-            'ratePlaceHit': stats['rate_place_hit'],  # %値
-            'adjWinRet': stats['rate_win_ret'],       # %値（補正済み）
-            'adjPlaceRet': stats['rate_place_ret']    # %値（補正済み）
-        }
+        factor_stats = to_hqs_factor_stats(stats)
+        cache.put(keibajo_code, kyori, factor_name, factor_value, factor_stats)
+        return factor_stats
     except Exception as e:
         print(f"Warning: ファクター統計取得エラー: {factor_name}={factor_value}, Error: {e}")
         # エラー時はデフォルト値を返す
-        return {
-            'cntWin': 10,
-            'cntPlace': 10,
-            'rateWinHit': 10.0,
-            'ratePlaceHit': 30.0,
-            'adjWinRet': 75.0,
-            'adjPlaceRet': 80.0
-        }
+        return dict(DEFAULT_FACTOR_STATS)
+
+
+def get_factor_stats_batch(conn, keibajo_code, factor_name, factor_values, kyori=None, cache=None):
+    """
+    1ファクターの複数の値の統計データ（補正回収率）を一括取得
+    
+    値ごとに get_factor_stats() を呼ぶのと同じ結果を返す。
+    キャッシュにない値だけをまとめ、ファクターごとに1回の GROUP BY クエリ
+    （キューブ構築済みならキューブの一括検索）で取得する。
+    
+    Args:
+        conn: データベース接続
+        keibajo_code: 競馬場コード
+        factor_name: ファクター名
+        factor_values: ファクター値のリスト
+        kyori: 距離（オプション）
+        cache: FactorStatsCache（省略時はプロセス共有キャッシュ）
+    
+    Returns:
+        dict: {ファクター値: get_factor_stats() と同じ形式}
+    """
+    from core.factor_stats_calculator import get_factor_stats_summaries
+    
+    # 距離がない場合はデフォルト値
+    if kyori is None:
+        kyori = 1600
+    
+    if cache is None:
+        cache = get_factor_stats_cache()
+    
+    results = {}
+    missing = {}
+    for factor_value in factor_values:
+        cached = cache.get(keibajo_code, kyori, factor_name, factor_value)
+        if cached is not None:
+            results[factor_value] = cached
+        else:
+            missing.setdefault(str(factor_value), []).append(factor_value)
+    
+    if not missing:
+        return results
+    
+    try:
+        summaries = get_factor_stats_summaries(
+            conn, keibajo_code, kyori, factor_name, list(missing)
+        )
+    except Exception as e:
+        print(f"Warning: ファクター統計取得エラー: {factor_name}（{len(missing)}値）, Error: {e}")
+        # エラー時はデフォルト値を返す
+        for original_values in missing.values():
+            for factor_value in original_values:
+                results[factor_value] = dict(DEFAULT_FACTOR_STATS)
+        return results
+    
+    for value_key, original_values in missing.items():
+        factor_stats = to_hqs_factor_stats(summaries[value_key])
+        for factor_value in original_values:
+            cache.put(keibajo_code, kyori, factor_name, factor_value, factor_stats)
+            results[factor_value] = dict(factor_stats)
+    
+    return results
+
+
+def to_hqs_factor_stats(stats):
+    """
+    get_factor_stats_summary() の結果をHQS計算用の形式（%値）に変換
+    """
+    return {
+        'cntWin': stats['cnt_win'],
+        'cntPlace': stats['cnt_place'],
+        'rateWinHit': stats['rate_win_hit'],      # %値
+        'ratePlaceHit': stats['rate_place_hit'],  # %値
+        'adjWinRet': stats['rate_win_ret'],       # %値（補正済み）
+        'adjPlaceRet': stats['rate_place_ret']    # %値（補正済み）
+    }
 
 
 def calculate_hit_ret_raw(factor_stats):
@@ -319,57 +420,148 @@ def is_valid_factor_value(value):
     return True
 
 
-def calculate_race_hqs_scores(conn, horses_data, race_info):
+def extract_race_factor_values(horses_data, race_info):
+    """
+    レース内の全馬の全ファクター値を抽出
+    
+    Args:
+        horses_data: 出走馬データのリスト
+        race_info: レース情報
+    
+    Returns:
+        tuple: (
+            [(馬データ, {ファクター名: 値}), ...],
+            {ファクター名: レース内の値のリスト（重複なし）}
+        )
+    """
+    horses_factor_values = []
+    values_by_factor = {factor_name: [] for factor_name in ALL_FACTORS}
+    
+    for horse in horses_data:
+        factor_values = {}
+        
+        for factor_name in ALL_FACTORS:
+            # ファクター値を取得
+            if factor_name in SINGLE_FACTORS:
+                factor_value = extract_single_factor_value(horse, factor_name)
+            else:
+                factor_value = extract_composite_factor_value(horse, race_info, factor_name)
+            
+            # 有効な値でない場合はスキップ
+            if not is_valid_factor_value(factor_value):
+                continue
+            
+            factor_values[factor_name] = factor_value
+            if factor_value not in values_by_factor[factor_name]:
+                values_by_factor[factor_name].append(factor_value)
+        
+        horses_factor_values.append((horse, factor_values))
+    
+    return horses_factor_values, values_by_factor
+
+
+def prefetch_factor_stats(conn, races, cache=None):
+    """
+    複数レースで必要なファクター統計を事前に一括取得してキャッシュに登録
+    
+    全レースの (競馬場, 距離, ファクター, 値) を集め、(競馬場, 距離) ごとに
+    get_factor_stats_summaries_multi で取得する。騎手・調教師・枠番などは
+    同じ開催の複数レースで重複するため、DB往復は (競馬場, 距離) × 絞り込み列の数程度になる。
+    取得後の calculate_race_hqs_scores() はキャッシュだけで計算できる。
+    
+    Args:
+        conn: データベース接続
+        races: [(出走馬データのリスト, レース情報), ...]
+        cache: FactorStatsCache（省略時はプロセス共有キャッシュ）
+    
+    Returns:
+        int: キャッシュに登録した (ファクター, 値) の件数
+    """
+    from core.factor_stats_calculator import get_factor_stats_summaries_multi
+    
+    if cache is None:
+        cache = get_factor_stats_cache()
+    
+    # (競馬場, 距離) → ファクター名 → {str(値): [元の値, ...]}
+    targets = {}
+    for horses_data, race_info in races:
+        keibajo_code = race_info.get('keibajo_code')
+        kyori = safe_int(race_info.get('kyori'))
+        _, values_by_factor = extract_race_factor_values(horses_data, race_info)
+        
+        group = targets.setdefault((keibajo_code, kyori), {})
+        for factor_name, factor_values in values_by_factor.items():
+            for factor_value in factor_values:
+                if cache.get(keibajo_code, kyori, factor_name, factor_value) is not None:
+                    continue
+                original_values = group.setdefault(factor_name, {}).setdefault(str(factor_value), [])
+                if factor_value not in original_values:
+                    original_values.append(factor_value)
+    
+    prefetched = 0
+    for (keibajo_code, kyori), factor_values_by_name in targets.items():
+        if not factor_values_by_name:
+            continue
+        
+        try:
+            summaries = get_factor_stats_summaries_multi(
+                conn, keibajo_code, kyori,
+                {name: list(values) for name, values in factor_values_by_name.items()}
+            )
+        except Exception as e:
+            # 取得できなかった分はレースごとの計算時に再取得される
+            print(f"Warning: ファクター統計の事前取得エラー: {keibajo_code} {kyori}m, Error: {e}")
+            continue
+        
+        for (factor_name, value_key), summary in summaries.items():
+            factor_stats = to_hqs_factor_stats(summary)
+            for factor_value in factor_values_by_name[factor_name][value_key]:
+                cache.put(keibajo_code, kyori, factor_name, factor_value, factor_stats)
+                prefetched += 1
+    
+    return prefetched
+
+
+def calculate_race_hqs_scores(conn, horses_data, race_info, cache=None):
     """
     レース内の全馬のHQS（旧AAS）得点を計算
     
+    ファクター統計はファクターごとにレース内の値をまとめて取得する
+    （get_factor_stats_batch。1レースあたりのDB往復はファクター数程度）。
+    prefetch_factor_stats() で事前取得済みの場合はキャッシュだけで計算する。
+    Zスコア化以降は core/hqs_engine.py の行列計算で行う。
+    
     Args:
         conn: データベース接続
         horses_data: 出走馬データのリスト
         race_info: レース情報
+        cache: FactorStatsCache（省略時はプロセス共有キャッシュ。レース間で統計を共有）
     
     Returns:
         list: HQS得点が追加された馬データのリスト
     """
     keibajo_code = race_info.get('keibajo_code')
     kyori = safe_int(race_info.get('kyori'))
+    all_factors = ALL_FACTORS
     
-    # 全ファクター名リスト
-    single_factors = [
-        'prev_chakujun', 'prev_corner_1', 'prev_corner_2', 'prev_corner_3',
-        'prev_corner_4', 'prev_time_sa', 'prev_kohan_3f', 'umaban', 'wakuban',
-        'seibetsu_code', 'bataiju', 'zogen_sa', 'barei', 'chokyoshi_mei', 'kishu_mei'
-    ]
-    
-    composite_factors = [
-        'kishu_wakuban', 'prev_kyori_current_kyori', 'baba_jotai_wakuban',
-        'joken_code_prev_joken', 'prev_chakujun_corner4', 'prev_chakujun_kohan3f',
-        'kishu_prev_chakujun', 'seibetsu_kyori', 'barei_prev_chakujun',
-        'wakuban_prev_wakuban', 'kishu_chokyoshi', 'course_type', 'mawari_code',
-        'straight_kohan3f', 'corner_count_corner'
-    ]
+    # 各馬の各ファクター値を抽出
+    horses_factor_values, values_by_factor = extract_race_factor_values(horses_data, race_info)
     
-    all_factors = single_factors + composite_factors
+    # 補正回収率データ取得（ファクターごとにレース内の値をまとめて1回）
+    stats_by_factor = {
+        factor_name: get_factor_stats_batch(conn, keibajo_code, factor_name, factor_values, kyori, cache)
+        for factor_name, factor_values in values_by_factor.items()
+        if factor_values
+    }
     
     # 各馬の各ファクターのHit_raw, Ret_rawを収集
     horses_hit_ret = []
     
-    for horse in horses_data:
+    for horse, factor_values in horses_factor_values:
         horse_data = {'horse': horse, 'factors': {}}
         
-        for factor_name in all_factors:
-            # ファクター値を取得
-            if factor_name in single_factors:
-                factor_value = extract_single_factor_value(horse, factor_name)
-            else:
-                factor_value = extract_composite_factor_value(horse, race_info, factor_name)
-            
-            # 有効な値でない場合はスキップ
-            if not is_valid_factor_value(factor_value):
-                continue
-            
-            # 補正回収率データ取得
-            factor_stats = get_factor_stats(conn, keibajo_code, factor_name, factor_value, kyori)
+        for factor_name, factor_value in factor_values.items():
+            factor_stats = stats_by_factor[factor_name][factor_value]
             
             # Hit_raw, Ret_raw 計算
             Hit_raw, Ret_raw, N_min = calculate_hit_ret_raw(factor_stats)
@@ -383,63 +575,37 @@ def calculate_race_hqs_scores(conn, horses_data, race_info):
         
         horses_hit_ret.append(horse_data)
     
-    # ファクターごとにZスコア化
-    for factor_name in all_factors:
-        # このファクターの全馬のHit_raw, Ret_rawを収集
-        hit_raws = []
-        ret_raws = []
-        
-        for horse_data in horses_hit_ret:
-            if factor_name in horse_data['factors']:
-                hit_raws.append(horse_data['factors'][factor_name]['Hit_raw'])
-                ret_raws.append(horse_data['factors'][factor_name]['Ret_raw'])
-        
-        # グループ統計
-        if len(hit_raws) > 1:
-            μH = np.mean(hit_raws)
-            σH = np.std(hit_raws)
-            μR = np.mean(ret_raws)
-            σR = np.std(ret_raws)
-            
-            # Zスコア計算
-            for horse_data in horses_hit_ret:
-                if factor_name in horse_data['factors']:
-                    Hit_raw = horse_data['factors'][factor_name]['Hit_raw']
-                    Ret_raw = horse_data['factors'][factor_name]['Ret_raw']
-                    N_min = horse_data['factors'][factor_name]['N_min']
-                    
-                    ZH = (Hit_raw - μH) / σH if σH > 0 else 0
-                    ZR = (Ret_raw - μR) / σR if σR > 0 else 0
-                    
-                    # Shrinkage係数
-                    Shr = calculate_shrinkage(N_min)
-                    
-                    # HQS得点
-                    hqs_score = calculate_hqs_score_from_z(ZH, ZR, Shr)
-                    
-                    # 競馬場別重みを適用
-                    weight = get_factor_weight(keibajo_code, factor_name)
-                    weighted_hqs = hqs_score * weight
-                    
-                    horse_data['factors'][factor_name]['ZH'] = ZH
-                    horse_data['factors'][factor_name]['ZR'] = ZR
-                    horse_data['factors'][factor_name]['Shr'] = Shr
-                    horse_data['factors'][factor_name]['hqs_score'] = hqs_score
-                    horse_data['factors'][factor_name]['weight'] = weight
-                    horse_data['factors'][factor_name]['weighted_hqs'] = weighted_hqs
-    
-    # 総合HQS得点を計算
+    # ファクターごとにZスコア化・HQS得点・競馬場別重み（出走馬 × ファクターの行列で一括計算）
+    horses_factor_stats = [
+        {
+            factor_name: stats_by_factor[factor_name][factor_value]
+            for factor_name, factor_value in factor_values.items()
+        }
+        for _, factor_values in horses_factor_values
+    ]
+    hit, ret, n_min, mask = build_factor_matrices(horses_factor_stats, all_factors)
+    scores = compute_hqs_matrix(
+        hit, ret, n_min, mask, get_factor_weight_vector(keibajo_code, all_factors)
+    )
+    
+    for i, horse_data in enumerate(horses_hit_ret):
+        for j, factor_name in enumerate(all_factors):
+            if not scores['scored'][i, j]:
+                continue
+            factor_data = horse_data['factors'][factor_name]
+            factor_data['ZH'] = float(scores['ZH'][i, j])
+            factor_data['ZR'] = float(scores['ZR'][i, j])
+            factor_data['Shr'] = float(scores['Shr'][i, j])
+            factor_data['hqs_score'] = float(scores['hqs_score'][i, j])
+            factor_data['weight'] = float(scores['weight'][i, j])
+            factor_data['weighted_hqs'] = float(scores['weighted_hqs'][i, j])
+    
+    # 総合HQS得点
     results = []
-    for horse_data in horses_hit_ret:
-        total_hqs = sum(
-            factor_data['weighted_hqs']
-            for factor_data in horse_data['factors'].values()
-            if 'weighted_hqs' in factor_data
-        )
-        
+    for i, horse_data in enumerate(horses_hit_ret):
         result = {
             **horse_data['horse'],
-            'total_hqs': total_hqs,
+            'total_hqs': float(scores['total_hqs'][i]),
             'factor_details': horse_data['factors']
         }
         results.append(result)
@@ -0,0 +1,196 @@
+"""
+HQS（旧AAS）得点の行列計算エンジン
+
+calculate_race_hqs_scores() のZスコア化・Shrinkage・HQS得点・競馬場別重みの適用を
+出走馬 × ファクターの行列で一括計算する。
+複数レースをまとめる場合は レース × 出走馬 × ファクター の3次元配列で計算できるため、
+数万レース規模のバックテストでもPythonのループはレース・馬の数に比例しない。
+
+入力行列:
+    hit:   Hit_raw（出走馬 × ファクター）
+    ret:   Ret_raw
+    n_min: N_min
+    mask:  有効なファクター値があるか（False の要素は計算対象外）
+
+計算式は hqs_calculator の各関数と同じ:
+    ZH, ZR: レース内の有効な値による母集団標準偏差のZスコア（σ=0 の場合は0）
+    Shr = sqrt(N_min / (N_min + 400))
+    HQS = round(12 × tanh(0.55 × ZH + 0.45 × ZR) × Shr, 1)
+    重み付きHQS = HQS × get_factor_weight(競馬場, ファクター)
+有効な値が2頭以上いるファクターだけが得点の対象になる。
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from config.factor_weights import get_factor_weight
+
+
+# Hit_raw, Ret_raw の計算に使う統計値のキー
+_STAT_KEYS = ('cntWin', 'cntPlace', 'rateWinHit', 'ratePlaceHit', 'adjWinRet', 'adjPlaceRet')
+
+
+def build_factor_matrices(horses_factor_stats, factors):
+    """
+    出走馬ごとのファクター統計から Hit_raw, Ret_raw, N_min の行列を作成
+
+    Args:
+        horses_factor_stats: 出走馬ごとの {ファクター名: get_factor_stats() の戻り値} のリスト
+        factors: ファクター名のリスト（行列の列順）
+
+    Returns:
+        tuple: (hit, ret, n_min, mask) 各 (出走馬数, ファクター数) の配列
+    """
+    n_horses = len(horses_factor_stats)
+    n_factors = len(factors)
+    column_index = {factor_name: j for j, factor_name in enumerate(factors)}
+
+    stats = np.zeros((len(_STAT_KEYS), n_horses, n_factors), dtype=np.float64)
+    mask = np.zeros((n_horses, n_factors), dtype=bool)
+
+    for i, factor_stats_by_name in enumerate(horses_factor_stats):
+        for factor_name, factor_stats in factor_stats_by_name.items():
+            j = column_index.get(factor_name)
+            if j is None:
+                continue
+            mask[i, j] = True
+            for k, key in enumerate(_STAT_KEYS):
+                stats[k, i, j] = factor_stats[key]
+
+    cnt_win, cnt_place, rate_win_hit, rate_place_hit, adj_win_ret, adj_place_ret = stats
+
+    # calculate_hit_ret_raw と同じ式
+    hit = 0.65 * rate_win_hit + 0.35 * rate_place_hit
+    ret = 0.35 * adj_win_ret + 0.65 * adj_place_ret
+    n_min = np.minimum(cnt_win, cnt_place)
+
+    return hit, ret, n_min, mask
+
+
+@lru_cache(maxsize=None)
+def _factor_weight_tuple(keibajo_code, factors):
+    return tuple(get_factor_weight(keibajo_code, factor_name) for factor_name in factors)
+
+
+def get_factor_weight_vector(keibajo_code, factors):
+    """
+    競馬場別のファクター重みを配列で取得（競馬場・ファクター列ごとにキャッシュ）
+
+    Args:
+        keibajo_code: 競馬場コード
+        factors: ファクター名のリスト
+
+    Returns:
+        np.ndarray: (ファクター数,) の重み
+    """
+    return np.asarray(_factor_weight_tuple(keibajo_code, tuple(factors)), dtype=np.float64)
+
+
+def _masked_z_scores(values, mask, count):
+    """
+    有効な要素だけでZスコアを計算（出走馬の軸 = 後ろから2番目の軸）
+
+    全頭が同じ値のファクターは σ=0 として扱う
+    （平均の丸め誤差で σ が0にならず、全頭に±1のZスコアが付くのを防ぐ）。
+    """
+    safe_count = np.maximum(count, 1)
+    masked = np.where(mask, values, 0.0)
+
+    mean = masked.sum(axis=-2, keepdims=True) / safe_count
+    deviation = np.where(mask, values - mean, 0.0)
+    std = np.sqrt((deviation * deviation).sum(axis=-2, keepdims=True) / safe_count)
+
+    upper = np.where(mask, values, -np.inf).max(axis=-2, keepdims=True)
+    lower = np.where(mask, values, np.inf).min(axis=-2, keepdims=True)
+    varies = (std > 0) & (upper > lower)
+
+    return np.where(mask & varies, deviation / np.where(varies, std, 1.0), 0.0)
+
+
+def compute_hqs_matrix(hit, ret, n_min, mask, weights):
+    """
+    Hit_raw, Ret_raw, N_min の行列からHQS得点を一括計算
+
+    (出走馬 × ファクター) の2次元、または (レース × 出走馬 × ファクター) の
+    3次元配列に対応する（レースごとに出走馬の軸でZスコア化する）。
+
+    Args:
+        hit: Hit_raw
+        ret: Ret_raw
+        n_min: N_min
+        mask: 有効なファクター値があるか
+        weights: ファクター重み（(ファクター数,) または (レース数, 1, ファクター数)）
+
+    Returns:
+        dict: {
+            'ZH', 'ZR', 'Shr', 'hqs_score', 'weight', 'weighted_hqs': hit と同じ形の配列,
+            'scored': 得点の対象になった要素（有効な値が2頭以上のファクター）,
+            'total_hqs': 出走馬ごとの総合HQS得点（ファクターの軸を合計）
+        }
+    """
+    mask = np.asarray(mask, dtype=bool)
+    count = mask.sum(axis=-2, keepdims=True)
+    scored = mask & (count > 1)
+
+    zh = np.where(scored, _masked_z_scores(hit, mask, count), 0.0)
+    zr = np.where(scored, _masked_z_scores(ret, mask, count), 0.0)
+
+    shr = np.sqrt(n_min / (n_min + 400))
+    hqs_score = np.round(12 * np.tanh(0.55 * zh + 0.45 * zr) * shr, 1)
+
+    weight = np.broadcast_to(np.asarray(weights, dtype=np.float64), hqs_score.shape)
+    weighted_hqs = np.where(scored, hqs_score * weight, 0.0)
+
+    return {
+        'ZH': zh,
+        'ZR': zr,
+        'Shr': shr,
+        'hqs_score': hqs_score,
+        'weight': weight,
+        'weighted_hqs': weighted_hqs,
+        'scored': scored,
+        'total_hqs': weighted_hqs.sum(axis=-1),
+    }
+
+
+def score_races_hqs(races_factor_stats, keibajo_codes, factors):
+    """
+    複数レースの総合HQS得点を一括計算（バックテスト用）
+
+    出走馬数の異なるレースは最大頭数に揃えて (レース × 出走馬 × ファクター) に詰め、
+    空き枠は mask=False として計算対象から外す。
+
+    Args:
+        races_factor_stats: レースごとの、出走馬ごとの {ファクター名: get_factor_stats() の戻り値} のリスト
+        keibajo_codes: レースごとの競馬場コード
+        factors: ファクター名のリスト
+
+    Returns:
+        list: レースごとの総合HQS得点の配列（出走馬の順）
+    """
+    n_races = len(races_factor_stats)
+    if n_races == 0:
+        return []
+
+    max_horses = max(len(horses) for horses in races_factor_stats)
+    shape = (n_races, max_horses, len(factors))
+
+    hit = np.zeros(shape)
+    ret = np.zeros(shape)
+    n_min = np.zeros(shape)
+    mask = np.zeros(shape, dtype=bool)
+    weights = np.zeros((n_races, 1, len(factors)))
+
+    for r, (horses, keibajo_code) in enumerate(zip(races_factor_stats, keibajo_codes)):
+        n_horses = len(horses)
+        if n_horses:
+            hit[r, :n_horses], ret[r, :n_horses], n_min[r, :n_horses], mask[r, :n_horses] = \
+                build_factor_matrices(horses, factors)
+        weights[r, 0] = get_factor_weight_vector(keibajo_code, factors)
+
+    result = compute_hqs_matrix(hit, ret, n_min, mask, weights)
+    return [
+        result['total_hqs'][r, :len(horses)]
+        for r, horses in enumerate(races_factor_stats)
+    ]
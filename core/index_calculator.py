@@ -18,15 +18,21 @@ import os
 from typing import Dict, Optional, List, Tuple
 import logging
 
+import numpy as np
+
 # config/base_times.py をインポート
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.base_times import BASE_TIMES, BABA_CORRECTION, ORGANIZERS, get_base_time as config_get_base_time
+from config.base_times import (
+    BASE_TIMES, BABA_CORRECTION, ORGANIZERS,
+    get_base_time as config_get_base_time,
+    get_base_times as config_get_base_times
+)
 
 # Ten3F推定エンジンをインポート
 from core.ten_3f_estimator import Ten3FEstimator
 
-# 正規化エンジンをインポート
-from core.index_normalizer import RacingIndexNormalizer
+# 正規化エンジンをインポート（推論用の分位点テーブル。scikit-learn 不要）
+from core.index_normalizer_runtime import QuantileIndexNormalizer
 
 logger = logging.getLogger(__name__)
 
@@ -51,7 +57,12 @@ def get_ten_3f_estimator():
 _normalizers = None
 
 def get_normalizers():
-    """正規化エンジンのシングルトン取得"""
+    """
+    正規化エンジンのシングルトン取得
+    
+    推論用の分位点テーブル（.npz）があればそれを使い、scikit-learn を読み込まない。
+    ない場合は従来の .pkl（RacingIndexNormalizer）を読み込む。
+    """
     global _normalizers
     if _normalizers is None:
         normalizers_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'normalizers')
@@ -68,7 +79,13 @@ def get_normalizers():
         for index_name, filename in normalizer_files.items():
             try:
                 filepath = os.path.join(normalizers_dir, filename)
-                _normalizers[index_name] = RacingIndexNormalizer.load(filepath)
+                runtime_path = os.path.splitext(filepath)[0] + '.npz'
+                if os.path.exists(runtime_path):
+                    filename = os.path.basename(runtime_path)
+                    _normalizers[index_name] = QuantileIndexNormalizer.load(runtime_path)
+                else:
+                    from core.index_normalizer import RacingIndexNormalizer
+                    _normalizers[index_name] = RacingIndexNormalizer.load(filepath)
                 logger.info(f"✅ 正規化器読み込み成功: {index_name} ({filename})")
             except Exception as e:
                 logger.warning(f"⚠️ 正規化器読み込み失敗: {index_name} - {e}")
@@ -168,6 +185,13 @@ FURI_CORRECTION = {
 }
 
 
+# テン指数に適用する不利: スタート不利（01-03, 06, 29）と向正面不利（28）
+TEN_FURI_CODES = ('01', '02', '03', '06', '28', '29')
+
+# 上がり指数に適用する不利: 直線不利（25）、4角不利（26）、3角不利（27）、その他ゴール前不利
+AGARI_FURI_CODES = ('04', '05', '08', '09', '10', '11', '12', '19', '22', '23', '24', '25', '26', '27', '30')
+
+
 def get_furi_correction(furi_code: str) -> Tuple[float, str]:
     """
     不利補正値を取得
@@ -191,6 +215,12 @@ def get_furi_correction(furi_code: str) -> Tuple[float, str]:
 # ベイズ推定による枠順係数テーブルをロード
 _WAKUBAN_COEFFICIENTS_BAYESIAN = None
 
+# 係数テーブルの配列版（load_wakuban_coefficient_table で構築）
+_WAKUBAN_COEFFICIENT_TABLE = None
+
+# 係数テーブルの枠番の上限
+MAX_WAKUBAN = 8
+
 def load_wakuban_coefficients_bayesian():
     """ベイズ推定による枠順係数をロード"""
     global _WAKUBAN_COEFFICIENTS_BAYESIAN
@@ -206,6 +236,64 @@ def load_wakuban_coefficients_bayesian():
             _WAKUBAN_COEFFICIENTS_BAYESIAN = {}
     return _WAKUBAN_COEFFICIENTS_BAYESIAN
 
+def load_wakuban_coefficient_table() -> Dict:
+    """
+    ベイズ推定枠順係数を配列に展開（1回だけ構築し、係数の辞書が差し替えられたら作り直す）
+    
+    Returns:
+        {
+            'venues': {競馬場コード: 行},
+            'distance_index': 距離（m）→ 列（該当なしは -1）の配列,
+            'table': shape (競馬場, 距離, MAX_WAKUBAN + 1) の係数（該当なしは NaN）
+        }
+    """
+    global _WAKUBAN_COEFFICIENT_TABLE
+    coefficients = load_wakuban_coefficients_bayesian()
+    if _WAKUBAN_COEFFICIENT_TABLE is not None and _WAKUBAN_COEFFICIENT_TABLE['source'] is coefficients:
+        return _WAKUBAN_COEFFICIENT_TABLE
+    
+    venues = {str(code): i for i, code in enumerate(coefficients)}
+    distances = sorted({
+        int(kyori)
+        for keibajo_data in coefficients.values()
+        for kyori in keibajo_data
+        if str(kyori).isdigit()
+    })
+    distance_index = np.full((distances[-1] if distances else 0) + 1, -1, dtype=np.int64)
+    distance_index[distances] = np.arange(len(distances))
+    
+    table = np.full((len(venues), len(distances), MAX_WAKUBAN + 1), np.nan)
+    for code, keibajo_data in coefficients.items():
+        for kyori, kyori_data in keibajo_data.items():
+            if not str(kyori).isdigit():
+                continue
+            for wakuban, coefficient in kyori_data.items():
+                if str(wakuban).isdigit() and 1 <= int(wakuban) <= MAX_WAKUBAN:
+                    table[venues[str(code)], distance_index[int(kyori)], int(wakuban)] = coefficient
+    
+    _WAKUBAN_COEFFICIENT_TABLE = {
+        'source': coefficients,
+        'venues': venues,
+        'distance_index': distance_index,
+        'table': table,
+    }
+    return _WAKUBAN_COEFFICIENT_TABLE
+
+def _lookup_wakuban_coefficient(wakuban: int, kyori: int, keibajo_code) -> Optional[float]:
+    """ベイズ推定係数を1件参照（該当なしは None）"""
+    if not keibajo_code:
+        return None
+    coefficient_table = load_wakuban_coefficient_table()
+    venue = coefficient_table['venues'].get(str(keibajo_code))
+    distance_index = coefficient_table['distance_index']
+    if venue is None or not 1 <= wakuban <= MAX_WAKUBAN or not 0 <= kyori < len(distance_index) or kyori != int(kyori):
+        return None
+    distance = distance_index[int(kyori)]
+    if distance < 0:
+        return None
+    coefficient = coefficient_table['table'][venue, distance, int(wakuban)]
+    return None if np.isnan(coefficient) else float(coefficient)
+
 def get_wakuban_correction(wakuban: int, tosu: int, kyori: int, keibajo_code: str = None) -> Tuple[float, str]:
     """
     枠順補正値を計算（ベイズ推定版）
@@ -227,20 +315,13 @@ def get_wakuban_correction(wakuban: int, tosu: int, kyori: int, keibajo_code: st
     if wakuban <= 0 or tosu <= 0:
         return (0.0, 'データなし')
     
-    # ベイズ推定係数テーブルをロード
-    coefficients = load_wakuban_coefficients_bayesian()
-    
     # 競馬場コード×距離×枠番で係数を取得
-    if keibajo_code and str(keibajo_code) in coefficients:
-        keibajo_data = coefficients[str(keibajo_code)]
-        if str(kyori) in keibajo_data:
-            kyori_data = keibajo_data[str(kyori)]
-            if str(wakuban) in kyori_data:
-                coefficient = kyori_data[str(wakuban)]
-                # 係数を秒数に変換（係数 / 10 = 秒数）
-                correction_seconds = coefficient / 10.0
-                desc = f'ベイズ推定（係数: {coefficient:.1f}）'
-                return (round(correction_seconds, 2), desc)
+    coefficient = _lookup_wakuban_coefficient(wakuban, kyori, keibajo_code)
+    if coefficient is not None:
+        # 係数を秒数に変換（係数 / 10 = 秒数）
+        correction_seconds = coefficient / 10.0
+        desc = f'ベイズ推定（係数: {coefficient:.1f}）'
+        return (round(correction_seconds, 2), desc)
     
     # フォールバック: 従来方式（距離別の枠順影響度）
     relative_position = (wakuban - 1) / max(tosu - 1, 1)
@@ -261,6 +342,67 @@ def get_wakuban_correction(wakuban: int, tosu: int, kyori: int, keibajo_code: st
     
     return (round(base_correction, 2), desc)
 
+def get_wakuban_corrections(wakuban, tosu, kyori, keibajo_codes=None) -> np.ndarray:
+    """
+    枠順補正値を配列でまとめて計算（get_wakuban_correction の配列版。補正値のみ）
+    
+    Args:
+        wakuban: 枠番の配列
+        tosu: 出走頭数の配列
+        kyori: 距離（m）の配列
+        keibajo_codes: 競馬場コードの配列（省略時は従来方式のみ）
+    
+    Returns:
+        補正値（秒）の配列。1件ずつ get_wakuban_correction を呼んだ場合と同じ値
+    """
+    wakuban = np.asarray(wakuban, dtype=np.float64).reshape(-1)
+    tosu = np.asarray(tosu, dtype=np.float64).reshape(-1)
+    kyori = np.asarray(kyori, dtype=np.float64).reshape(-1)
+    
+    # フォールバック: 従来方式（距離別の枠順影響度）
+    relative_position = (wakuban - 1) / np.maximum(tosu - 1, 1)
+    middle = (0.3 <= relative_position) & (relative_position <= 0.7)
+    corrections = _batch_round(np.select(
+        [kyori < 1400, kyori < 1800],
+        [
+            (0.5 - relative_position) * 0.6,
+            np.where(middle, 0.2, (0.5 - np.abs(relative_position - 0.5)) * 0.3),
+        ],
+        (relative_position - 0.5) * 0.2
+    ), 2)
+    
+    # 競馬場コード×距離×枠番のベイズ推定係数があれば優先
+    if keibajo_codes is not None and len(wakuban) > 0:
+        coefficient_table = load_wakuban_coefficient_table()
+        venue_positions = coefficient_table['venues']
+        codes = np.asarray(keibajo_codes).reshape(-1)
+        if codes.dtype.kind == 'U':
+            unique_codes, inverse = np.unique(codes, return_inverse=True)
+            venues = np.array([venue_positions.get(str(code), -1) for code in unique_codes], dtype=np.int64)
+            venues = venues[inverse.reshape(-1)]
+        else:
+            venues = np.array([venue_positions.get(str(code), -1) if code else -1 for code in codes.tolist()], dtype=np.int64)
+        
+        distance_index = coefficient_table['distance_index']
+        target = (
+            (venues >= 0)
+            & (wakuban >= 1) & (wakuban <= MAX_WAKUBAN)
+            & (kyori >= 0) & (kyori < len(distance_index)) & (kyori == np.trunc(kyori))
+        )
+        distances = np.full(len(wakuban), -1, dtype=np.int64)
+        distances[target] = distance_index[kyori[target].astype(np.int64)]
+        target &= distances >= 0
+        
+        coefficients = np.full(len(wakuban), np.nan)
+        coefficients[target] = coefficient_table['table'][
+            venues[target], distances[target], wakuban[target].astype(np.int64)
+        ]
+        bayesian = ~np.isnan(coefficients)
+        corrections[bayesian] = _batch_round(coefficients[bayesian] / 10.0, 2)
+    
+    return np.where((wakuban <= 0) | (tosu <= 0), 0.0, corrections)
+
+
 
 # ============================
 # 斤量補正マッピング
@@ -448,8 +590,7 @@ def calculate_ten_index(
     # 不利補正（スタート不利・前半不利のみ適用）
     furi_correction, furi_desc = get_furi_correction(furi_code)
     # スタート不利（01-03, 06, 29）と向正面不利（28）のみテン指数に適用
-    ten_furi_codes = ['01', '02', '03', '06', '28', '29']
-    if furi_code not in ten_furi_codes:
+    if furi_code not in TEN_FURI_CODES:
         furi_correction = 0.0
     
     # 枠順補正（短距離のテン指数に影響）
@@ -574,8 +715,7 @@ def calculate_agari_index(
     # 不利補正（直線・4角不利のみ適用）
     furi_correction, furi_desc = get_furi_correction(furi_code)
     # 直線不利（25）、4角不利（26）、3角不利（27）、その他ゴール前不利を適用
-    agari_furi_codes = ['04', '05', '08', '09', '10', '11', '12', '19', '22', '23', '24', '25', '26', '27', '30']
-    if furi_code not in agari_furi_codes:
+    if furi_code not in AGARI_FURI_CODES:
         furi_correction = 0.0
     
     # 斤量補正（上がりタイムは斤量の影響が大きい）
@@ -745,7 +885,8 @@ def predict_ashishitsu(
 # 8. 統合計算関数
 # ============================
 
-def calculate_all_indexes(horse_data: Dict, race_info: Dict = None, apply_normalization: bool = True) -> Dict:
+def calculate_all_indexes(horse_data: Dict, race_info: Dict = None, apply_normalization: bool = True,
+                          defer_normalization: bool = False) -> Dict:
     """
     1頭分の全指数を一括計算
     
@@ -757,11 +898,13 @@ def calculate_all_indexes(horse_data: Dict, race_info: Dict = None, apply_normal
         race_info: レース情報（オプション）
             grade_code: クラスコード（'A'/'B'/'C'/'D'/'E'/None=一般戦）
         apply_normalization: 正規化を適用するかどうか（デフォルト: True）
+        defer_normalization: True の場合は正規化せず正規化前の値を返し、
+            後で normalize_index_results() でレース・データセット単位にまとめて正規化する
     
     Returns:
         指数データ
             {
-                'ten_index': float (正規化済み),
+                'ten_index': float (正規化済み。defer_normalization=Trueの場合は正規化前),
                 'ten_index_raw': float (正規化前、apply_normalization=Trueの場合のみ),
                 'position_index': float (正規化済み),
                 'position_index_raw': float (正規化前、apply_normalization=Trueの場合のみ),
@@ -849,7 +992,19 @@ def calculate_all_indexes(horse_data: Dict, race_info: Dict = None, apply_normal
         ashishitsu = predict_ashishitsu(past_corners, wakuban=wakuban, tosu=tosu, kyori=kyori)
         
         # 正規化の適用
-        if apply_normalization:
+        if apply_normalization and defer_normalization:
+            # normalize_index_results() が *_raw を正規化して各指数を置き換える
+            result = {
+                'ten_index_raw': ten_index,
+                'position_index_raw': position_index,
+                'agari_index_raw': agari_index,
+                'pace_index_raw': pace_index,
+                'ten_index': ten_index,
+                'position_index': position_index,
+                'agari_index': agari_index,
+                'pace_index': pace_index,
+            }
+        elif apply_normalization:
             normalizers = get_normalizers()
             
             # 正規化前の値を保存
@@ -935,7 +1090,401 @@ def calculate_all_indexes(horse_data: Dict, race_info: Dict = None, apply_normal
 
 
 # ============================
-# 9. テスト用メイン関数
+# 9. バッチ計算関数
+# ============================
+
+# バッチ計算で出力する4指数
+BATCH_INDEX_NAMES = ('ten_index', 'position_index', 'agari_index', 'pace_index')
+
+# 計算エラー時の値（calculate_all_indexes の例外時と同じ）
+INDEX_DEFAULTS = {
+    'ten_index': 0.0,
+    'position_index': 50.0,
+    'agari_index': 0.0,
+    'pace_index': 0.0,
+    'pace_type': 'M',
+    'ashishitsu': '自',
+}
+
+
+def _batch_column(data, key):
+    """列を取り出す（列がなければ None）"""
+    if key not in data:
+        return None
+    values = data[key]
+    if isinstance(values, (list, tuple)):
+        # 数値と空文字が混在するリストを文字列の配列にしないよう、要素はそのまま保持する
+        return np.array(values, dtype=object)
+    return np.asarray(values)
+
+
+def _batch_to_float(values: np.ndarray) -> np.ndarray:
+    """
+    配列を float 配列に変換（safe_float(value, NaN) と同じ。欠損・変換不能は NaN）
+
+    文字列・None・空文字が混在する object 配列（DBの VARCHAR 列・リスト由来の列）も
+    要素ごとに safe_float を呼ばず、欠損を除いてから astype で一括変換する。
+    """
+    try:
+        return values.astype(np.float64)
+    except (ValueError, TypeError):
+        pass
+
+    result = np.full(len(values), np.nan)
+    present = np.not_equal(values, '') & np.not_equal(values, None)
+    try:
+        result[present] = values[present].astype(np.float64)
+    except (ValueError, TypeError):
+        # 変換不能な値を含む場合のみ、ユニークな値ごとに safe_float で変換
+        rows = np.flatnonzero(present)
+        _, first, inverse = np.unique(values[rows].astype(str), return_index=True, return_inverse=True)
+        converted = np.array([safe_float(values[rows[i]], np.nan) for i in first], dtype=np.float64)
+        result[rows] = converted[inverse.reshape(-1)]
+    return result
+
+
+def _batch_float(data, key, default: float, size: int) -> np.ndarray:
+    """列を float 配列に変換（safe_float と同じく空・変換不能は default）"""
+    values = _batch_column(data, key)
+    if values is None:
+        return np.full(size, default, dtype=np.float64)
+    result = _batch_to_float(values)
+    result[np.isnan(result)] = default
+    return result
+
+
+def _batch_int(data, key, default: int, size: int) -> np.ndarray:
+    """列を整数値の float 配列に変換（safe_int と同じく空・変換不能は default）"""
+    values = _batch_column(data, key)
+    if values is None:
+        return np.full(size, default, dtype=np.float64)
+    result = _batch_to_float(values)
+    if values.dtype.kind not in 'biuf':
+        # int('12.5') は変換不能（小数部のある値だけ文字列かどうかを確認する）
+        fractional = np.flatnonzero(np.isfinite(result) & (result != np.trunc(result)))
+        text = np.array([isinstance(values[i], str) for i in fractional], dtype=bool)
+        result[fractional[text]] = np.nan
+    # int(12.7) と同じく0方向に切り捨て
+    result = np.trunc(result)
+    result[np.isnan(result)] = default
+    return result
+
+
+def _batch_code(data, key, default: str, size: int) -> np.ndarray:
+    """列をコード文字列の配列に変換（str(horse_data.get(key, default)) と同じ）"""
+    values = _batch_column(data, key)
+    if values is None:
+        return np.full(size, default)
+    return values.astype(str)
+
+
+def _batch_round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    round(value, ndigits) と同じ値に丸める
+
+    np.round は 10**ndigits 倍してから丸めるため、ちょうど端数 0.5 付近で
+    組み込みの round（10進表現での偶数丸め）と結果が変わる。該当する要素だけ round で計算し直す。
+    """
+    result = np.round(values, ndigits)
+    scaled = np.abs(values * 10 ** ndigits)
+    near_half = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if len(near_half):
+        # 同じ値が多いため、ユニークな値ごとに1回だけ round を呼ぶ
+        unique_values, inverse = np.unique(values[near_half], return_inverse=True)
+        rounded = np.array([round(float(value), ndigits) for value in unique_values], dtype=np.float64)
+        result[near_half] = rounded[inverse.reshape(-1)]
+    return result
+
+
+def _batch_map(codes: np.ndarray, mapping) -> np.ndarray:
+    """コード配列を mapping(code) の値に変換（ユニークなコードごとに1回だけ呼ぶ）"""
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    values = np.array([mapping(str(code)) for code in unique_codes], dtype=np.float64)
+    return values[inverse.reshape(-1)]
+
+
+def _batch_base_times(keibajo_codes: np.ndarray, kyori: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(競馬場, 距離) ごとの基準タイム（前半3F, 後半3F）を取得"""
+    return (
+        config_get_base_times(keibajo_codes, kyori, 'zenhan_3f'),
+        config_get_base_times(keibajo_codes, kyori, 'kohan_3f'),
+    )
+
+
+def _batch_kinryo_correction(kinryo: np.ndarray, bataiju: np.ndarray) -> np.ndarray:
+    """get_kinryo_correction の配列版"""
+    correction = -(kinryo - 54.0) * 0.1
+    weight_factor = np.clip(0.9 + (1.0 - bataiju / 460.0) * 0.2, 0.8, 1.2)
+    correction = np.where(bataiju > 0, correction * weight_factor, correction)
+    return np.where(kinryo <= 0, 0.0, _batch_round(correction, 2))
+
+
+def _batch_pace_type(zenhan_3f: np.ndarray, kohan_3f: np.ndarray,
+                     base_zenhan: np.ndarray, base_kohan: np.ndarray) -> np.ndarray:
+    """judge_pace_type の配列版"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        base_ratio = np.where(base_kohan > 0, base_zenhan / base_kohan, 0.94)
+        actual_ratio = np.where(kohan_3f > 0, zenhan_3f / kohan_3f, 0.94)
+    pace_diff = actual_ratio - base_ratio
+    return np.select([pace_diff >= 0.03, pace_diff <= -0.03], ['H', 'S'], 'M')
+
+
+def _batch_ashishitsu(past_corners, wakuban: np.ndarray, tosu: np.ndarray, kyori: np.ndarray) -> np.ndarray:
+    """predict_ashishitsu(past_corners, wakuban=, tosu=, kyori=) の配列版"""
+    avg_position = np.full(len(wakuban), np.nan)
+    if past_corners is not None:
+        # 要素ごとの代入は遅いため、リストにまとめてから配列にする
+        averages = []
+        for corners_list in past_corners:
+            if corners_list is None or len(corners_list) == 0:
+                averages.append(np.nan)
+                continue
+            positions = [c for corners in corners_list[:3] for c in corners if c > 0]
+            averages.append(sum(positions) / len(positions) if positions else np.nan)
+        avg_position = np.array(averages, dtype=np.float64)
+
+    waku_correction = get_wakuban_corrections(wakuban, tosu, kyori)
+    position_adjustment = np.where(kyori < 1400, -waku_correction * 2, -waku_correction * 0.5)
+    adjusted_position = avg_position + position_adjustment
+
+    ashishitsu = np.select(
+        [adjusted_position <= 2.0, adjusted_position <= 4.0, adjusted_position <= 6.0, adjusted_position <= 8.0],
+        ['逃', '先', '好', '差'],
+        '追'
+    )
+    return np.where(np.isnan(avg_position), '自', ashishitsu)
+
+
+def normalize_index_array(index_name: str, values) -> np.ndarray:
+    """
+    1指数の値の配列を1回の transform でまとめて正規化
+
+    Args:
+        index_name: 'ten_index' | 'position_index' | 'agari_index' | 'pace_index'
+        values: 正規化前の指数の配列
+
+    Returns:
+        正規化済み指数の配列（正規化器がない・失敗した場合は正規化前の値）
+    """
+    values = np.asarray(values, dtype=np.float64)
+    normalizer = get_normalizers().get(index_name)
+    if normalizer is None or len(values) == 0:
+        return values
+    try:
+        return np.asarray(normalizer.transform(values), dtype=np.float64)
+    except Exception as e:
+        logger.warning(f"⚠️ {index_name} の正規化失敗: {e}")
+        return values
+
+
+def normalize_index_results(results: List[Dict]) -> List[Dict]:
+    """
+    calculate_all_indexes(..., defer_normalization=True) の結果をまとめて正規化
+
+    1頭ずつ正規化すると QuantileTransformer の入力検証が1頭×4指数ごとに走るため、
+    レース・データセット単位で指数ごとに1回の transform にまとめる。
+    各結果の *_raw を正規化して指数を置き換える（結果の dict を直接更新）。
+    *_raw のない結果（計算エラー時の既定値・正規化なしで計算した結果）はそのまま。
+    正規化済みの結果に再度適用しても値は変わらない。
+
+    Args:
+        results: calculate_all_indexes の結果のリスト
+
+    Returns:
+        同じリスト（正規化後は calculate_all_indexes(..., apply_normalization=True) と同じ値）
+    """
+    for index_name in BATCH_INDEX_NAMES:
+        raw_key = f'{index_name}_raw'
+        targets = [result for result in results if raw_key in result]
+        if not targets:
+            continue
+        normalized = normalize_index_array(index_name, [result[raw_key] for result in targets])
+        for result, value in zip(targets, normalized):
+            result[index_name] = float(value)
+    return results
+
+
+def calculate_all_indexes_batch(data, race_info: Dict = None, apply_normalization: bool = True) -> Dict[str, np.ndarray]:
+    """
+    複数頭の全指数を配列演算で一括計算（calculate_all_indexes の列指向版）
+
+    学習データ作成・統計スクリプトなど、レース単位〜データセット全体を
+    まとめて計算する用途向け。1頭ずつ calculate_all_indexes を呼ぶのと同じ値を返す。
+    基準タイム・不利補正などの参照はユニークなキーごとに1回だけ行う。
+
+    Args:
+        data: 列名 → 配列 のマッピング（dict of arrays / pandas.DataFrame）
+            列名は calculate_all_indexes の horse_data のキーと同じ
+            （zenhan_3f, kohan_3f, corner_1-4, kyori, babajotai_code_dirt, keibajo_code,
+             tosu, furi_code, wakuban, kinryo, bataiju, soha_time, past_corners）。
+            grade_code 列があれば race_info より優先する。
+            欠損値（None / NaN / 空文字）は calculate_all_indexes のキー欠損と同じ扱い
+        race_info: レース情報（全行共通、オプション）
+        apply_normalization: 正規化を適用するかどうか（デフォルト: True）
+
+    Returns:
+        指数データ（各値は長さ n の numpy 配列）
+            {
+                'ten_index', 'position_index', 'agari_index', 'pace_index': float,
+                '*_raw': float (正規化前、apply_normalization=Trueの場合のみ),
+                'pace_type': str,
+                'ashishitsu': str,
+                'estimated_ten_3f': float (推定値を使用しなかった行は NaN),
+                'ten_3f_method': str ('actual' | 'direct_calculation' | 'baseline' | 'adjusted' | 'ml')
+            }
+            計算エラーになった行は calculate_all_indexes の例外時と同じ値
+    """
+    size = len(data[next(iter(data))]) if len(data) else 0
+
+    # データ取得（1/10秒単位から秒単位に変換）
+    zenhan_3f = _batch_float(data, 'zenhan_3f', 0.0, size) / 10.0
+    kohan_3f = _batch_float(data, 'kohan_3f', 0.0, size) / 10.0
+    corners = np.stack([_batch_int(data, f'corner_{i}', 0, size) for i in range(1, 5)])
+    kyori = _batch_int(data, 'kyori', 1600, size)
+    baba_code = _batch_code(data, 'babajotai_code_dirt', '1', size)
+    keibajo_code = _batch_code(data, 'keibajo_code', '42', size)
+    tosu = _batch_int(data, 'tosu', 12, size)
+    furi_code = _batch_code(data, 'furi_code', '00', size)
+    wakuban = _batch_int(data, 'wakuban', 0, size)
+    kinryo = _batch_float(data, 'kinryo', 54.0, size)
+    bataiju = _batch_float(data, 'bataiju', 460.0, size)
+    time_seconds = _batch_float(data, 'soha_time', 0.0, size) / 10.0
+
+    if 'grade_code' in data:
+        grade_codes = list(data['grade_code'])
+    else:
+        grade_codes = [race_info.get('grade_code') if race_info else None] * size
+
+    # zenhan_3f が欠損している場合の処理（calculate_all_indexes と同じ）
+    failed = np.zeros(size, dtype=bool)
+    estimated_ten_3f = np.full(size, np.nan)
+    ten_3f_method = np.full(size, 'actual', dtype=object)
+    missing = zenhan_3f == 0.0
+    # Ten3FEstimator は numpy のスカラーを返すため、推定行のテン・ペース指数は
+    # round() が numpy の丸め（np.round）になる。同じ値になるよう行ごとに記録する
+    numpy_scalar = np.zeros(size, dtype=bool)
+
+    # 1200m以下: T_start = T_total - T_last（後半3F欠損時は前後半均等と仮定）
+    direct = missing & (kyori <= 1200)
+    zenhan_3f = np.where(
+        direct,
+        np.where(kohan_3f > 0, time_seconds - kohan_3f, time_seconds * 0.50),
+        zenhan_3f
+    )
+    ten_3f_method[direct] = 'direct_calculation'
+
+    # 1201m以上: Ten3FEstimator で推定（全行まとめて1回で推定）
+    estimate_rows = np.flatnonzero(missing & (kyori > 1200))
+    if len(estimate_rows):
+        estimator = get_ten_3f_estimator()
+        estimate_corners = corners[:2, estimate_rows]
+        try:
+            result = estimator.estimate_batch(
+                time_seconds=time_seconds[estimate_rows],
+                kohan_3f_seconds=kohan_3f[estimate_rows],
+                kyori=kyori[estimate_rows],
+                corner_1=np.where(estimate_corners[0] > 0, estimate_corners[0], np.nan),
+                corner_2=np.where(estimate_corners[1] > 0, estimate_corners[1], np.nan),
+                field_size=tosu[estimate_rows],
+                use_ml=True,
+                keibajo_code=[str(keibajo_code[i]) for i in estimate_rows],
+                grade_code=[grade_codes[i] for i in estimate_rows]
+            )
+        except Exception as e:
+            logger.error(f"指数計算エラー: {e}")
+            failed[estimate_rows] = True
+        else:
+            zenhan_3f[estimate_rows] = result['ten_3f_final']
+            ten_3f_method[estimate_rows] = result['method']
+            # 基準タイムのみのベースラインは Python の float、それ以外は numpy のスカラー
+            numpy_scalar[estimate_rows] = ~(
+                (result['method'] == 'baseline') & (result['baseline_method'] == 'base_time')
+            )
+    estimated = missing & ~failed
+    estimated_ten_3f[estimated] = zenhan_3f[estimated]
+
+    # 共通の補正値
+    base_zenhan, base_kohan = _batch_base_times(keibajo_code, kyori)
+    baba_correction = _batch_map(baba_code, get_baba_correction_value)
+    furi_value = _batch_map(furi_code, lambda code: get_furi_correction(code)[0])
+    waku_correction = get_wakuban_corrections(wakuban, tosu, kyori)
+    kinryo_correction = _batch_kinryo_correction(kinryo, bataiju)
+
+    # テン指数
+    ten_furi_correction = np.where(np.isin(furi_code, TEN_FURI_CODES), furi_value, 0.0)
+    ten_waku_correction = np.where(kyori >= 1800, waku_correction * 0.3, waku_correction)
+    ten_index = (base_zenhan - zenhan_3f) + baba_correction + ten_furi_correction + ten_waku_correction + kinryo_correction
+    ten_index = np.clip(ten_index, -100, 100)
+    ten_index = np.where(numpy_scalar, np.round(ten_index, 1), _batch_round(ten_index, 1))
+
+    # 位置指数
+    valid_corners = corners > 0
+    corner_count = valid_corners.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_position = np.where(valid_corners, corners, 0).sum(axis=0) / corner_count
+        position_index = 100 - np.where(tosu > 0, (avg_position / tosu) * 100, 50.0)
+    position_index = position_index + waku_correction * 15
+    position_index = _batch_round(np.clip(position_index, 0, 100), 1)
+    position_index = np.where(corner_count == 0, 50.0, position_index)
+
+    # 上がり指数（ペース補正は前半3Fがある場合のみ）
+    pace_type = _batch_pace_type(zenhan_3f, kohan_3f, base_zenhan, base_kohan)
+    high_pace_correction = get_pace_correction_for_agari('H')[0]
+    agari_pace_correction = np.where((zenhan_3f > 0) & (pace_type == 'H'), high_pace_correction, 0.0)
+    agari_furi_correction = np.where(np.isin(furi_code, AGARI_FURI_CODES), furi_value, 0.0)
+    agari_index = (base_kohan - kohan_3f) + baba_correction + agari_furi_correction + kinryo_correction * 1.2 + agari_pace_correction
+    agari_index = _batch_round(np.clip(agari_index, -100, 100), 1)
+    # calculate_agari_index はペース補正時に int(keibajo_code) で失敗する
+    failed |= (zenhan_3f > 0) & ~np.char.isdigit(keibajo_code) & (keibajo_code != '')
+
+    # ペース指数
+    base_pace = (ten_index + agari_index) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pace_ratio = np.where(kohan_3f > 0, zenhan_3f / kohan_3f, 1.0)
+    pace_correction = (pace_ratio - 0.95) * 20.0
+    pace_type_correction = np.select([pace_type == 'H', pace_type == 'S'], [5.0, -5.0], 0.0)
+    pace_index = base_pace + pace_correction + pace_type_correction
+    pace_index = np.clip(pace_index, -100, 100)
+    pace_index = np.where(numpy_scalar, np.round(pace_index, 1), _batch_round(pace_index, 1))
+
+    # 予想脚質
+    past_corners = data['past_corners'] if 'past_corners' in data else None
+    ashishitsu = _batch_ashishitsu(past_corners, wakuban, tosu, kyori)
+
+    indexes = {
+        'ten_index': ten_index,
+        'position_index': position_index,
+        'agari_index': agari_index,
+        'pace_index': pace_index,
+    }
+
+    result = {}
+    if apply_normalization:
+        for index_name in BATCH_INDEX_NAMES:
+            result[f'{index_name}_raw'] = indexes[index_name]
+            result[index_name] = normalize_index_array(index_name, indexes[index_name])
+    else:
+        result.update(indexes)
+
+    result['pace_type'] = pace_type
+    result['ashishitsu'] = ashishitsu
+    result['estimated_ten_3f'] = estimated_ten_3f
+    result['ten_3f_method'] = ten_3f_method.astype(str)
+
+    # 計算エラーになった行は既定値に置き換え
+    if failed.any():
+        for key, value in INDEX_DEFAULTS.items():
+            result[key] = np.where(failed, value, result[key])
+            if f'{key}_raw' in result:
+                result[f'{key}_raw'] = np.where(failed, value, result[f'{key}_raw'])
+        result['estimated_ten_3f'] = np.where(failed, np.nan, result['estimated_ten_3f'])
+        result['ten_3f_method'] = np.where(failed, 'actual', result['ten_3f_method'])
+
+    return result
+
+
+# ============================
+# 10. テスト用メイン関数
 # ============================
 
 if __name__ == "__main__":
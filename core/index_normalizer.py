@@ -22,6 +22,8 @@ from typing import Optional, Tuple
 from sklearn.preprocessing import QuantileTransformer
 import logging
 
+from core.index_normalizer_runtime import QuantileIndexNormalizer
+
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -223,6 +225,8 @@ class RacingIndexNormalizer:
         """
         学習済みモデルを保存
         
+        推論用の分位点テーブル（拡張子を .npz にしたファイル）も同時に書き出す。
+        
         Args:
             filepath: 保存先ファイルパス（.pkl 推奨）
         
@@ -238,6 +242,28 @@ class RacingIndexNormalizer:
         # 保存
         joblib.dump(self, filepath)
         logger.info(f"モデルを保存しました: {filepath}")
+        
+        self.export_runtime(os.path.splitext(filepath)[0] + '.npz')
+    
+    def export_runtime(self, filepath: str) -> QuantileIndexNormalizer:
+        """
+        推論用の分位点テーブルを .npz に書き出す
+        
+        書き出したファイルは QuantileIndexNormalizer.load() で読み込め、
+        scikit-learn なしで transform() と同じ変換ができる。
+        
+        Args:
+            filepath: 保存先ファイルパス（.npz）
+        
+        Returns:
+            書き出した内容の QuantileIndexNormalizer
+        
+        Raises:
+            RuntimeError: fit() が実行されていない場合
+        """
+        runtime = QuantileIndexNormalizer.from_normalizer(self)
+        runtime.save(filepath)
+        return runtime
     
     @classmethod
     def load(cls, filepath: str) -> 'RacingIndexNormalizer':
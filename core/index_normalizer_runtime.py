@@ -0,0 +1,266 @@
+"""
+指数正規化の推論専用ランタイム（NumPyのみ）
+
+RacingIndexNormalizer（core/index_normalizer.py）は推論時も scikit-learn の
+QuantileTransformer を joblib で丸ごと読み込むため、起動が遅くメモリも大きい。
+推論に必要なのは学習済みの分位点テーブル（quantiles_ / references_）だけなので、
+それを .npz に書き出し、同じ変換を NumPy だけで行う。
+
+変換は QuantileTransformer(output_distribution='normal').transform と同じ:
+1. 分位点テーブルで線形補間して累積確率に変換（重複分位点は上下両方向の補間の平均）
+2. 正規分布の逆累積分布関数（Wichura AS241）で Z 値に変換し、境界をクリップ
+3. 4σ基準でスケーリングして目標範囲にクリップ
+
+書き出し: RacingIndexNormalizer.save() / export_runtime()
+          既存の .pkl からの変換は python scripts/export_normalizer_runtime.py
+
+Author: AI戦略家（NAR-AI-YOSO開発チーム）
+"""
+
+import os
+import logging
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 保存形式のバージョン
+RUNTIME_FORMAT_VERSION = 1
+
+# QuantileTransformer と同じ境界の閾値（sklearn.preprocessing._data.BOUNDS_THRESHOLD）
+BOUNDS_THRESHOLD = 1e-7
+
+# AS241（PPND16）の有理関数近似の係数（低次から）
+_PPF_CENTRAL_NUM = np.array([
+    3.3871328727963666080e0, 1.3314166789178437745e2, 1.9715909503065514427e3,
+    1.3731693765509461125e4, 4.5921953931549871457e4, 6.7265770927008700853e4,
+    3.3430575583588128105e4, 2.5090809287301226727e3,
+])
+_PPF_CENTRAL_DEN = np.array([
+    1.0, 4.2313330701600911252e1, 6.8718700749205790830e2,
+    5.3941960214247511077e3, 2.1213794301586595867e4, 3.9307895800092710610e4,
+    2.8729085735721942674e4, 5.2264952788528545610e3,
+])
+_PPF_INTERMEDIATE_NUM = np.array([
+    1.42343711074968357734e0, 4.63033784615654529590e0, 5.76949722146069140550e0,
+    3.64784832476320460504e0, 1.27045825245236838258e0, 2.41780725177450611770e-1,
+    2.27238449892691845833e-2, 7.74545014278341407640e-4,
+])
+_PPF_INTERMEDIATE_DEN = np.array([
+    1.0, 2.05319162663775882187e0, 1.67638483018380384940e0,
+    6.89767334985100004550e-1, 1.48103976427480074590e-1, 1.51986665636164571966e-2,
+    5.47593808499534494600e-4, 1.05075007164441684324e-9,
+])
+_PPF_TAIL_NUM = np.array([
+    6.65790464350110377720e0, 5.46378491116411436990e0, 1.78482653991729133580e0,
+    2.96560571828504891230e-1, 2.65321895265761230930e-2, 1.24266094738807843860e-3,
+    2.71155556874348757815e-5, 2.01033439929228813265e-7,
+])
+_PPF_TAIL_DEN = np.array([
+    1.0, 5.99832206555887937690e-1, 1.36929880922735805310e-1,
+    1.48753612908506148525e-2, 7.86869131145613259100e-4, 1.84631831751005468180e-5,
+    1.42151175831644588870e-7, 2.04426310338993978564e-15,
+])
+
+
+def _polyval(coefficients: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """低次から並んだ係数の多項式を評価（Horner法）"""
+    result = np.zeros_like(x)
+    for coefficient in coefficients[::-1]:
+        result = result * x + coefficient
+    return result
+
+
+def norm_ppf(p) -> np.ndarray:
+    """
+    標準正規分布の逆累積分布関数（scipy.stats.norm.ppf 相当）
+
+    Wichura (1988) AS241 PPND16。相対誤差はおよそ 1e-16。
+
+    Args:
+        p: 確率（0 → -inf, 1 → inf, 範囲外・NaN → NaN）
+
+    Returns:
+        Z 値の配列
+    """
+    p = np.asarray(p, dtype=np.float64)
+    q = p - 0.5
+    result = np.full(p.shape, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        central = np.abs(q) <= 0.425
+        r = 0.180625 - q[central] ** 2
+        result[central] = q[central] * _polyval(_PPF_CENTRAL_NUM, r) / _polyval(_PPF_CENTRAL_DEN, r)
+
+        tail = (np.abs(q) > 0.425) & (p > 0) & (p < 1)
+        r = np.sqrt(-np.log(np.where(q[tail] < 0, p[tail], 1.0 - p[tail])))
+        value = np.where(
+            r <= 5.0,
+            _polyval(_PPF_INTERMEDIATE_NUM, r - 1.6) / _polyval(_PPF_INTERMEDIATE_DEN, r - 1.6),
+            _polyval(_PPF_TAIL_NUM, r - 5.0) / _polyval(_PPF_TAIL_DEN, r - 5.0)
+        )
+        result[tail] = np.where(q[tail] < 0, -value, value)
+
+    result[p == 0] = -np.inf
+    result[p == 1] = np.inf
+    return result
+
+
+# QuantileTransformer が Z 値をクリップする範囲（逆変換と整合させるため ±∞ にしない）
+_Z_CLIP_MIN, _Z_CLIP_MAX = norm_ppf([
+    BOUNDS_THRESHOLD - np.spacing(1),
+    1 - (BOUNDS_THRESHOLD - np.spacing(1))
+])
+
+
+class QuantileIndexNormalizer:
+    """
+    RacingIndexNormalizer の推論専用版（分位点テーブル + NumPy）
+
+    transform() の結果は RacingIndexNormalizer.transform() と一致する
+    （正規分布の逆累積分布関数の近似誤差 1e-16 程度を除く）。
+
+    使用例:
+        normalizer = QuantileIndexNormalizer.load('models/normalizers/ten_index_normalizer.npz')
+        normalized_values = normalizer.transform(raw_values)
+    """
+
+    # RacingIndexNormalizer と同じく学習済みとして扱う
+    is_fitted = True
+
+    def __init__(
+        self,
+        quantiles: np.ndarray,
+        references: np.ndarray,
+        scale_factor: float,
+        target_range: Tuple[float, float] = (-100, 100)
+    ):
+        """
+        初期化
+
+        Args:
+            quantiles: 分位点（QuantileTransformer.quantiles_ の1列）
+            references: 分位点に対応する累積確率（QuantileTransformer.references_）
+            scale_factor: スケーリング係数（target_range[1] / sigma_cap）
+            target_range: 目標範囲
+        """
+        self.quantiles = np.asarray(quantiles, dtype=np.float64).reshape(-1)
+        self.references = np.asarray(references, dtype=np.float64).reshape(-1)
+        if len(self.quantiles) != len(self.references) or len(self.quantiles) == 0:
+            raise ValueError(
+                f"分位点テーブルが不正です: quantiles={len(self.quantiles)}, references={len(self.references)}"
+            )
+        self.scale_factor = float(scale_factor)
+        self.target_range = (float(target_range[0]), float(target_range[1]))
+
+        # 重複分位点の下側からの補間用（毎回反転しない）
+        self._reversed_quantiles = -self.quantiles[::-1]
+        self._reversed_references = -self.references[::-1]
+
+    @classmethod
+    def from_normalizer(cls, normalizer) -> 'QuantileIndexNormalizer':
+        """
+        学習済みの RacingIndexNormalizer から作成
+
+        Raises:
+            RuntimeError: fit() が実行されていない場合
+            ValueError: output_distribution が 'normal' でない場合
+        """
+        if not normalizer.is_fitted:
+            raise RuntimeError("fit() を先に実行してください")
+        if normalizer.qt.output_distribution != 'normal':
+            raise ValueError(f"未対応の output_distribution: {normalizer.qt.output_distribution}")
+
+        return cls(
+            quantiles=normalizer.qt.quantiles_[:, 0],
+            references=normalizer.qt.references_,
+            scale_factor=normalizer.scale_factor,
+            target_range=normalizer.target_range
+        )
+
+    def transform(self, X) -> np.ndarray:
+        """
+        指数を正規化
+
+        Args:
+            X: shape (n_samples,) or (n_samples, 1) の指数データ
+
+        Returns:
+            正規化済み指数（NaN は NaN のまま）
+        """
+        X = np.array(X, dtype=np.float64)
+        if X.ndim == 2 and X.shape[1] == 1:
+            X = X.reshape(-1)
+        elif X.ndim > 1:
+            raise ValueError(f"入力は1次元配列である必要があります: shape={X.shape}")
+
+        if len(X) == 0:
+            return np.array([])
+
+        # Step 1: 累積確率に変換（境界の外側は 0 / 1）
+        with np.errstate(invalid='ignore'):
+            lower = X - BOUNDS_THRESHOLD < self.quantiles[0]
+            upper = X + BOUNDS_THRESHOLD > self.quantiles[-1]
+
+        finite = ~np.isnan(X)
+        values = X[finite]
+        X[finite] = 0.5 * (
+            np.interp(values, self.quantiles, self.references)
+            - np.interp(-values, self._reversed_quantiles, self._reversed_references)
+        )
+        X[upper] = 1
+        X[lower] = 0
+
+        # Step 2: 正規分布へ変換 Z ~ N(0, 1)
+        z_scores = np.clip(norm_ppf(X), _Z_CLIP_MIN, _Z_CLIP_MAX)
+
+        # Step 3: 目標範囲へスケーリングしてクリップ
+        return np.clip(z_scores * self.scale_factor, self.target_range[0], self.target_range[1])
+
+    def save(self, filepath: str):
+        """
+        分位点テーブルを .npz に保存
+
+        Args:
+            filepath: 保存先ファイルパス（.npz）
+        """
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        np.savez_compressed(
+            filepath,
+            version=RUNTIME_FORMAT_VERSION,
+            quantiles=self.quantiles,
+            references=self.references,
+            scale_factor=self.scale_factor,
+            target_range=np.asarray(self.target_range)
+        )
+        logger.info(f"正規化テーブルを保存しました: {filepath}")
+
+    @classmethod
+    def load(cls, filepath: str) -> 'QuantileIndexNormalizer':
+        """
+        .npz から読み込み
+
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+            ValueError: 保存形式のバージョンが異なる場合
+        """
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"正規化テーブルが見つかりません: {filepath}")
+
+        with np.load(filepath) as data:
+            version = int(data['version'])
+            if version != RUNTIME_FORMAT_VERSION:
+                raise ValueError(f"未対応の正規化テーブルの形式です: version={version}")
+            normalizer = cls(
+                quantiles=data['quantiles'],
+                references=data['references'],
+                scale_factor=float(data['scale_factor']),
+                target_range=tuple(data['target_range'])
+            )
+
+        logger.info(f"正規化テーブルを読み込みました: {filepath}")
+        return normalizer
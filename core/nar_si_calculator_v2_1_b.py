@@ -127,29 +127,45 @@ def calculate_nar_si_v2_1_b(conn, horse_data, race_info):
     }
 
 
-def predict_race_with_nar_si_v2_1_b(conn, kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango):
+def predict_race_with_nar_si_v2_1_b(conn, kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango,
+                                    race_infos=None):
     """
     NAR-SI Ver.2.1-Bでレース予測
+    
+    Args:
+        race_infos: 開催日の共有レース情報 {(keibajo_code, race_bango): nvd_ra行}
+            （get_race_infos_by_date の戻り値）。指定時はレース情報のクエリを省略する
     """
     from psycopg2.extras import RealDictCursor
     cursor = conn.cursor(cursor_factory=RealDictCursor)
     
     # レース情報を取得
-    cursor.execute("""
-        SELECT DISTINCT
-            ra.kyori,
-            ra.track_code,
-            ra.babajotai_code_dirt AS babajotai_code,
-            ra.kyoso_joken_code,
-            ra.hasso_jikoku AS hassoujikoku
-        FROM nvd_ra ra
-        WHERE ra.kaisai_nen = %s
-          AND ra.kaisai_tsukihi = %s
-          AND ra.keibajo_code = %s
-          AND ra.race_bango = %s
-    """, (kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango))
+    if race_infos is not None:
+        ra_row = race_infos.get((keibajo_code, race_bango))
+        race_info_row = {
+            'kyori': ra_row['kyori'],
+            'track_code': ra_row['track_code'],
+            'babajotai_code': ra_row['babajotai_code_dirt'],
+            'kyoso_joken_code': ra_row['kyoso_joken_code'],
+            'hassoujikoku': ra_row['hasso_jikoku']
+        } if ra_row else None
+    else:
+        cursor.execute("""
+            SELECT DISTINCT
+                ra.kyori,
+                ra.track_code,
+                ra.babajotai_code_dirt AS babajotai_code,
+                ra.kyoso_joken_code,
+                ra.hasso_jikoku AS hassoujikoku
+            FROM nvd_ra ra
+            WHERE ra.kaisai_nen = %s
+              AND ra.kaisai_tsukihi = %s
+              AND ra.keibajo_code = %s
+              AND ra.race_bango = %s
+        """, (kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango))
+        
+        race_info_row = cursor.fetchone()
     
-    race_info_row = cursor.fetchone()
     if not race_info_row:
         return []
     
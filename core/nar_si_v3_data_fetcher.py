@@ -18,6 +18,8 @@ sys.path.append('E:/UmaData/nar-analytics-python')
 
 from config.db_config import get_db_connection
 from psycopg2.extras import RealDictCursor
+from core.sql_conditions import build_date_sql_condition
+from core.data_fetcher import get_race_infos_by_date
 
 
 def get_previous_3_races(conn, ketto_toroku_bango, current_kaisai_nen, current_kaisai_tsukihi):
@@ -53,8 +55,9 @@ def get_previous_3_races(conn, ketto_toroku_bango, current_kaisai_nen, current_k
     
     # 今回のレースより前のデータを取得
     current_date = current_kaisai_nen + current_kaisai_tsukihi
+    date_condition, date_params = build_date_sql_condition('se', '<', current_date)
     
-    query = """
+    query = f"""
     SELECT 
         se.kaisai_nen,
         se.kaisai_tsukihi,
@@ -76,7 +79,7 @@ def get_previous_3_races(conn, ketto_toroku_bango, current_kaisai_nen, current_k
         se.keibajo_code = ra.keibajo_code AND
         se.race_bango = ra.race_bango
     WHERE se.ketto_toroku_bango = %s
-      AND (se.kaisai_nen || se.kaisai_tsukihi) < %s
+      AND {date_condition}
       AND se.kakutei_chakujun IS NOT NULL
       AND se.kakutei_chakujun != ''
       AND se.keibajo_code != '83'  -- ばんえい競馬除外
@@ -84,15 +87,36 @@ def get_previous_3_races(conn, ketto_toroku_bango, current_kaisai_nen, current_k
     LIMIT 3
     """
     
-    cursor.execute(query, (ketto_toroku_bango, current_date))
+    cursor.execute(query, [ketto_toroku_bango] + date_params)
     results = cursor.fetchall()
     cursor.close()
     
     return results
 
 
+def get_cached_race_infos(conn, kaisai_date, race_infos_by_date):
+    """
+    開催日の共有レース情報を取得（開催日ごとに1回だけ get_race_infos_by_date を実行）
+    
+    同じ競馬場の馬は同じ開催日に出走していることが多いため、
+    race_infos_by_date を複数の馬で共有すると過去走のレース情報のクエリをまとめられる。
+    
+    Args:
+        conn: データベース接続
+        kaisai_date: 開催日（YYYYMMDD形式）
+        race_infos_by_date: {開催日: get_race_infos_by_date の戻り値}（取得した開催日を追加する）
+    
+    Returns:
+        dict: {(keibajo_code, race_bango): レース情報}
+    """
+    race_infos = race_infos_by_date.get(kaisai_date)
+    if race_infos is None:
+        race_infos = race_infos_by_date[kaisai_date] = get_race_infos_by_date(conn, kaisai_date)
+    return race_infos
+
+
 def calculate_nar_si_for_race(conn, kaisai_nen, kaisai_tsukihi, keibajo_code, 
-                                race_bango, umaban):
+                                race_bango, umaban, race_infos=None):
     """
     特定のレースの特定の馬のNAR-SIを計算
     
@@ -103,6 +127,8 @@ def calculate_nar_si_for_race(conn, kaisai_nen, kaisai_tsukihi, keibajo_code,
         keibajo_code: 競馬場コード
         race_bango: レース番号
         umaban: 馬番
+        race_infos: 開催日の共有レース情報（get_race_infos_by_date の戻り値。
+            省略時は predict_race_with_nar_si_v2_1_b がレースごとに取得）
     
     Returns:
         float: NAR-SI値（計算できない場合はNone）
@@ -113,7 +139,8 @@ def calculate_nar_si_for_race(conn, kaisai_nen, kaisai_tsukihi, keibajo_code,
     try:
         # レース全体を予測
         predictions = predict_race_with_nar_si_v2_1_b(
-            conn, kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango
+            conn, kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango,
+            race_infos=race_infos
         )
         
         if not predictions:
@@ -198,7 +225,7 @@ def get_previous_3_races_with_nar_si_fast(conn, ketto_toroku_bango, current_kais
 
 
 def get_previous_3_races_with_nar_si(conn, ketto_toroku_bango, current_kaisai_nen, 
-                                      current_kaisai_tsukihi):
+                                      current_kaisai_tsukihi, race_infos_by_date=None):
     """
     過去3走のデータとNAR-SIを取得
     
@@ -207,6 +234,8 @@ def get_previous_3_races_with_nar_si(conn, ketto_toroku_bango, current_kaisai_ne
         ketto_toroku_bango: 血統登録番号
         current_kaisai_nen: 今回の開催年
         current_kaisai_tsukihi: 今回の開催月日
+        race_infos_by_date: 過去走の開催日ごとの共有レース情報（get_cached_race_infos を参照）。
+            複数の馬で同じ dict を渡すと開催日ごとのクエリを共有できる
     
     Returns:
         list: 過去3走のデータ（NAR-SI付き）
@@ -231,17 +260,24 @@ def get_previous_3_races_with_nar_si(conn, ketto_toroku_bango, current_kaisai_ne
     if not past_races:
         return []
     
+    if race_infos_by_date is None:
+        race_infos_by_date = {}
+    
     # 各過去走に対してNAR-SIを計算
     results = []
     for race in past_races:
-        # NAR-SI を正しく計算
+        # NAR-SI を正しく計算（レース情報は開催日ごとの共有マップから取得）
+        race_infos = get_cached_race_infos(
+            conn, race['kaisai_nen'] + race['kaisai_tsukihi'], race_infos_by_date
+        )
         nar_si_value = calculate_nar_si_for_race(
             conn,
             race['kaisai_nen'],
             race['kaisai_tsukihi'],
             race['keibajo_code'],
             race['race_bango'],
-            race['umaban']
+            race['umaban'],
+            race_infos=race_infos
         )
         
         results.append({
@@ -190,7 +190,7 @@ def save_all_predictions(all_predictions, race_infos, target_date, base_output_d
     
     Args:
         all_predictions: 全レースの予想結果（競馬場別）
-        race_infos: 全レースのレース情報
+        race_infos: 全レースのレース情報 {(keibajo_code, race_bango): レース情報}
         target_date: 対象日付（YYYYMMDD形式）
         base_output_dir: ベース出力ディレクトリ
     
@@ -217,8 +217,7 @@ def save_all_predictions(all_predictions, race_infos, target_date, base_output_d
             predictions = race['predictions']
             
             # レース情報取得
-            race_key = f"{keibajo_code}_{race_bango}"
-            race_info = race_infos.get(race_key)
+            race_info = race_infos.get((keibajo_code, race_bango))
             
             # 予想テキスト生成
             race_data = {
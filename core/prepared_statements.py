@@ -0,0 +1,242 @@
+"""
+サーバー側プリペアドステートメント実行モジュール
+
+ファクター統計のクエリは値だけが異なる同じSQLを数千回実行する。
+psycopg2 は値を埋め込んだSQL文字列を毎回送るため、PostgreSQL は毎回計画し直す。
+このモジュールではSQLテンプレート（%s プレースホルダ）を接続ごとに1回だけ
+PREPARE し、以降は EXECUTE で値だけを渡して計画を再利用する。
+
+ステートメント名はSQLテキストのハッシュから作るため、同じテンプレートは
+同じ名前になる（値を埋め込んだSQLを渡すと値ごとに別の名前になり、効果がない）。
+
+PostgreSQL（plan_cache_mode = auto）は最初の数回はカスタムプランを作り、
+以降は汎用プランを使い回す。計画時間の削減量は PREPARE 時に EXPLAIN で
+測った計画時間 × 再計画を省けた実行回数で推定する（get_prepared_statement_stats）。
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# False にすると PREPARE せず、従来どおりSQLを直接実行する
+PREPARED_STATEMENTS_ENABLED = True
+
+# PREPARE 時に EXPLAIN で計画時間を測定する（削減量の推定に使用）
+MEASURE_PLANNING_TIME = True
+
+# plan_cache_mode = auto でカスタムプランが作られる実行回数
+CUSTOM_PLAN_EXECUTIONS = 5
+
+_PLACEHOLDER = re.compile(r'%%|%s')
+
+# 計画時間の測定（EXPLAIN）を囲むセーブポイント名
+_MEASURE_SAVEPOINT = 'prepared_planning_time'
+
+# 接続 → {ステートメント名: その接続での実行回数}
+_prepared_by_conn = weakref.WeakKeyDictionary()
+
+# ステートメント名 → 統計
+_stats = {}
+_lock = threading.Lock()
+
+
+def to_positional(query):
+    """
+    psycopg2 形式のプレースホルダ（%s）を PREPARE 用の $1, $2, ... に変換
+
+    Args:
+        query: SQL（%s プレースホルダ、% のエスケープは %%）
+
+    Returns:
+        tuple: (変換後のSQL, パラメータ数)
+    """
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group(0) == '%%':
+            return '%'
+        count += 1
+        return f'${count}'
+
+    return _PLACEHOLDER.sub(replace, query), count
+
+
+def statement_name(prefix, query):
+    """
+    SQLテンプレートからステートメント名を生成（同じSQLは同じ名前）
+
+    Args:
+        prefix: 名前の接頭辞（英数字とアンダースコア）
+        query: SQLテンプレート
+
+    Returns:
+        str: ステートメント名
+    """
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+    return f"{prefix}_{digest}"
+
+
+def execute_prepared(cur, prefix, query, params):
+    """
+    SQLテンプレートをプリペアドステートメントとして実行
+
+    接続で未準備なら PREPARE してから EXECUTE する。結果は cur から fetch する。
+
+    Args:
+        cur: カーソル
+        prefix: ステートメント名の接頭辞（集計時の分類にも使う）
+        query: SQLテンプレート（値は %s プレースホルダで渡すこと）
+        params: パラメータのリスト
+    """
+    params = list(params)
+    if not PREPARED_STATEMENTS_ENABLED:
+        cur.execute(query, params)
+        return
+
+    conn = cur.connection
+    name = statement_name(prefix, query)
+
+    with _lock:
+        prepared = _prepared_by_conn.setdefault(conn, {})
+        needs_prepare = name not in prepared
+
+    placeholders = ', '.join(['%s'] * len(params))
+    execute_sql = f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}"
+
+    if needs_prepare:
+        positional, count = to_positional(query)
+        if count != len(params):
+            raise ValueError(f"パラメータ数が一致しません: {prefix}（SQL {count}個, 値 {len(params)}個）")
+        cur.execute(f"PREPARE {name} AS {positional}")
+        # PREPARE はロールバックされないため、成功した時点で準備済みとして記録する
+        with _lock:
+            prepared[name] = 0
+        planning_ms = _measure_planning_time(conn, execute_sql, params)
+        with _lock:
+            stats = _statement_stats(name, prefix)
+            stats['prepares'] += 1
+            if planning_ms is not None:
+                stats['planning_ms_total'] += planning_ms
+                stats['planning_samples'] += 1
+
+    cur.execute(execute_sql, params)
+
+    with _lock:
+        prepared[name] += 1
+        stats = _statement_stats(name, prefix)
+        stats['executions'] += 1
+        if prepared[name] > CUSTOM_PLAN_EXECUTIONS:
+            stats['reused'] += 1
+
+
+def _statement_stats(name, prefix):
+    """
+    ステートメントの統計レコードを取得（なければ作成。_lock 保持中に呼ぶこと）
+    """
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = {
+            'prefix': prefix, 'prepares': 0, 'executions': 0,
+            'planning_ms_total': 0.0, 'planning_samples': 0, 'reused': 0
+        }
+    return stats
+
+
+def _measure_planning_time(conn, execute_sql, params):
+    """
+    EXPLAIN (SUMMARY) で1回分の計画時間（ミリ秒）を測定（実行はしない）
+
+    呼び出し側のトランザクション内で実行するため SAVEPOINT で囲み、
+    EXPLAIN が失敗してもトランザクションを中断状態にしない（測定値なしで続行）。
+    """
+    if not MEASURE_PLANNING_TIME:
+        return None
+
+    use_savepoint = not conn.autocommit
+    with conn.cursor() as cur:
+        if use_savepoint:
+            cur.execute(f"SAVEPOINT {_MEASURE_SAVEPOINT}")
+        try:
+            cur.execute(f"EXPLAIN (SUMMARY ON, FORMAT JSON) {execute_sql}", params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            planning_ms = float(plan[0]['Planning Time'])
+        except Exception as e:
+            if use_savepoint:
+                cur.execute(f"ROLLBACK TO SAVEPOINT {_MEASURE_SAVEPOINT}")
+            logger.warning(f"計画時間の測定エラー: {e}")
+            planning_ms = None
+        if use_savepoint:
+            cur.execute(f"RELEASE SAVEPOINT {_MEASURE_SAVEPOINT}")
+
+    return planning_ms
+
+
+def get_prepared_statement_stats():
+    """
+    プリペアドステートメントの実行統計を取得
+
+    Returns:
+        dict: {
+            'statements': 準備したテンプレート数,
+            'prepares': PREPARE 回数（接続 × テンプレート）,
+            'executions': EXECUTE 回数,
+            'reused': 汎用プランで再計画を省けた実行回数（推定上限）,
+            'avg_planning_ms': 1回あたりの計画時間（ミリ秒、測定値の加重平均）,
+            'saved_planning_ms': 削減できた計画時間（ミリ秒、推定）,
+            'by_prefix': {接頭辞: {'executions', 'reused', 'saved_planning_ms'}}
+        }
+    """
+    with _lock:
+        rows = [dict(stats) for stats in _stats.values()]
+
+    total = {
+        'statements': len(rows), 'prepares': 0, 'executions': 0, 'reused': 0,
+        'avg_planning_ms': 0.0, 'saved_planning_ms': 0.0, 'by_prefix': {}
+    }
+    planning_total = 0.0
+    planning_samples = 0
+
+    for stats in rows:
+        avg_ms = (
+            stats['planning_ms_total'] / stats['planning_samples']
+            if stats['planning_samples'] else 0.0
+        )
+        saved_ms = avg_ms * stats['reused']
+
+        total['prepares'] += stats['prepares']
+        total['executions'] += stats['executions']
+        total['reused'] += stats['reused']
+        total['saved_planning_ms'] += saved_ms
+        planning_total += stats['planning_ms_total']
+        planning_samples += stats['planning_samples']
+
+        group = total['by_prefix'].setdefault(
+            stats['prefix'], {'executions': 0, 'reused': 0, 'saved_planning_ms': 0.0}
+        )
+        group['executions'] += stats['executions']
+        group['reused'] += stats['reused']
+        group['saved_planning_ms'] += saved_ms
+
+    if planning_samples:
+        total['avg_planning_ms'] = round(planning_total / planning_samples, 3)
+    total['saved_planning_ms'] = round(total['saved_planning_ms'], 1)
+    for group in total['by_prefix'].values():
+        group['saved_planning_ms'] = round(group['saved_planning_ms'], 1)
+
+    return total
+
+
+def reset_prepared_statement_stats():
+    """
+    実行統計を破棄（準備済みステートメント自体は接続に残る）
+    """
+    with _lock:
+        _stats.clear()
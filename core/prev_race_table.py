@@ -0,0 +1,168 @@
+"""
+前走テーブル（nar_prev_race）モジュール
+
+prev_* ファクター（前走着順・前走人気・前走距離・休養週数など）は nvd_se の1行だけでは
+条件化できないため、従来は条件なし（1=1）で競馬場の全出走を集計していた。
+このモジュールでは出走ごとの前走情報を LAG で事前計算した nar_prev_race を
+nvd_se に結合し、prev_* ファクターを (競馬場, 前走の値) のインデックス検索で絞り込む。
+
+前走は factor_extractor.get_previous_race_data と同じく競馬場を問わない直前の出走
+（着順確定済み・今走より前の最新走、競馬場コード61は除外）。
+前走人気は tansho_ninkijun、前走馬場は babajotai_code_dirt（F04_baba と同じ列）。
+
+テーブルの構築: python scripts/build_prev_race_table.py --rebuild
+差分の反映:     python scripts/build_prev_race_table.py
+"""
+
+PREV_RACE_TABLE = 'nar_prev_race'
+
+# ファクター条件で nar_prev_race を参照するときの別名
+PREV_RACE_ALIAS = 'pr'
+
+# 値で絞り込む前走ファクター（ファクター名 = nar_prev_race の列名。値はすべて文字列で保持）
+PREV_RACE_FACTOR_COLUMNS = (
+    'prev_chakujun',
+    'prev_ninkijun',
+    'prev_kyori',
+    'prev_baba',
+    'prev_wakuban',
+    'prev_corner_1',
+    'prev_corner_2',
+    'prev_corner_3',
+    'prev_corner_4',
+    'prev_time_sa',
+    'prev_kohan_3f',
+    'kyuyo_weeks',
+)
+
+# nar_prev_race の列 → LAG を取る出走側の式（nvd_se se / nvd_ra ra）
+PREV_RACE_SOURCE_COLUMNS = {
+    'prev_chakujun': 'se.kakutei_chakujun',
+    'prev_ninkijun': 'se.tansho_ninkijun',
+    'prev_kyori': 'ra.kyori',
+    'prev_baba': 'ra.babajotai_code_dirt',
+    'prev_wakuban': 'se.wakuban',
+    'prev_corner_1': 'se.corner_1',
+    'prev_corner_2': 'se.corner_2',
+    'prev_corner_3': 'se.corner_3',
+    'prev_corner_4': 'se.corner_4',
+    'prev_time_sa': 'se.time_sa',
+    'prev_kohan_3f': 'se.kohan_3f',
+    'prev_race_date': 'se.kaisai_nen || se.kaisai_tsukihi',
+}
+
+_prev_race_available = None
+
+
+def uses_prev_race(*sql_fragments):
+    """
+    SQL断片が nar_prev_race（別名 pr）を参照しているかを判定
+    """
+    marker = f"{PREV_RACE_ALIAS}."
+    return any(fragment and marker in fragment for fragment in sql_fragments)
+
+
+def build_prev_race_join_sql(se_alias='se'):
+    """
+    nvd_se への nar_prev_race の結合（LEFT JOIN）を生成
+
+    Args:
+        se_alias: nvd_se の別名
+
+    Returns:
+        str: LEFT JOIN 句
+    """
+    return f"""
+    LEFT JOIN {PREV_RACE_TABLE} {PREV_RACE_ALIAS} ON
+        {PREV_RACE_ALIAS}.kaisai_nen = {se_alias}.kaisai_nen AND
+        {PREV_RACE_ALIAS}.kaisai_tsukihi = {se_alias}.kaisai_tsukihi AND
+        {PREV_RACE_ALIAS}.keibajo_code = {se_alias}.keibajo_code AND
+        {PREV_RACE_ALIAS}.race_bango = {se_alias}.race_bango AND
+        {PREV_RACE_ALIAS}.umaban = {se_alias}.umaban"""
+
+
+def build_prev_race_select_sql(condition):
+    """
+    LAG で出走ごとの前走情報を計算するSELECT文を生成
+
+    確定済みの出走（競馬場コード61以外）を血統登録番号ごとに開催日順に並べ、
+    直前の出走（競馬場は問わない）の値を prev_* 列として付与する。
+    condition は LAG を計算する母集団の絞り込み
+    （馬単位で絞ること。競馬場などで途中の出走を除くと前走がずれる）。
+
+    Args:
+        condition: 追加の絞り込み条件（nvd_se の別名は se）
+
+    Returns:
+        str: nar_prev_race と同じ列（updated_at を除く）を返すSELECT文
+    """
+    lag_columns = ',\n            '.join(
+        f"LAG({expression}) OVER w AS {column}"
+        for column, expression in PREV_RACE_SOURCE_COLUMNS.items()
+    )
+    return f"""
+    SELECT
+        lagged.*,
+        CASE WHEN lagged.prev_race_date IS NULL THEN NULL
+             ELSE GREATEST(
+                 (to_date(lagged.kaisai_nen || lagged.kaisai_tsukihi, 'YYYYMMDD')
+                  - to_date(lagged.prev_race_date, 'YYYYMMDD')) / 7, 0)::text
+        END AS kyuyo_weeks
+    FROM (
+        SELECT
+            se.kaisai_nen,
+            se.kaisai_tsukihi,
+            se.keibajo_code,
+            se.race_bango,
+            se.umaban,
+            se.ketto_toroku_bango,
+            {lag_columns}
+        FROM nvd_se se
+        JOIN nvd_ra ra ON
+            se.keibajo_code = ra.keibajo_code AND
+            se.kaisai_nen = ra.kaisai_nen AND
+            se.kaisai_tsukihi = ra.kaisai_tsukihi AND
+            se.race_bango = ra.race_bango
+        WHERE
+            se.keibajo_code != '61' AND
+            se.kakutei_chakujun IS NOT NULL AND
+            se.kakutei_chakujun != '' AND
+            {condition}
+        WINDOW w AS (
+            PARTITION BY se.ketto_toroku_bango
+            ORDER BY se.kaisai_nen, se.kaisai_tsukihi, se.race_bango
+        )
+    ) lagged
+    """
+
+
+def is_prev_race_table_available(conn):
+    """
+    前走テーブルが構築済みかを確認（結果はプロセス内でキャッシュ）
+
+    Args:
+        conn: データベース接続
+
+    Returns:
+        bool: テーブルが存在し、1行以上あれば True
+    """
+    global _prev_race_available
+
+    if _prev_race_available is None:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (PREV_RACE_TABLE,))
+            exists = cur.fetchone()[0]
+            if exists:
+                cur.execute(f"SELECT EXISTS (SELECT 1 FROM {PREV_RACE_TABLE})")
+                exists = cur.fetchone()[0]
+        _prev_race_available = exists
+
+    return _prev_race_available
+
+
+def reset_prev_race_availability():
+    """
+    前走テーブル有無のキャッシュを破棄（テーブル構築直後などに使用）
+    """
+    global _prev_race_available
+    _prev_race_available = None
@@ -0,0 +1,81 @@
+"""
+SQL条件構築モジュール（開催日付）
+
+nvd_se / nvd_ra / nvd_o1 の開催日は kaisai_nen（YYYY）と kaisai_tsukihi（MMDD）の
+2列に分かれている。`kaisai_nen || kaisai_tsukihi < '20250105'` のような連結式は
+B-treeインデックスを使えず全件走査になるため、
+(kaisai_nen, kaisai_tsukihi) の行値比較に書き換えた条件を生成する。
+
+両列とも固定長（4桁）の文字列なので、行値比較の結果は連結文字列の比較と一致する。
+対応する複合インデックスは sql/create_date_indexes.sql で作成する。
+"""
+
+DATE_OPERATORS = ('=', '<', '<=', '>', '>=')
+
+
+def split_date(date):
+    """
+    YYYYMMDD形式の日付を (kaisai_nen, kaisai_tsukihi) に分割
+
+    Args:
+        date: 日付（YYYYMMDD形式の文字列）
+
+    Returns:
+        tuple: (kaisai_nen, kaisai_tsukihi)
+    """
+    date = str(date)
+    if len(date) != 8 or not date.isdigit():
+        raise ValueError(f"日付はYYYYMMDD形式で指定してください: {date!r}")
+    return date[:4], date[4:]
+
+
+def _columns(alias):
+    prefix = f"{alias}." if alias else ""
+    return f"{prefix}kaisai_nen", f"{prefix}kaisai_tsukihi"
+
+
+def build_date_sql_condition(alias, operator, date):
+    """
+    開催日の比較条件（インデックス利用可能）を生成
+
+    例: build_date_sql_condition('se', '<', '20250105')
+        → "(se.kaisai_nen, se.kaisai_tsukihi) < (%s, %s)", ['2025', '0105']
+
+    Args:
+        alias: テーブル別名（'se', 'ra' など。None の場合は列名のみ）
+        operator: 比較演算子（'=', '<', '<=', '>', '>='）
+        date: 比較する日付（YYYYMMDD形式）
+
+    Returns:
+        tuple: (WHERE条件文字列, パラメータリスト)
+    """
+    if operator not in DATE_OPERATORS:
+        raise ValueError(f"未対応の比較演算子です: {operator!r}")
+
+    nen_col, tsukihi_col = _columns(alias)
+    kaisai_nen, kaisai_tsukihi = split_date(date)
+
+    if operator == '=':
+        return f"{nen_col} = %s AND {tsukihi_col} = %s", [kaisai_nen, kaisai_tsukihi]
+
+    return (
+        f"({nen_col}, {tsukihi_col}) {operator} (%s, %s)",
+        [kaisai_nen, kaisai_tsukihi]
+    )
+
+
+def build_date_range_sql_condition(alias, start_date, end_date):
+    """
+    開催日の範囲条件（両端を含む、BETWEEN 相当）を生成
+
+    Args:
+        alias: テーブル別名（None の場合は列名のみ）
+        start_date: 開始日（YYYYMMDD形式）
+        end_date: 終了日（YYYYMMDD形式）
+
+    Returns:
+        tuple: (WHERE条件文字列, パラメータリスト)
+    """
+    start_condition, start_params = build_date_sql_condition(alias, '>=', start_date)
+    end_condition, end_params = build_date_sql_condition(alias, '<=', end_date)
+    return f"{start_condition} AND {end_condition}", start_params + end_params
@@ -15,7 +15,8 @@ import pandas as pd
 import os
 from typing import Dict, Optional, Any
 import logging
-from config.base_times import get_base_time
+from config.base_times import get_base_time, get_base_times
+from core.tree_model_runtime import TreeEnsembleModel
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
@@ -57,6 +58,9 @@ class Ten3FEstimator:
     STALKER_CORRECTION = 0.0   # 中団: 標準ペース
     CLOSER_CORRECTION = 0.5    # 後方（差し馬）: 前半ペースが遅い
     
+    # Layer 3 の特徴量の数（_engineer_features の列数）
+    NUM_FEATURES = 9
+    
     def __init__(self, ml_model: Optional[Any] = None):
         """
         初期化
@@ -79,9 +83,39 @@ class Ten3FEstimator:
         except Exception as e:
             logger.warning(f"Failed to load standard times by class: {e}")
             self.standard_times_by_class = None
+        self.index_standard_times()
         
         logger.info("Ten3FEstimator initialized")
     
+    def load_model(self, model_path: str):
+        """
+        Layer 3 の機械学習モデルを読み込み
+        
+        拡張子を .npz にしたファイル（TreeEnsembleModel）があればそれを使い、lightgbm を読み込まない。
+        ない場合は従来の .pkl を joblib で読み込む。
+        
+        Args:
+            model_path: モデルファイルパス（.pkl）
+        
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+            ValueError: モデルの特徴量の数が NUM_FEATURES と一致しない場合
+        """
+        runtime_path = os.path.splitext(model_path)[0] + '.npz'
+        if os.path.exists(runtime_path):
+            model = TreeEnsembleModel.load(runtime_path)
+        elif os.path.exists(model_path):
+            import joblib
+            model = joblib.load(model_path)
+        else:
+            raise FileNotFoundError(f"モデルが見つかりません: {model_path}")
+        
+        num_features = getattr(model, 'n_features_in_', None)
+        if num_features is not None and num_features != self.NUM_FEATURES:
+            raise ValueError(f"特徴量の数が一致しません: モデル={num_features}, 推定器={self.NUM_FEATURES}")
+        
+        self.ml_model = model
+    
     def estimate_baseline(
         self,
         time_seconds: float,
@@ -203,6 +237,25 @@ class Ten3FEstimator:
         else:
             return '一般戦'
     
+    def index_standard_times(self):
+        """
+        標準走破タイムを (競馬場コード, 距離, クラス) をキーとする辞書に展開
+        
+        standard_times_by_class を差し替えた場合は再度呼び出す。
+        キーは CSV を読み込んだ値のまま（競馬場コード・距離は整数）で、
+        同じキーが複数行ある場合は先頭の行を使う。
+        """
+        self.standard_time_index = {}
+        if self.standard_times_by_class is None:
+            return
+        
+        df = self.standard_times_by_class
+        for key, std_time in zip(
+            zip(df['競馬場コード'].tolist(), df['距離(m)'].tolist(), df['クラス'].tolist()),
+            df['基準タイム(秒)'].tolist()
+        ):
+            self.standard_time_index.setdefault(key, std_time)
+    
     def _get_standard_total_time(
         self,
         keibajo_code: str,
@@ -223,35 +276,45 @@ class Ten3FEstimator:
         if self.standard_times_by_class is None:
             return None
         
-        # クラス名を取得
+        # クラス別データを検索
         if grade_code:
             class_name = self._get_class_name(grade_code)
-            
-            # クラス別データを検索
-            row = self.standard_times_by_class[
-                (self.standard_times_by_class['競馬場コード'] == keibajo_code) &
-                (self.standard_times_by_class['距離(m)'] == kyori) &
-                (self.standard_times_by_class['クラス'] == class_name)
-            ]
-            
-            if not row.empty:
-                std_time = row.iloc[0]['基準タイム(秒)']
+            std_time = self.standard_time_index.get((keibajo_code, kyori, class_name))
+            if std_time is not None:
                 logger.debug(f"Standard total time: {keibajo_code} {kyori}m {class_name} = {std_time:.2f}秒")
                 return std_time
         
         # フォールバック: クラス混合（一般戦を使用）
-        row = self.standard_times_by_class[
-            (self.standard_times_by_class['競馬場コード'] == keibajo_code) &
-            (self.standard_times_by_class['距離(m)'] == kyori) &
-            (self.standard_times_by_class['クラス'] == '一般戦')
-        ]
-        
-        if not row.empty:
-            std_time = row.iloc[0]['基準タイム(秒)']
+        std_time = self.standard_time_index.get((keibajo_code, kyori, '一般戦'))
+        if std_time is not None:
             logger.debug(f"Standard total time (fallback): {keibajo_code} {kyori}m 一般戦 = {std_time:.2f}秒")
-            return std_time
+        return std_time
+    
+    def get_standard_total_times(self, keibajo_codes, kyori, grade_codes=None) -> np.ndarray:
+        """
+        標準走破タイムを配列でまとめて取得（_get_standard_total_time の配列版）
+        
+        Args:
+            keibajo_codes: 競馬場コードの配列
+            kyori: 距離（m）の配列
+            grade_codes: グレードコードの配列（省略時は指定なし）
         
-        return None
+        Returns:
+            標準走破タイム（秒）の配列（データがない場合は NaN）
+        """
+        keibajo_codes = list(keibajo_codes)
+        kyori = np.asarray(kyori).reshape(-1).tolist()
+        grade_codes = [None] * len(kyori) if grade_codes is None else list(grade_codes)
+        
+        # (競馬場, 距離, グレード) の種類ごとに1回だけ参照
+        std_times = {}
+        result = np.full(len(kyori), np.nan)
+        for i, key in enumerate(zip(keibajo_codes, kyori, grade_codes)):
+            if key not in std_times:
+                std_time = self._get_standard_total_time(*key)
+                std_times[key] = np.nan if std_time is None else std_time
+            result[i] = std_times[key]
+        return result
     
     def adjust_by_position(
         self,
@@ -481,6 +544,205 @@ class Ten3FEstimator:
         
         return result
     
+    def _engineer_feature_matrix(
+        self,
+        time_seconds: np.ndarray,
+        kohan_3f_seconds: np.ndarray,
+        kyori: np.ndarray,
+        corner_1: np.ndarray,
+        corner_2: np.ndarray,
+        field_size: np.ndarray
+    ) -> np.ndarray:
+        """
+        特徴量エンジニアリングの配列版（_engineer_features と同じ列順）
+        
+        Returns:
+            shape (n_samples, 9) の特徴量行列
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            avg_speed = np.where(time_seconds > 0, kyori / time_seconds, 0)
+            pos_c1_ratio = np.where(field_size > 0, corner_1 / field_size, 0.5)
+        early_position = (corner_1 + corner_2) / 2.0
+        
+        return np.column_stack([
+            time_seconds,
+            kohan_3f_seconds,
+            kyori,
+            corner_1,
+            corner_2,
+            field_size,
+            avg_speed,
+            pos_c1_ratio,
+            early_position
+        ])
+    
+    def _get_distance_ratios(self, kyori: np.ndarray) -> np.ndarray:
+        """_get_distance_ratio の配列版（距離の種類ごとに1回だけ計算）"""
+        unique_kyori, inverse = np.unique(kyori, return_inverse=True)
+        ratios = np.array([self._get_distance_ratio(int(k)) for k in unique_kyori], dtype=np.float64)
+        return ratios[inverse.reshape(-1)]
+    
+    def estimate_batch(
+        self,
+        time_seconds,
+        kohan_3f_seconds,
+        kyori,
+        corner_1=None,
+        corner_2=None,
+        field_size=12,
+        use_ml: bool = True,
+        keibajo_code=None,
+        grade_code=None
+    ) -> Dict[str, np.ndarray]:
+        """
+        統合推定メソッドの配列版（estimate を全行まとめて計算し、ML推定は1回の predict で行う）
+        
+        各行の結果は estimate を1行ずつ呼んだ場合と同じ。
+        欠損（estimate の None に相当）は NaN / None で渡す。
+        
+        Args:
+            time_seconds: 走破タイム（秒）の配列
+            kohan_3f_seconds: 上がり3F（秒）の配列
+            kyori: 距離（m）の配列
+            corner_1: 1コーナー通過順位の配列（省略時は全行なし）
+            corner_2: 2コーナー通過順位の配列（省略時は全行なし）
+            field_size: 出走頭数（配列またはスカラー）
+            use_ml: ML推定を使用するか
+            keibajo_code: 競馬場コード（配列またはスカラー、省略時は距離別比率）
+            grade_code: グレードコード（配列またはスカラー）
+        
+        Returns:
+            推定結果辞書（値はすべて配列） {
+                'ten_3f_baseline': ベースライン推定値,
+                'ten_3f_adjusted': 展開補正後の推定値,
+                'ten_3f_ml': ML推定値（なければNaN）,
+                'ten_3f_final': 最終推定値,
+                'method': 使用した推定方法,
+                'baseline_method': ベースラインの算出方法
+                    （'direct' / 'speed_index' / 'base_time' / 'ratio'）
+            }
+        """
+        time_seconds = np.asarray(time_seconds, dtype=np.float64).reshape(-1)
+        size = len(time_seconds)
+        
+        def to_array(values, default):
+            if values is None:
+                values = default
+            if np.ndim(values) == 0:
+                return np.full(size, np.nan if values is None else values, dtype=np.float64)
+            return np.asarray(values, dtype=np.float64).reshape(-1)
+        
+        def to_codes(values):
+            if values is None or np.ndim(values) == 0:
+                return [values] * size
+            return list(values)
+        
+        kohan_3f_seconds = to_array(kohan_3f_seconds, None)
+        kyori = to_array(kyori, None)
+        corner_1 = to_array(corner_1, None)
+        corner_2 = to_array(corner_2, None)
+        field_size = to_array(field_size, 12)
+        keibajo_codes = to_codes(keibajo_code)
+        grade_codes = to_codes(grade_code)
+        
+        # Layer 1: ベースライン推定（理論文書準拠）
+        baseline = np.zeros(size)
+        baseline_method = np.full(size, 'ratio', dtype=object)
+        
+        # 1200m以下: 確定値（上がり3Fがない場合は前後半均等と仮定）
+        short = kyori <= 1200
+        baseline[short] = np.where(
+            np.isnan(kohan_3f_seconds[short]),
+            time_seconds[short] * 0.50,
+            time_seconds[short] - kohan_3f_seconds[short]
+        )
+        baseline_method[short] = 'direct'
+        
+        # 1201m以上: 基準タイム + スピード指数補正
+        has_code = np.array([code is not None for code in keibajo_codes], dtype=bool)
+        coded = np.flatnonzero(~short & has_code)
+        if len(coded):
+            coded_codes = [keibajo_codes[i] for i in coded]
+            coded_grades = [grade_codes[i] for i in coded]
+            base_zenhan = get_base_times(
+                np.array(coded_codes, dtype=object), kyori[coded], 'zenhan_3f',
+                np.array(coded_grades, dtype=object)
+            )
+            
+            std_total = self.get_standard_total_times(coded_codes, kyori[coded], coded_grades)
+            std_total[std_total == 0] = np.nan
+            
+            speed_index = (std_total == std_total) & (base_zenhan != 0)
+            base_only = ~speed_index & (base_zenhan != 0)
+            baseline[coded[speed_index]] = np.clip(
+                base_zenhan[speed_index] - ((std_total[speed_index] - time_seconds[coded[speed_index]]) * 0.3),
+                30.0, 45.0
+            )
+            baseline_method[coded[speed_index]] = 'speed_index'
+            baseline[coded[base_only]] = base_zenhan[base_only]
+            baseline_method[coded[base_only]] = 'base_time'
+        
+        # フォールバック: 距離別比率
+        ratio_rows = baseline_method == 'ratio'
+        if ratio_rows.any():
+            baseline[ratio_rows] = np.clip(
+                time_seconds[ratio_rows] * self._get_distance_ratios(kyori[ratio_rows]),
+                self.MIN_TEN_3F, self.MAX_TEN_3F
+            )
+        
+        # Layer 2: 展開パターン補正（1200m以下・コーナー順位なしはスキップ）
+        has_corners = (
+            ~short
+            & ~np.isnan(corner_1) & (corner_1 != 0)
+            & ~np.isnan(corner_2) & (corner_2 != 0)
+        )
+        early_position = (corner_1 + corner_2) / 2.0
+        correction = np.select(
+            [early_position <= 2.0, early_position <= 5.0],
+            [self.ESCAPE_CORRECTION, self.STALKER_CORRECTION],
+            self.CLOSER_CORRECTION
+        )
+        adjusted = np.where(
+            has_corners,
+            np.clip(baseline + correction, self.MIN_TEN_3F, self.MAX_TEN_3F),
+            baseline
+        )
+        
+        # Layer 3: 機械学習モデル（全行まとめて1回で予測）
+        ml_estimate = np.full(size, np.nan)
+        has_ml = np.zeros(size, dtype=bool)
+        if use_ml and self.ml_model is not None and size > 0:
+            X = self._engineer_feature_matrix(
+                time_seconds,
+                np.nan_to_num(kohan_3f_seconds, nan=0.0),
+                kyori,
+                np.where(np.isnan(corner_1), 6, corner_1),
+                np.where(np.isnan(corner_2), 6, corner_2),
+                field_size
+            )
+            try:
+                prediction = np.asarray(self.ml_model.predict(X), dtype=np.float64).reshape(-1)
+                ml_estimate = np.clip(prediction, self.MIN_TEN_3F, self.MAX_TEN_3F)
+                has_ml[:] = True
+            except Exception as e:
+                logger.error(f"ML prediction failed: {e}")
+        
+        # 最終推定値の決定（優先順位: ML → 展開補正 → ベースライン）
+        use_adjusted = ~has_ml & ~short & (corner_1 > 0) & (corner_2 > 0)
+        final = np.where(has_ml, ml_estimate, np.where(use_adjusted, adjusted, baseline))
+        method = np.where(has_ml, 'ml', np.where(use_adjusted, 'adjusted', 'baseline')).astype(object)
+        
+        logger.info(f"Ten3F batch estimation: {size}件 (ml={int(has_ml.sum())}, adjusted={int(use_adjusted.sum())})")
+        
+        return {
+            'ten_3f_baseline': baseline,
+            'ten_3f_adjusted': adjusted,
+            'ten_3f_ml': ml_estimate,
+            'ten_3f_final': final,
+            'method': method,
+            'baseline_method': baseline_method
+        }
+    
     def estimate_pace_balance(
         self,
         estimated_ten_3f: float,
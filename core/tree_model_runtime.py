@@ -0,0 +1,260 @@
+"""
+決定木アンサンブルの推論専用ランタイム（NumPyのみ）
+
+Ten3F推定の LightGBM モデル（models/ten_3f_lgbm_model.pkl）は推論時も lightgbm と
+そのネイティブライブラリを読み込むため、起動が遅くメモリも大きく、fork したワーカーでは使いにくい。
+推論に必要なのは木の分岐（特徴量・閾値・欠損時の向き）と葉の値だけなので、
+それを .npz に書き出し、同じ予測を NumPy だけで行う。
+
+予測は LightGBM の数値分岐と同じ:
+- 絶対値が kZeroThreshold 以下の値は 0 として扱う（LightGBM は入力行を読む時点で 0 にする）
+- 欠損（NaN）は missing_type が NaN 以外なら 0 として扱う
+- missing_type が Zero なら 0、NaN なら NaN を default_left の向きに送る
+- それ以外は fval <= threshold なら左
+- 木の出力を先頭の木から順に足し合わせる（恒等変換の目的関数のみ対応）
+
+書き出し: python scripts/export_ten_3f_model_runtime.py
+          scripts/train_ten_3f_model.py の save_model() でも同時に書き出す
+
+Author: AI戦略家（NAR-AI-YOSO開発チーム）
+"""
+
+import os
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 保存形式のバージョン
+RUNTIME_FORMAT_VERSION = 1
+
+# LightGBM の欠損値の扱い（missing_type）
+MISSING_NONE = 0
+MISSING_ZERO = 1
+MISSING_NAN = 2
+_MISSING_TYPES = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+# LightGBM が 0 とみなす絶対値の上限（kZeroThreshold, float の 1e-35f）
+ZERO_THRESHOLD = float(np.float32(1e-35))
+
+# 予測値をそのまま出力する目的関数（出力変換なし）
+IDENTITY_OBJECTIVES = ('regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape')
+
+
+class TreeEnsembleModel:
+    """
+    LightGBM 回帰モデルの推論専用版（木の配列 + NumPy）
+
+    全ての木の節点を1つの配列に並べ、子の番号が負の場合は葉（~子番号 が葉の番号）とする。
+    predict() の結果は元のモデルの predict() と一致する。
+
+    使用例:
+        model = TreeEnsembleModel.load('models/ten_3f_lgbm_model.npz')
+        predictions = model.predict(X)
+    """
+
+    def __init__(
+        self,
+        split_feature: np.ndarray,
+        threshold: np.ndarray,
+        default_left: np.ndarray,
+        missing_type: np.ndarray,
+        left_child: np.ndarray,
+        right_child: np.ndarray,
+        leaf_value: np.ndarray,
+        roots: np.ndarray,
+        num_features: int,
+        feature_names: Optional[List[str]] = None
+    ):
+        """
+        初期化
+
+        Args:
+            split_feature: 節点ごとの分岐に使う特徴量の番号
+            threshold: 節点ごとの閾値
+            default_left: 節点ごとの欠損時に左へ進むか
+            missing_type: 節点ごとの欠損値の扱い（MISSING_NONE / MISSING_ZERO / MISSING_NAN）
+            left_child: 左の子（節点の番号、負なら ~葉の番号）
+            right_child: 右の子（同上）
+            leaf_value: 葉の値
+            roots: 木ごとの根（節点の番号、葉だけの木は ~葉の番号）
+            num_features: 特徴量の数
+            feature_names: 特徴量名
+        """
+        self.split_feature = np.asarray(split_feature, dtype=np.int64)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.missing_type = np.asarray(missing_type, dtype=np.int8)
+        self.left_child = np.asarray(left_child, dtype=np.int64)
+        self.right_child = np.asarray(right_child, dtype=np.int64)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.num_features = int(num_features)
+        self.feature_names = list(feature_names) if feature_names is not None else []
+
+        if len(self.roots) == 0:
+            raise ValueError("木が1本もありません")
+
+    @property
+    def n_features_in_(self) -> int:
+        """特徴量の数（scikit-learn の推定器と同じ属性名）"""
+        return self.num_features
+
+    @classmethod
+    def from_lightgbm(cls, model) -> 'TreeEnsembleModel':
+        """
+        学習済みの LightGBM モデル（LGBMRegressor / Booster）から作成
+
+        予測に使う木は元のモデルの predict() と同じ（best_iteration があればそこまで）。
+
+        Raises:
+            ValueError: 多クラス・カテゴリ分岐・線形木・出力変換のある目的関数の場合
+        """
+        booster = getattr(model, 'booster_', model)
+        dump = booster.dump_model()
+
+        objective = str(dump.get('objective', '')).split(' ')
+        if dump.get('num_class', 1) != 1 or dump.get('num_tree_per_iteration', 1) != 1:
+            raise ValueError("多クラスのモデルには対応していません")
+        if objective[0] not in IDENTITY_OBJECTIVES or 'sqrt' in objective[1:]:
+            raise ValueError(f"未対応の目的関数: {dump.get('objective')}")
+        if dump.get('average_output'):
+            raise ValueError("average_output（random forest）のモデルには対応していません")
+
+        nodes = {
+            'split_feature': [], 'threshold': [], 'default_left': [], 'missing_type': [],
+            'left_child': [], 'right_child': [],
+        }
+        leaf_value = []
+
+        def add(node):
+            """節点を追加して番号を返す（葉は ~葉の番号）"""
+            if 'split_index' not in node:
+                leaf_value.append(node['leaf_value'])
+                return ~(len(leaf_value) - 1)
+            if node.get('decision_type', '<=') != '<=':
+                raise ValueError(f"未対応の分岐: {node.get('decision_type')}")
+            if 'leaf_coeff' in node:
+                raise ValueError("線形木には対応していません")
+
+            index = len(nodes['split_feature'])
+            nodes['split_feature'].append(node['split_feature'])
+            nodes['threshold'].append(node['threshold'])
+            nodes['default_left'].append(node['default_left'])
+            nodes['missing_type'].append(_MISSING_TYPES[node['missing_type']])
+            nodes['left_child'].append(0)
+            nodes['right_child'].append(0)
+            nodes['left_child'][index] = add(node['left_child'])
+            nodes['right_child'][index] = add(node['right_child'])
+            return index
+
+        roots = [add(tree['tree_structure']) for tree in dump['tree_info']]
+
+        return cls(
+            roots=roots,
+            leaf_value=leaf_value,
+            num_features=dump['max_feature_idx'] + 1,
+            feature_names=dump.get('feature_names'),
+            **nodes
+        )
+
+    def predict(self, X) -> np.ndarray:
+        """
+        予測
+
+        Args:
+            X: shape (n_samples, num_features) の特徴量
+
+        Returns:
+            予測値の配列
+        """
+        X = np.array(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.num_features:
+            raise ValueError(f"特徴量の数が一致しません: 入力={X.shape[-1]}, モデル={self.num_features}")
+        X[np.abs(X) <= ZERO_THRESHOLD] = 0.0
+
+        # 全ての行 × 全ての木を同時に根から葉までたどる
+        current = np.tile(self.roots, (len(X), 1))
+        rows = np.broadcast_to(np.arange(len(X))[:, None], current.shape)
+        active = current >= 0
+        while active.any():
+            node = current[active]
+            value = X[rows[active], self.split_feature[node]]
+
+            missing_type = self.missing_type[node]
+            is_nan = np.isnan(value)
+            value = np.where(is_nan & (missing_type != MISSING_NAN), 0.0, value)
+            use_default = (
+                ((missing_type == MISSING_ZERO) & (np.abs(value) <= ZERO_THRESHOLD))
+                | ((missing_type == MISSING_NAN) & is_nan)
+            )
+            go_left = np.where(use_default, self.default_left[node], value <= self.threshold[node])
+
+            current[active] = np.where(go_left, self.left_child[node], self.right_child[node])
+            active = current >= 0
+
+        # 木の出力を先頭から順に足す（LightGBM と同じ加算順）
+        return np.cumsum(self.leaf_value[~current], axis=1)[:, -1]
+
+    def save(self, filepath: str):
+        """
+        木の配列を .npz に保存
+
+        Args:
+            filepath: 保存先ファイルパス（.npz）
+        """
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        np.savez_compressed(
+            filepath,
+            version=RUNTIME_FORMAT_VERSION,
+            split_feature=self.split_feature.astype(np.int32),
+            threshold=self.threshold,
+            default_left=self.default_left,
+            missing_type=self.missing_type,
+            left_child=self.left_child.astype(np.int32),
+            right_child=self.right_child.astype(np.int32),
+            leaf_value=self.leaf_value,
+            roots=self.roots.astype(np.int32),
+            num_features=self.num_features,
+            feature_names=np.asarray(self.feature_names, dtype=str)
+        )
+        logger.info(f"決定木モデルを保存しました: {filepath}")
+
+    @classmethod
+    def load(cls, filepath: str) -> 'TreeEnsembleModel':
+        """
+        .npz から読み込み
+
+        Raises:
+            FileNotFoundError: ファイルが存在しない場合
+            ValueError: 保存形式のバージョンが異なる場合
+        """
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"決定木モデルが見つかりません: {filepath}")
+
+        with np.load(filepath) as data:
+            version = int(data['version'])
+            if version != RUNTIME_FORMAT_VERSION:
+                raise ValueError(f"未対応の決定木モデルの形式です: version={version}")
+            model = cls(
+                split_feature=data['split_feature'],
+                threshold=data['threshold'],
+                default_left=data['default_left'],
+                missing_type=data['missing_type'],
+                left_child=data['left_child'],
+                right_child=data['right_child'],
+                leaf_value=data['leaf_value'],
+                roots=data['roots'],
+                num_features=int(data['num_features']),
+                feature_names=data['feature_names'].tolist()
+            )
+
+        logger.info(f"決定木モデルを読み込みました: {filepath}")
+        return model
@@ -2,51 +2,177 @@
 NAR AI予想システム - メインスクリプト
 
 実行方法:
-    python main.py [対象日付]
+    python main.py [対象日付] [--workers N]
     
 例:
-    python main.py              # 明日の予想を生成
-    python main.py 20260106     # 2026年1月6日の予想を生成
+    python main.py                      # 明日の予想を生成
+    python main.py 20260106             # 2026年1月6日の予想を生成
+    python main.py 20260106 --workers 4 # 4スレッドでレースを並列計算
 """
 
 import sys
-import psycopg2
+import time
+import argparse
+import threading
 from datetime import datetime, timedelta
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append('/home/user/webapp/nar-ai-yoso')
 
-from config.db_config import DB_CONFIG
+from config.db_config import (
+    get_db_connection,
+    close_connection_pool,
+    db_connection,
+    use_online_session_settings,
+    POOL_CONFIG
+)
 from core.data_fetcher import (
     get_tomorrow_date,
     get_tomorrow_races,
     get_races_by_date,
-    get_race_info,
-    enrich_horse_data_with_prev_race,
+    get_race_infos_by_date,
+    enrich_horse_data_with_prev_race_batch,
     enrich_horse_data_with_bloodline
 )
-from core.hqs_calculator import calculate_race_hqs_scores
+from core.hqs_calculator import calculate_race_hqs_scores, prefetch_factor_stats
+from core.factor_stats_cache import get_factor_stats_cache, clear_factor_stats_cache
+from core.factor_stats_store import open_factor_stats_store
 from core.prediction_generator import save_all_predictions
+from core.prepared_statements import get_prepared_statement_stats
+
+
+def parse_args(argv=None):
+    """
+    コマンドライン引数を解析
+    """
+    parser = argparse.ArgumentParser(description='NAR AI予想システム')
+    parser.add_argument('target_date', nargs='?', help='対象日付（YYYYMMDD、省略時は明日）')
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='レースを並列計算するスレッド数（既定: 1 = 逐次計算）'
+    )
+    parser.add_argument(
+        '--no-disk-cache', action='store_true',
+        help='ファクター統計の永続キャッシュ（models/cache/）を使わない'
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers は1以上を指定してください')
+    return args
+
+
+# 並列計算スレッドごとの接続（score_races() の ThreadPoolExecutor の initializer で初期化）
+_worker_local = threading.local()
+
+
+def _init_worker(worker_connections):
+    """
+    並列計算スレッドの初期化
+    
+    接続はスレッドの最初のレースでプールから借り、以降のレースで使い回す。
+    借りた接続は worker_connections に登録し、score_races() の終了時にまとめて返却する。
+    """
+    _worker_local.conn = None
+    _worker_local.connections = worker_connections
+
+
+def _worker_connection():
+    """
+    並列計算スレッド専用の接続を取得（初回のみプールから借りる）
+    """
+    if _worker_local.conn is None or _worker_local.conn.closed:
+        _worker_local.conn = get_db_connection()
+        _worker_local.connections.append(_worker_local.conn)
+    return _worker_local.conn
+
+
+def score_race(task, conn=None):
+    """
+    1レースのAAS得点を計算（失敗してもほかのレースに影響させない）
+    
+    Args:
+        task: (競馬場コード, レース番号, 出走馬データのリスト, レース情報)
+        conn: データベース接続（省略時は並列計算スレッドの接続。
+              スレッド外ではプールから借りて計算後に返却）
+    
+    Returns:
+        tuple: (予想リスト or None, 例外 or None, 所要秒数)
+    """
+    _, _, race_horses, race_info = task
+    started = time.perf_counter()
+    try:
+        if conn is None and getattr(_worker_local, 'connections', None) is None:
+            with db_connection() as pooled_conn:
+                predictions = calculate_race_hqs_scores(pooled_conn, race_horses, race_info)
+        else:
+            race_conn = conn if conn is not None else _worker_connection()
+            try:
+                predictions = calculate_race_hqs_scores(race_conn, race_horses, race_info)
+            except Exception:
+                # 接続は後続のレースと共有しているため、失敗したトランザクションを戻しておく
+                if not race_conn.closed:
+                    race_conn.rollback()
+                raise
+        return predictions, None, time.perf_counter() - started
+    except Exception as e:
+        return None, e, time.perf_counter() - started
+
+
+def score_races(conn, race_tasks, workers=1):
+    """
+    全レースのAAS得点を計算
+    
+    workers > 1 の場合はスレッドプールで並列計算し、各スレッドはコネクションプールから
+    接続を1本借りて全レースで使い回す（メイン処理の接続1本を除いた POOL_CONFIG['maxconn'] が上限）。
+    結果は完了順ではなく race_tasks の順で返す。
+    
+    Args:
+        conn: データベース接続（逐次計算時に使用）
+        race_tasks: [(競馬場コード, レース番号, 出走馬データのリスト, レース情報), ...]
+        workers: 並列スレッド数
+    
+    Returns:
+        list: race_tasks と同じ順の [(予想リスト or None, 例外 or None, 所要秒数), ...]
+    """
+    workers = min(workers, max(POOL_CONFIG['maxconn'] - 1, 1), max(len(race_tasks), 1))
+    if workers <= 1:
+        return [score_race(task, conn) for task in race_tasks]
+    
+    worker_connections = []
+    try:
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='race',
+            initializer=_init_worker, initargs=(worker_connections,)
+        ) as executor:
+            return list(executor.map(score_race, race_tasks))
+    finally:
+        for worker_conn in worker_connections:
+            worker_conn.close()
 
 
 def main():
     """
     メイン処理
     """
+    args = parse_args()
+    
     # 対象日付の取得
-    if len(sys.argv) > 1:
-        target_date = sys.argv[1]
-    else:
-        target_date = get_tomorrow_date()
+    target_date = args.target_date or get_tomorrow_date()
     
     print(f"{'='*50}")
     print(f"NAR AI予想システム")
     print(f"対象日付: {target_date}")
+    print(f"並列数: {args.workers}")
     print(f"{'='*50}\n")
     
-    # データベース接続
+    started = time.perf_counter()
+    
+    # データベース接続（予想生成では暴走クエリを statement_timeout で打ち切る）
     print("📊 データベースに接続中...")
-    conn = psycopg2.connect(**DB_CONFIG)
+    use_online_session_settings()
+    conn = get_db_connection()
+    factor_stats_store = None
     
     try:
         # ステップ1: 対象レース一覧を取得
@@ -71,7 +197,7 @@ def main():
         
         # ステップ3: 前走データ追加
         print("【ステップ3】前走データ取得・統合")
-        enriched_horses = enrich_horse_data_with_prev_race(conn, horses, target_date)
+        enriched_horses = enrich_horse_data_with_prev_race_batch(conn, horses, target_date)
         print(f"✅ データ統合完了\n")
         
         # ステップ3.5: 血統データ追加
@@ -81,26 +207,19 @@ def main():
         
         # ステップ4: レース情報取得
         print("【ステップ4】レース情報取得")
-        race_infos = {}
-        for race in races:
-            keibajo_code = race['keibajo_code']
-            race_bango = race['race_bango']
-            kaisai_date = race['kaisai_date']
-            
-            race_info = get_race_info(conn, keibajo_code, kaisai_date, race_bango)
-            race_key = f"{keibajo_code}_{race_bango}"
-            race_infos[race_key] = race_info
+        race_infos = get_race_infos_by_date(conn, target_date)
         
         print(f"✅ レース情報取得完了: {len(race_infos)}レース\n")
         
-        # ステップ5: レースごとにAAS得点計算
-        print("【ステップ5】AAS得点計算")
-        all_predictions = defaultdict(list)
+        # ステップ4.5: ファクター統計の事前取得
+        print("【ステップ4.5】ファクター統計事前取得")
         
+        # 計算対象レース（出走馬・レース情報）を抽出
+        race_tasks = []
         for race in races:
             keibajo_code = race['keibajo_code']
             race_bango = race['race_bango']
-            race_key = f"{keibajo_code}_{race_bango}"
+            race_key = (keibajo_code, race_bango)
             
             # このレースの出走馬を抽出
             race_horses = [
@@ -121,10 +240,41 @@ def main():
             # レース情報に競馬場コードを追加
             race_info['keibajo_code'] = keibajo_code
             
-            # AAS得点計算
+            race_tasks.append((keibajo_code, race_bango, race_horses, race_info))
+        
+        # ファクター統計は実行内で共有（同じ騎手・枠番などは再計算しない）
+        clear_factor_stats_cache()
+        
+        # 前回までの実行で計算した統計を再利用（過去データが更新されていれば自動で破棄）
+        if not args.no_disk_cache:
+            factor_stats_store, watermark = open_factor_stats_store(conn)
+            get_factor_stats_cache().attach_store(factor_stats_store)
+            print(f"✅ 永続キャッシュ: {len(factor_stats_store)}件"
+                  f"（確定データ: {watermark['results']}, 破棄: {factor_stats_store.purged}件）")
+        
+        # 全レースで必要なファクター統計を事前に一括取得
+        prefetched = prefetch_factor_stats(
+            conn, [(race_horses, race_info) for _, _, race_horses, race_info in race_tasks]
+        )
+        print(f"✅ ファクター統計事前取得完了: {prefetched}件\n")
+        
+        # ステップ5: レースごとにAAS得点計算
+        print("【ステップ5】AAS得点計算")
+        all_predictions = defaultdict(list)
+        
+        scoring_started = time.perf_counter()
+        race_results = score_races(conn, race_tasks, args.workers)
+        scoring_elapsed = time.perf_counter() - scoring_started
+        
+        # 結果は並列数によらず race_tasks の順で集計・表示する
+        race_seconds = 0.0
+        for (keibajo_code, race_bango, _, _), (predictions, error, elapsed) in zip(race_tasks, race_results):
+            race_seconds += elapsed
+            if error is not None:
+                print(f"  ❌ {keibajo_code} {race_bango}R: エラー - {error}")
+                continue
+            
             try:
-                predictions = calculate_race_hqs_scores(conn, race_horses, race_info)
-                
                 all_predictions[keibajo_code].append({
                     'race_bango': race_bango,
                     'predictions': predictions
@@ -135,13 +285,23 @@ def main():
                     top_horse = predictions[0]
                     print(f"  ✅ {keibajo_code} {race_bango}R: "
                           f"{top_horse['umaban']}番 {top_horse['bamei']} "
-                          f"(AAS: {top_horse['total_aas']:.1f}点)")
+                          f"(AAS: {top_horse['total_aas']:.1f}点) [{elapsed:.2f}秒]")
             
             except Exception as e:
                 print(f"  ❌ {keibajo_code} {race_bango}R: エラー - {e}")
                 continue
         
-        print(f"\n✅ AAS得点計算完了: {sum(len(v) for v in all_predictions.values())}レース\n")
+        cache_stats = get_factor_stats_cache().stats()
+        print(f"\n✅ AAS得点計算完了: {sum(len(v) for v in all_predictions.values())}レース")
+        print(f"  ファクター統計キャッシュ: ヒット {cache_stats['hits']}件 / "
+              f"ミス {cache_stats['misses']}件（ヒット率 {cache_stats['hit_rate']}%、"
+              f"うち永続キャッシュ {cache_stats['store_hits']}件）")
+        prepared_stats = get_prepared_statement_stats()
+        print(f"  プリペアドステートメント: 実行 {prepared_stats['executions']}回 / "
+              f"準備 {prepared_stats['prepares']}回（テンプレート {prepared_stats['statements']}種）")
+        print(f"  計画時間の削減（推定）: {prepared_stats['saved_planning_ms']:.1f}ms "
+              f"（1回 {prepared_stats['avg_planning_ms']:.2f}ms × 再利用 {prepared_stats['reused']}回）")
+        print(f"  計算時間: {scoring_elapsed:.2f}秒（レース合計 {race_seconds:.2f}秒）\n")
         
         # ステップ6: 予想をファイル保存（競馬場ごと1ファイル）
         print("【ステップ6】予想ファイル保存（競馬場ごと）")
@@ -162,6 +322,7 @@ def main():
         print(f"\n{'='*50}")
         print(f"✅ 予想生成完了！")
         print(f"出力先: {base_output_dir}/{target_date}/")
+        print(f"総処理時間: {time.perf_counter() - started:.2f}秒")
         print(f"{'='*50}")
     
     except Exception as e:
@@ -170,7 +331,11 @@ def main():
         traceback.print_exc()
     
     finally:
+        if factor_stats_store is not None:
+            get_factor_stats_cache().attach_store(None)
+            factor_stats_store.close()
         conn.close()
+        close_connection_pool()
         print("\n📊 データベース接続を閉じました")
 
 
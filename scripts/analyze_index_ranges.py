@@ -23,7 +23,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from core.index_calculator import calculate_all_indexes
+from core.index_calculator import calculate_all_indexes_batch
 
 # デフォルトの競馬場コード（全14場）
 KEIBAJO_CODES = [30, 35, 36, 40, 41, 42, 43, 44, 45, 46, 47, 50, 54, 55]
@@ -90,54 +90,21 @@ def calculate_indexes_for_all(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 4指数を追加したデータフレーム
     """
-    results = []
-    
-    for idx, row in df.iterrows():
-        if (idx + 1) % 1000 == 0:
-            print(f"  処理中... {idx + 1:,} / {len(df):,} ({(idx+1)/len(df)*100:.1f}%)")
-        
-        try:
-            horse_data = {
-                'zenhan_3f': row['zenhan_3f'],
-                'kohan_3f': row['kohan_3f'],
-                'soha_time': row['soha_time'],
-                'corner_1': row['corner_1'],
-                'corner_2': row['corner_2'],
-                'corner_3': row['corner_3'],
-                'corner_4': row['corner_4'],
-                'kyori': row['kyori'],
-                'babajotai_code_dirt': row['babajotai_code_dirt'],
-                'keibajo_code': row['keibajo_code'],
-                'furi_code': row.get('furi_code', '00'),
-                'wakuban': row.get('wakuban', 0),
-                'tosu': row.get('tosu', 12),
-                'kinryo': row.get('kinryo', 54.0),
-                'bataiju': row.get('bataiju', 460.0)
-            }
-            
-            race_info = {
-                'grade_code': row.get('grade_code', 'E')
-            }
-            
-            result = calculate_all_indexes(horse_data, race_info)
-            
-            results.append({
-                'keibajo_code': row['keibajo_code'],
-                'kyori': row['kyori'],
-                'grade_code': row.get('grade_code', 'E'),
-                'ten_index': result['ten_index'],
-                'position_index': result['position_index'],
-                'agari_index': result['agari_index'],
-                'pace_index': result['pace_index'],
-                'pace_type': result.get('pace_type', 'M'),
-                'kakutei_chakujun': row.get('kakutei_chakujun', 99),
-                'tansho_odds': row.get('tansho_odds', 0.0)
-            })
-        except Exception as e:
-            print(f"  ⚠️ 行{idx}でエラー: {e}")
-            continue
-    
-    return pd.DataFrame(results)
+    race_info = None if 'grade_code' in df.columns else {'grade_code': 'E'}
+    indexes = calculate_all_indexes_batch(df, race_info)
+    
+    return pd.DataFrame({
+        'keibajo_code': df['keibajo_code'].values,
+        'kyori': df['kyori'].values,
+        'grade_code': df['grade_code'].values if 'grade_code' in df.columns else 'E',
+        'ten_index': indexes['ten_index'],
+        'position_index': indexes['position_index'],
+        'agari_index': indexes['agari_index'],
+        'pace_index': indexes['pace_index'],
+        'pace_type': indexes['pace_type'],
+        'kakutei_chakujun': df['kakutei_chakujun'].values if 'kakutei_chakujun' in df.columns else 99,
+        'tansho_odds': df['tansho_odds'].values if 'tansho_odds' in df.columns else 0.0
+    })
 
 def analyze_ranges(df: pd.DataFrame) -> pd.DataFrame:
     """
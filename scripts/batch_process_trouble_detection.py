@@ -24,6 +24,7 @@ from psycopg2.extras import RealDictCursor
 
 from config.db_config import get_db_connection
 from config.course_master import KEIBAJO_NAMES
+from core.sql_conditions import build_date_sql_condition, build_date_range_sql_condition
 from core.nar_trouble_detection import TroubleDetector, safe_float, safe_int
 
 # ロギング設定
@@ -81,19 +82,22 @@ class BatchTroubleProcessor:
                 - keibajo_code: 競馬場コード
                 - race_bango: レース番号
         """
-        query = """
+        date_condition, date_params = build_date_range_sql_condition(
+            'ra', self.start_date, self.end_date
+        )
+        query = f"""
             SELECT DISTINCT
                 ra.kaisai_nen || ra.kaisai_tsukihi as race_date,
                 ra.keibajo_code,
                 ra.race_bango
             FROM nvd_ra ra
-            WHERE ra.kaisai_nen || ra.kaisai_tsukihi BETWEEN %s AND %s
+            WHERE {date_condition}
               AND ra.keibajo_code != '61'  -- ばんえい競馬除外
             ORDER BY race_date, keibajo_code, race_bango
         """
         
         cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute(query, (self.start_date, self.end_date))
+        cursor.execute(query, date_params)
         races = cursor.fetchall()
         cursor.close()
         
@@ -122,7 +126,8 @@ class BatchTroubleProcessor:
                 - kohan_3f: 上がり3F（秒）
                 - corner_1, corner_2, corner_3, corner_4: 通過順位
         """
-        query = """
+        date_condition, date_params = build_date_sql_condition('se', '=', race_date)
+        query = f"""
             SELECT 
                 se.ketto_toroku_bango,
                 se.soha_time,          -- 走破タイム（4桁文字列）
@@ -133,7 +138,7 @@ class BatchTroubleProcessor:
                 se.corner_4,
                 se.kakutei_chakujun
             FROM nvd_se se
-            WHERE se.kaisai_nen || se.kaisai_tsukihi = %s
+            WHERE {date_condition}
               AND se.keibajo_code = %s
               AND se.race_bango = %s
               AND se.kakutei_chakujun IS NOT NULL
@@ -141,7 +146,7 @@ class BatchTroubleProcessor:
         """
         
         cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-        cursor.execute(query, (race_date, keibajo_code, race_bango))
+        cursor.execute(query, date_params + [keibajo_code, race_bango])
         horses = cursor.fetchall()
         cursor.close()
         
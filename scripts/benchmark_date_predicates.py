@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+開催日付条件のビフォーアフター計測スクリプト
+================================================================================
+代表的なクエリを以下の2通りの日付条件で EXPLAIN ANALYZE し、実行時間を比較する:
+- 旧条件: kaisai_nen || kaisai_tsukihi（連結式、インデックス不可）
+- 新条件: (kaisai_nen, kaisai_tsukihi) の行値比較（core/sql_conditions.py）
+
+--apply-migration を指定すると、計測 → sql/create_date_indexes.sql 適用 → 再計測
+の順に実行し、インデックス作成前後の比較レポートを出力する。
+
+使用方法:
+    python scripts/benchmark_date_predicates.py --date 20250105 --keibajo 44
+    python scripts/benchmark_date_predicates.py --date 20250105 --keibajo 44 --apply-migration
+================================================================================
+"""
+
+import argparse
+import os
+import statistics
+import sys
+from datetime import datetime
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.db_config import get_db_connection
+from core.sql_conditions import build_date_sql_condition, build_date_range_sql_condition
+
+
+MIGRATION_FILE = os.path.join(project_root, 'sql', 'create_date_indexes.sql')
+
+
+def legacy_date_condition(alias, operator, date):
+    """旧方式（連結式）の日付条件"""
+    return f"{alias}.kaisai_nen || {alias}.kaisai_tsukihi {operator} %s", [date]
+
+
+def legacy_date_range_condition(alias, start_date, end_date):
+    """旧方式（連結式）の日付範囲条件"""
+    return (
+        f"{alias}.kaisai_nen || {alias}.kaisai_tsukihi BETWEEN %s AND %s",
+        [start_date, end_date]
+    )
+
+
+def build_benchmark_queries(args):
+    """
+    計測対象クエリを生成
+
+    Returns:
+        list: [(クエリ名, {'legacy': (sql, params), 'sargable': (sql, params)}), ...]
+    """
+    queries = []
+
+    # 1. 出走表取得（get_tomorrow_races）
+    def race_card(condition):
+        sql, params = condition('se', '=', args.date)
+        return (
+            f"SELECT se.keibajo_code, se.race_bango, se.umaban FROM nvd_se se WHERE {sql}",
+            params
+        )
+
+    queries.append(('出走表取得（nvd_se 開催日）', {
+        'legacy': race_card(legacy_date_condition),
+        'sargable': race_card(build_date_sql_condition),
+    }))
+
+    # 2. 前走取得（get_previous_race_by_id）
+    def prev_race(condition):
+        sql, params = condition('se', '<', args.date)
+        return (
+            f"""SELECT se.kakutei_chakujun FROM nvd_se se
+            WHERE se.ketto_toroku_bango = %s AND {sql}
+            ORDER BY se.kaisai_nen DESC, se.kaisai_tsukihi DESC LIMIT 1""",
+            [args.ketto] + params
+        )
+
+    queries.append(('前走取得（nvd_se 馬ID＋日付）', {
+        'legacy': prev_race(legacy_date_condition),
+        'sargable': prev_race(build_date_sql_condition),
+    }))
+
+    # 3. レース情報取得（get_race_infos_by_date）
+    def race_info(condition):
+        sql, params = condition('ra', '=', args.date)
+        return f"SELECT ra.* FROM nvd_ra ra WHERE {sql}", params
+
+    queries.append(('レース情報取得（nvd_ra 開催日）', {
+        'legacy': race_info(legacy_date_condition),
+        'sargable': race_info(build_date_sql_condition),
+    }))
+
+    # 4. 期間集計（collect_index_stats_fixed.collect_race_data）
+    def period_stats(condition):
+        sql, params = condition('ra', args.start_date, args.end_date)
+        return (
+            f"""SELECT COUNT(*) FROM nvd_ra ra
+            JOIN nvd_se se ON
+                ra.kaisai_nen = se.kaisai_nen AND
+                ra.kaisai_tsukihi = se.kaisai_tsukihi AND
+                ra.keibajo_code = se.keibajo_code AND
+                ra.race_bango = se.race_bango
+            LEFT JOIN nvd_o1 od ON
+                ra.kaisai_nen = od.kaisai_nen AND
+                ra.kaisai_tsukihi = od.kaisai_tsukihi AND
+                ra.keibajo_code = od.keibajo_code AND
+                ra.race_bango = od.race_bango
+            WHERE ra.keibajo_code = %s AND {sql}""",
+            [args.keibajo] + params
+        )
+
+    queries.append(('期間集計（nvd_ra⨝nvd_se⨝nvd_o1）', {
+        'legacy': period_stats(legacy_date_range_condition),
+        'sargable': period_stats(build_date_range_sql_condition),
+    }))
+
+    return queries
+
+
+def _collect_scan_types(plan, scans):
+    node_type = plan.get('Node Type', '')
+    if 'Scan' in node_type and plan.get('Relation Name'):
+        scans.add(f"{plan['Relation Name']}:{node_type}")
+    for child in plan.get('Plans', []):
+        _collect_scan_types(child, scans)
+
+
+def explain_query(conn, sql, params, repeat):
+    """
+    EXPLAIN ANALYZE を repeat 回実行し、実行時間の中央値とスキャン種別を返す
+
+    Returns:
+        dict: {'planning_ms': float, 'execution_ms': float, 'scans': str}
+    """
+    planning_times = []
+    execution_times = []
+    scans = set()
+
+    with conn.cursor() as cur:
+        for _ in range(repeat):
+            cur.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+            result = cur.fetchone()[0][0]
+            planning_times.append(result['Planning Time'])
+            execution_times.append(result['Execution Time'])
+            _collect_scan_types(result['Plan'], scans)
+    conn.rollback()
+
+    return {
+        'planning_ms': statistics.median(planning_times),
+        'execution_ms': statistics.median(execution_times),
+        'scans': ', '.join(sorted(scans))
+    }
+
+
+def run_benchmark(conn, queries, repeat):
+    """
+    全クエリを旧条件・新条件で計測
+
+    Returns:
+        dict: {クエリ名: {'legacy': 計測結果, 'sargable': 計測結果}}
+    """
+    results = {}
+    for name, variants in queries:
+        results[name] = {}
+        for variant, (sql, params) in variants.items():
+            results[name][variant] = explain_query(conn, sql, params, repeat)
+            print(f"  {name} [{variant}]: {results[name][variant]['execution_ms']:.2f}ms")
+    return results
+
+
+def apply_migration(conn):
+    """
+    sql/create_date_indexes.sql を適用（CREATE INDEX CONCURRENTLY のため自動コミット）
+    """
+    with open(MIGRATION_FILE, encoding='utf-8') as f:
+        lines = [line for line in f if not line.lstrip().startswith('--')]
+    statements = [stmt.strip() for stmt in ''.join(lines).split(';') if stmt.strip()]
+
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for statement in statements:
+                print(f"  実行: {' '.join(statement.split())[:80]}")
+                cur.execute(statement)
+    finally:
+        conn.autocommit = previous_autocommit
+
+
+def format_report(args, before, after=None):
+    """
+    Markdown形式の計測レポートを生成
+    """
+    lines = [
+        "# 開催日付条件 ビフォーアフター計測レポート",
+        "",
+        f"- 計測日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        f"- 対象日: {args.date} / 競馬場: {args.keibajo} / 馬ID: {args.ketto}",
+        f"- 集計期間: {args.start_date} 〜 {args.end_date}",
+        f"- 計測回数: {args.repeat}回（中央値）",
+        "",
+    ]
+
+    sections = [('インデックス作成前', before)]
+    if after is not None:
+        sections.append(('インデックス作成後', after))
+
+    for title, results in sections:
+        lines += [
+            f"## {title}",
+            "",
+            "| クエリ | 旧条件 (ms) | 新条件 (ms) | 短縮率 | 新条件のスキャン |",
+            "|---|---:|---:|---:|---|",
+        ]
+        for name, result in results.items():
+            legacy_ms = result['legacy']['execution_ms']
+            sargable_ms = result['sargable']['execution_ms']
+            ratio = (1 - sargable_ms / legacy_ms) * 100 if legacy_ms > 0 else 0.0
+            lines.append(
+                f"| {name} | {legacy_ms:.2f} | {sargable_ms:.2f} | {ratio:.1f}% "
+                f"| {result['sargable']['scans']} |"
+            )
+        lines.append("")
+
+    if after is not None:
+        lines += [
+            "## 総合（旧条件・作成前 → 新条件・作成後）",
+            "",
+            "| クエリ | 変更前 (ms) | 変更後 (ms) | 高速化倍率 |",
+            "|---|---:|---:|---:|",
+        ]
+        for name in before:
+            before_ms = before[name]['legacy']['execution_ms']
+            after_ms = after[name]['sargable']['execution_ms']
+            speedup = before_ms / after_ms if after_ms > 0 else float('inf')
+            lines.append(f"| {name} | {before_ms:.2f} | {after_ms:.2f} | {speedup:.1f}x |")
+        lines.append("")
+
+    return '\n'.join(lines)
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(
+        description='開催日付条件（連結式 vs 行値比較）のビフォーアフター計測'
+    )
+    parser.add_argument('--date', type=str, required=True, help='対象日（YYYYMMDD形式）')
+    parser.add_argument('--keibajo', type=str, default='44', help='集計対象の競馬場コード')
+    parser.add_argument('--ketto', type=str, default=None,
+                        help='前走取得の対象馬ID（省略時は対象日の出走馬から選択）')
+    parser.add_argument('--start-date', type=str, default='20160101', help='集計開始日（YYYYMMDD形式）')
+    parser.add_argument('--end-date', type=str, default='20251231', help='集計終了日（YYYYMMDD形式）')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（中央値を採用）')
+    parser.add_argument('--apply-migration', action='store_true',
+                        help='計測後に sql/create_date_indexes.sql を適用して再計測')
+    parser.add_argument('--output', type=str, default=None, help='レポート出力先（Markdown）')
+
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+
+    try:
+        if args.ketto is None:
+            condition, params = build_date_sql_condition(None, '=', args.date)
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT ketto_toroku_bango FROM nvd_se WHERE {condition} LIMIT 1", params)
+                row = cur.fetchone()
+            args.ketto = row[0] if row else ''
+
+        queries = build_benchmark_queries(args)
+
+        print("📊 計測（現在のインデックス構成）")
+        before = run_benchmark(conn, queries, args.repeat)
+
+        after = None
+        if args.apply_migration:
+            print("\n🔧 マイグレーション適用")
+            apply_migration(conn)
+            print("\n📊 計測（インデックス作成後）")
+            after = run_benchmark(conn, queries, args.repeat)
+
+        report = format_report(args, before, after)
+
+        output_path = args.output or os.path.join(
+            project_root, 'output',
+            f"date_predicate_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+        )
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(report)
+
+        print("\n" + report)
+        print(f"✅ レポート保存: {output_path}")
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
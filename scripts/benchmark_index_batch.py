@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+指数のバッチ計算のベンチマーク
+================================================================================
+同じ出走データに対して以下の2通りで4指数を計算し、処理時間を比較する:
+- スカラー: calculate_all_indexes（1頭ずつ、dict を渡す）
+- バッチ:   calculate_all_indexes_batch（列ごとの配列を一括で渡す）
+
+列の型は呼び出し側ごとに3通り計測する:
+- 混在リスト: None / 空文字 / 数値が混在するリスト（tests/test_index_calculator_batch.py の
+              make_horses と同じ分布、past_corners あり）
+- 文字列:     DBの VARCHAR 列（sqlite / psycopg2 → pandas の object 列）と同じく
+              数値を文字列で保持し、欠損は None / 空文字（analyze_index_ranges.py の入力）
+- 数値:       数値型の列（欠損は NaN）
+
+スカラー版は遅いため --scalar-rows 件で計測し、1件あたりの時間から全件の時間に換算する。
+計測した行ではスカラー版とバッチ版の4指数が一致することも確認する。
+
+使用方法:
+    python scripts/benchmark_index_batch.py
+    python scripts/benchmark_index_batch.py --rows 200000 --scalar-rows 5000
+================================================================================
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.index_calculator import (
+    BATCH_INDEX_NAMES,
+    calculate_all_indexes,
+    calculate_all_indexes_batch
+)
+
+RACE_INFO = {'grade_code': 'C'}
+
+
+def generate_columns(rows, seed):
+    """
+    計測用の出走データ（混在リストの列）を生成
+
+    make_horses と同じ値の分布を NumPy の乱数で生成する。
+    """
+    rng = np.random.default_rng(seed)
+
+    def choice(options, p=None):
+        picked = rng.choice(len(options), size=rows, p=p)
+        return [options[i] for i in picked]
+
+    def with_missing(values, missing, rate):
+        values = list(values)
+        for i in np.flatnonzero(rng.random(rows) < rate):
+            values[i] = missing[rng.integers(len(missing))]
+        return values
+
+    past_corners_options = [[], [(2, 2, 3, 2), (1, 1, 2, 1)], [(8, 7, 6, 5), (0, 0, 0, 0), (9, 9, 9, 9)]]
+    return {
+        'zenhan_3f': with_missing(rng.integers(300, 421, rows).tolist(), [None, '', 0], 0.15),
+        'kohan_3f': with_missing(rng.integers(340, 451, rows).tolist(), [None], 1 / 3),
+        'corner_1': rng.integers(0, 15, rows).tolist(),
+        'corner_2': rng.integers(0, 15, rows).tolist(),
+        'corner_3': rng.integers(0, 15, rows).tolist(),
+        'corner_4': choice([0, 1, 5, '']),
+        'kyori': choice([800, 1000, 1200, 1300, 1400, 1600, 1800, 2000, 2600]),
+        'babajotai_code_dirt': choice(['1', '2', '3', '4', '0']),
+        'keibajo_code': choice(['42', '44', '30', '46', '50', '54', '99']),
+        'tosu': choice([0, 5, 8, 12, 16]),
+        'furi_code': choice(['00', '01', '10', '25', '28', '99']),
+        'wakuban': rng.integers(0, 9, rows).tolist(),
+        'kinryo': choice([0, 52.0, 54.0, 56.5, None]),
+        'bataiju': choice([0, 420, 460, 510]),
+        'soha_time': rng.integers(550, 1701, rows).tolist(),
+        'past_corners': choice(past_corners_options),
+    }
+
+
+def to_string_columns(columns):
+    """数値を文字列にした object 配列の列（欠損の None / 空文字はそのまま、past_corners なし）"""
+    return {
+        key: np.array([value if value is None else str(value) for value in values], dtype=object)
+        for key, values in columns.items() if key != 'past_corners'
+    }
+
+
+def to_numeric_columns(columns):
+    """数値型の列（欠損は NaN、コード列は文字列のまま、past_corners なし）"""
+    result = {}
+    for key, values in columns.items():
+        if key == 'past_corners':
+            continue
+        if key in ('babajotai_code_dirt', 'keibajo_code', 'furi_code'):
+            result[key] = np.array(values)
+        else:
+            result[key] = np.array([np.nan if value is None or value == '' else value for value in values],
+                                   dtype=np.float64)
+    return result
+
+
+def row_dicts(columns, rows):
+    """先頭 rows 件を calculate_all_indexes 用の dict に変換（NaN はキー欠損として扱う）"""
+    horses = []
+    for i in range(rows):
+        horse = {}
+        for key, values in columns.items():
+            value = values[i]
+            if isinstance(value, float) and np.isnan(value):
+                continue
+            horse[key] = value.item() if isinstance(value, np.generic) else value
+        horses.append(horse)
+    return horses
+
+
+def measure(func, repeat):
+    """
+    func を repeat 回実行し、最短時間（秒）と最後の結果を返す
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_benchmark(columns, rows, scalar_rows, repeat):
+    """
+    1種類の列の型の計測
+
+    Returns:
+        tuple: (スカラー版の全件換算の時間（秒）, バッチ版の時間（秒）)
+    """
+    horses = row_dicts(columns, scalar_rows)
+    scalar_time, expected = measure(
+        lambda: [calculate_all_indexes(horse, RACE_INFO, apply_normalization=False) for horse in horses], 1
+    )
+    batch_time, result = measure(
+        lambda: calculate_all_indexes_batch(columns, RACE_INFO, apply_normalization=False), repeat
+    )
+
+    for index_name in BATCH_INDEX_NAMES:
+        scalar_values = np.array([horse_result[index_name] for horse_result in expected])
+        if not np.allclose(result[index_name][:scalar_rows], scalar_values, rtol=0, atol=1e-9):
+            raise AssertionError(f'{index_name} がスカラー版と一致しません')
+
+    return scalar_time / scalar_rows * rows, batch_time
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='指数のバッチ計算のベンチマーク')
+    parser.add_argument('--rows', type=int, default=1000000, help='バッチ版で計算する件数')
+    parser.add_argument('--scalar-rows', type=int, default=20000, help='スカラー版で計測する件数')
+    parser.add_argument('--repeat', type=int, default=3, help='バッチ版の計測回数（最短時間を採用）')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    args = parser.parse_args()
+
+    # スカラー版は1頭ごとにログを出すため、計測中は止める
+    logging.disable(logging.CRITICAL)
+
+    print("\n" + "="*80)
+    print("指数のバッチ計算ベンチマーク")
+    print(f"件数: {args.rows:,}  スカラー版の計測件数: {args.scalar_rows:,}  計測回数: {args.repeat}")
+    print("="*80)
+
+    columns = generate_columns(args.rows, args.seed)
+    scalar_rows = min(args.scalar_rows, args.rows)
+
+    print(f"\n  {'列の型':<10} {'スカラー(s)':>12} {'バッチ(s)':>10} {'1件あたり(µs)':>14} {'速度比':>8}")
+    for label, typed_columns in [
+        ('混在リスト', columns),
+        ('文字列', to_string_columns(columns)),
+        ('数値', to_numeric_columns(columns)),
+    ]:
+        scalar_time, batch_time = run_benchmark(typed_columns, args.rows, scalar_rows, args.repeat)
+        per_row = batch_time / args.rows * 1e6
+        print(f"  {label:<10} {scalar_time:>12.1f} {batch_time:>10.2f} {per_row:>14.2f} {scalar_time / batch_time:>7.1f}x")
+
+    print("\n✅ スカラー版とバッチ版の4指数は一致（スカラー版は計測件数から全件に換算）")
+
+
+if __name__ == '__main__':
+    main()
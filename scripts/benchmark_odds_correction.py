@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+オッズ補正係数参照のマイクロベンチマーク
+================================================================================
+同じオッズ列に対して以下の3通りで補正係数を引き、処理時間を比較する:
+- 線形走査: get_odds_correction_linear（旧実装、補正表を先頭から走査）
+- 二分探索: get_odds_correction（bisect によるスカラー参照）
+- NumPy:    get_odds_corrections（searchsorted による配列一括参照）
+
+オッズは NAR の単勝オッズ分布に近い対数一様乱数（1.0〜500倍）で生成する。
+単勝・複勝（単勝オッズ × 0.4 で参照）の両方を計測し、結果の一致も確認する。
+
+使用方法:
+    python scripts/benchmark_odds_correction.py
+    python scripts/benchmark_odds_correction.py --rows 1000000 --repeat 5
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.odds_correction import (
+    get_odds_correction,
+    get_odds_corrections,
+    get_odds_correction_linear
+)
+
+
+def generate_odds(rows, seed):
+    """
+    計測用のオッズ列を生成（1.0〜500倍の対数一様、小数第1位に丸め）
+    """
+    rng = np.random.default_rng(seed)
+    odds = np.exp(rng.uniform(np.log(1.0), np.log(500.0), size=rows))
+    return np.round(odds, 1)
+
+
+def measure(func, repeat):
+    """
+    func を repeat 回実行し、最短時間（秒）と最後の結果を返す
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_benchmark(odds, is_fukusho, repeat):
+    """
+    1券種分の計測
+
+    Returns:
+        dict: {手法名: 最短時間（秒）}
+    """
+    odds_list = odds.tolist()
+
+    timings = {}
+    timings['線形走査'], linear = measure(
+        lambda: [get_odds_correction_linear(x, is_fukusho) for x in odds_list], repeat
+    )
+    timings['二分探索'], bisected = measure(
+        lambda: [get_odds_correction(x, is_fukusho) for x in odds_list], repeat
+    )
+    timings['NumPy'], vectorized = measure(
+        lambda: get_odds_corrections(odds, is_fukusho), repeat
+    )
+
+    if linear != bisected or not np.array_equal(np.asarray(linear), vectorized):
+        raise AssertionError('補正係数の参照結果が一致しません')
+
+    return timings
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='オッズ補正係数参照のマイクロベンチマーク')
+    parser.add_argument('--rows', type=int, default=200000, help='オッズの件数')
+    parser.add_argument('--repeat', type=int, default=3, help='計測回数（最短時間を採用）')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("オッズ補正係数参照ベンチマーク")
+    print(f"件数: {args.rows:,}  計測回数: {args.repeat}")
+    print("="*80)
+
+    odds = generate_odds(args.rows, args.seed)
+
+    for label, is_fukusho, values in [
+        ('単勝', False, odds),
+        ('複勝', True, odds * 0.4),
+    ]:
+        timings = run_benchmark(values, is_fukusho, args.repeat)
+        baseline = timings['線形走査']
+
+        print(f"\n📊 {label}")
+        print(f"  {'手法':<8} {'時間(ms)':>10} {'1件あたり(ns)':>14} {'速度比':>8}")
+        for name, elapsed in timings.items():
+            per_row = elapsed / args.rows * 1e9
+            print(f"  {name:<8} {elapsed * 1000:>10.1f} {per_row:>14.1f} {baseline / elapsed:>7.1f}x")
+
+    print("\n✅ 3手法の参照結果は一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ファクター統計キューブ構築スクリプト
+================================================================================
+nvd_se ⨝ nvd_ra（2016-2025）を競馬場ごとに1回だけ走査し、
+(競馬場, 距離, ファクター, 値, 年) 単位で的中数・ベット額・補正後払戻金を
+SQL側で集計して nar_factor_stats_cube に保存する。
+
+HQS計算時は core/factor_stats_cube.py がこのテーブルを主キー検索するため、
+ファクター × 出走馬ごとの全期間走査が不要になる。
+
+集計対象は全レースの確定着順が揃っている最新の開催日（前日まで）以前のレースで、
+その日付をハイウォーターマークとして nar_factor_stats_cube_state に保存する。
+結果の取り込み途中の開催日はハイウォーターマークにしない（差分更新で取りこぼすため）。
+以降の差分反映は scripts/update_factor_stats_cube.py で行う。
+
+使用方法:
+    python scripts/build_factor_stats_cube.py              # 全競馬場
+    python scripts/build_factor_stats_cube.py --keibajo 44 45
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from psycopg2.extras import execute_values
+
+from config.db_config import get_db_connection
+from core.corrected_return_sql import build_correction_ctes, build_run_payouts_sql, float_sql, int_sql
+from core.sql_conditions import build_date_sql_condition, split_date
+from core.factor_stats_cube import (
+    CUBE_TABLE,
+    CUBE_STATE_TABLE,
+    CUBE_START_YEAR,
+    CUBE_END_YEAR,
+    CUBE_FACTOR_COLUMNS,
+    CUBE_ALL,
+    reset_cube_availability
+)
+
+
+DDL_FILE = os.path.join(project_root, 'sql', 'create_factor_stats_cube.sql')
+
+# 確定着順が入らないまま経過したら結果待ちとみなさない日数（中止レースなど）
+SETTLE_DAYS = 7
+
+
+def ensure_cube_table(conn):
+    """
+    sql/create_factor_stats_cube.sql を実行してテーブルを作成（存在する場合は何もしない）
+    """
+    with open(DDL_FILE, encoding='utf-8') as f:
+        ddl = f.read()
+    with conn.cursor() as cur:
+        cur.execute(ddl)
+    conn.commit()
+
+
+def get_target_keibajo_codes(conn):
+    """
+    集計期間内に出走データのある競馬場コード一覧を取得
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT keibajo_code
+            FROM nvd_se
+            WHERE kaisai_nen >= %s AND kaisai_nen <= %s
+            ORDER BY keibajo_code
+        """, (CUBE_START_YEAR, CUBE_END_YEAR))
+        return [row[0] for row in cur.fetchall()]
+
+
+def get_earliest_pending_date(conn, until_date):
+    """
+    確定着順の入っていないレースが残る最も早い開催日を取得
+
+    nvd_ra にあって確定着順が1件も入っていないレースを「未確定」とみなす。
+    中止などで結果が入らないレースが差分更新を止め続けないよう、
+    until_date の SETTLE_DAYS 日前より後の開催日だけを対象にする。
+
+    Args:
+        conn: データベース接続
+        until_date: この日付（YYYYMMDD）以前に限定
+
+    Returns:
+        str or None: YYYYMMDD形式の日付（該当なしは None）
+    """
+    settle_date = (
+        datetime.strptime(until_date, '%Y%m%d') - timedelta(days=SETTLE_DAYS)
+    ).strftime('%Y%m%d')
+    since_condition, since_params = build_date_sql_condition('ra', '>', settle_date)
+    until_condition, until_params = build_date_sql_condition('ra', '<=', until_date)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT ra.kaisai_nen, ra.kaisai_tsukihi
+            FROM nvd_ra ra
+            WHERE ra.kaisai_nen >= %s AND ra.kaisai_nen <= %s
+              AND {since_condition}
+              AND {until_condition}
+              AND NOT EXISTS (
+                  SELECT 1
+                  FROM nvd_se se
+                  WHERE se.keibajo_code = ra.keibajo_code
+                    AND se.kaisai_nen = ra.kaisai_nen
+                    AND se.kaisai_tsukihi = ra.kaisai_tsukihi
+                    AND se.race_bango = ra.race_bango
+                    AND se.kakutei_chakujun ~ '^[0-9]+$'
+                    AND se.kakutei_chakujun::integer > 0
+              )
+            ORDER BY ra.kaisai_nen, ra.kaisai_tsukihi
+            LIMIT 1
+        """, [CUBE_START_YEAR, CUBE_END_YEAR] + since_params + until_params)
+        row = cur.fetchone()
+    return row[0] + row[1] if row else None
+
+
+def get_latest_finalized_date(conn, until_date):
+    """
+    集計期間内で、その日までの全レースの確定着順が揃っている最新の開催日を取得
+
+    ハイウォーターマークより後の開催日だけを差分として加算するため、
+    結果の取り込み途中の開催日をハイウォーターマークにすると残りのレースが反映されなくなる。
+    未確定のレースが残る最も早い開催日（get_earliest_pending_date()）の前日までに限定する。
+
+    Args:
+        conn: データベース接続
+        until_date: この日付（YYYYMMDD）以前に限定
+
+    Returns:
+        str or None: YYYYMMDD形式の日付（該当なしは None）
+    """
+    pending_date = get_earliest_pending_date(conn, until_date)
+    if pending_date is None:
+        until_condition, until_params = build_date_sql_condition(None, '<=', until_date)
+    else:
+        until_condition, until_params = build_date_sql_condition(None, '<', pending_date)
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT kaisai_nen, kaisai_tsukihi
+            FROM nvd_se
+            WHERE kaisai_nen >= %s AND kaisai_nen <= %s
+              AND {until_condition}
+              AND kakutei_chakujun ~ '^[0-9]+$'
+              AND kakutei_chakujun::integer > 0
+            ORDER BY kaisai_nen DESC, kaisai_tsukihi DESC
+            LIMIT 1
+        """, [CUBE_START_YEAR, CUBE_END_YEAR] + until_params)
+        row = cur.fetchone()
+    return row[0] + row[1] if row else None
+
+
+def get_watermark(conn):
+    """
+    キューブに反映済みの最終開催日（ハイウォーターマーク）を取得
+
+    Returns:
+        str or None: YYYYMMDD形式の日付（未構築の場合は None）
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT kaisai_nen, kaisai_tsukihi FROM {CUBE_STATE_TABLE} WHERE cube_name = %s",
+            (CUBE_TABLE,)
+        )
+        row = cur.fetchone()
+    return row[0] + row[1] if row else None
+
+
+def save_watermark(cur, date):
+    """
+    ハイウォーターマークを保存（コミットは呼び出し側で行う）
+
+    Args:
+        cur: カーソル（キューブ更新と同じトランザクション）
+        date: YYYYMMDD形式の日付
+    """
+    kaisai_nen, kaisai_tsukihi = split_date(date)
+    cur.execute(f"""
+        INSERT INTO {CUBE_STATE_TABLE} (cube_name, kaisai_nen, kaisai_tsukihi, updated_at)
+        VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (cube_name) DO UPDATE SET
+            kaisai_nen = EXCLUDED.kaisai_nen,
+            kaisai_tsukihi = EXCLUDED.kaisai_tsukihi,
+            updated_at = EXCLUDED.updated_at
+    """, (CUBE_TABLE, kaisai_nen, kaisai_tsukihi))
+
+
+def aggregate_cells(conn, condition, params):
+    """
+    出走データをSQL側で集計してキューブの行を取得
+
+    ベット額・補正後払戻金の計算と (競馬場, 距離, 年, ファクター値) ごとの合計は
+    GROUPING SETS による1回の走査で行い、集計済みの行だけを受け取る。
+    対象は集計期間（CUBE_START_YEAR〜CUBE_END_YEAR）内で condition を満たす出走。
+
+    Args:
+        conn: データベース接続
+        condition: 追加の絞り込み条件（nvd_se の別名は se）
+        params: condition のパラメータ
+
+    Returns:
+        dict: {(keibajo_code, kyori, factor_name, factor_value, year): [total_count, win_hit,
+               place_hit, bet_sum, win_payout_sum, place_payout_sum]}
+    """
+    ctes, cte_params = build_correction_ctes()
+    factor_columns = ', '.join(CUBE_FACTOR_COLUMNS)
+    grouping_sets = ', '.join(
+        ['(keibajo_code, kyori, year)']
+        + [f"(keibajo_code, kyori, year, {column})" for column in CUBE_FACTOR_COLUMNS]
+    )
+
+    query = f"""
+    WITH {ctes},
+    runs AS (
+        SELECT
+            se.keibajo_code,
+            se.kaisai_nen AS year,
+            ra.kyori::text::integer AS kyori,
+            {float_sql('se.tansho_odds', '1.0')} AS odds,
+            {int_sql('se.kakutei_chakujun', '99')} AS finish,
+            {', '.join(f"se.{column}" for column in CUBE_FACTOR_COLUMNS)}
+        FROM nvd_se se
+        JOIN nvd_ra ra ON
+            se.keibajo_code = ra.keibajo_code AND
+            se.kaisai_nen = ra.kaisai_nen AND
+            se.kaisai_tsukihi = ra.kaisai_tsukihi AND
+            se.race_bango = ra.race_bango
+        WHERE
+            se.kaisai_nen >= %s AND
+            se.kaisai_nen <= %s AND
+            ra.kyori::text ~ '^\\s*[0-9]+\\s*$' AND
+            {condition}
+    ),
+    payouts AS ({build_run_payouts_sql('runs')})
+    SELECT
+        keibajo_code,
+        kyori,
+        year,
+        {factor_columns},
+        GROUPING({factor_columns}) AS grouping_mask,
+        COUNT(*) AS total_count,
+        COUNT(*) FILTER (WHERE finish = 1) AS win_hit,
+        COUNT(*) FILTER (WHERE finish <= 3) AS place_hit,
+        SUM(bet_amount) AS bet_sum,
+        SUM(win_payout) AS win_payout_sum,
+        SUM(place_payout) AS place_payout_sum
+    FROM payouts
+    GROUP BY GROUPING SETS ({grouping_sets})
+    """
+
+    cells = {}
+    n_columns = len(CUBE_FACTOR_COLUMNS)
+
+    with conn.cursor() as cur:
+        cur.execute(query, cte_params + [CUBE_START_YEAR, CUBE_END_YEAR] + list(params))
+
+        for row in cur.fetchall():
+            keibajo_code, kyori, year = row[0], row[1], row[2]
+            values = row[3:3 + n_columns]
+            grouping_mask = row[3 + n_columns]
+            totals = list(row[4 + n_columns:])
+
+            # GROUPING() は集約された（グループ化に含まれない）列のビットが1
+            grouped = [
+                i for i in range(n_columns)
+                if not (grouping_mask >> (n_columns - 1 - i)) & 1
+            ]
+            if not grouped:
+                cells[(keibajo_code, kyori, CUBE_ALL, CUBE_ALL, year)] = totals
+                continue
+
+            column_index = grouped[0]
+            value = values[column_index]
+            if value is None:
+                continue
+            cells[(keibajo_code, kyori, CUBE_FACTOR_COLUMNS[column_index], value, year)] = totals
+
+    return cells
+
+
+def aggregate_keibajo(conn, keibajo_code, watermark):
+    """
+    1競馬場分の出走データ（ハイウォーターマーク以前）を集計してキューブの行を取得
+
+    Args:
+        conn: データベース接続
+        keibajo_code: 競馬場コード
+        watermark: 集計対象の最終開催日（YYYYMMDD）
+
+    Returns:
+        dict: aggregate_cells() と同じ形式
+    """
+    date_condition, date_params = build_date_sql_condition('se', '<=', watermark)
+    return aggregate_cells(
+        conn, f"se.keibajo_code = %s AND {date_condition}", [keibajo_code] + date_params
+    )
+
+
+def save_keibajo_cells(conn, keibajo_code, cells):
+    """
+    1競馬場分のキューブ行を入れ替え（削除 → 一括挿入を1トランザクションで実行）
+    """
+    rows = [
+        (*key, *cell)
+        for key, cell in cells.items()
+    ]
+
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {CUBE_TABLE} WHERE keibajo_code = %s", (keibajo_code,))
+        execute_values(cur, f"""
+            INSERT INTO {CUBE_TABLE}
+            (keibajo_code, kyori, factor_name, factor_value, year,
+             total_count, win_hit, place_hit, bet_sum, win_payout_sum, place_payout_sum)
+            VALUES %s
+        """, rows, page_size=5000)
+    conn.commit()
+
+    return len(rows)
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='ファクター統計キューブを構築')
+    parser.add_argument('--keibajo', nargs='*', default=None,
+                        help='対象競馬場コード（省略時は全競馬場）')
+    parser.add_argument('--until', type=str, default=None,
+                        help='集計対象の最終開催日 YYYYMMDD（省略時は前日。全競馬場の構築時のみ有効）')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("ファクター統計キューブ構築")
+    print(f"集計期間: {CUBE_START_YEAR}〜{CUBE_END_YEAR}年")
+    print("="*80 + "\n")
+
+    conn = get_db_connection()
+    start_time = datetime.now()
+
+    try:
+        ensure_cube_table(conn)
+
+        # 集計対象の最終開催日（ハイウォーターマーク）
+        # 一部の競馬場だけ再構築する場合は、他の競馬場と揃えるため既存の値を使う
+        watermark = get_watermark(conn) if args.keibajo else None
+        if watermark is None:
+            until_date = args.until or (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+            watermark = get_latest_finalized_date(conn, until_date)
+        if watermark is None:
+            print("❌ 集計対象の確定済みレースがありません")
+            return
+        print(f"集計対象: {watermark}までの確定済みレース")
+
+        keibajo_codes = args.keibajo or get_target_keibajo_codes(conn)
+        print(f"対象競馬場: {', '.join(keibajo_codes)}\n")
+
+        total_rows = 0
+        for keibajo_code in keibajo_codes:
+            print(f"📊 競馬場 {keibajo_code}: 集計中...")
+            cells = aggregate_keibajo(conn, keibajo_code, watermark)
+            saved = save_keibajo_cells(conn, keibajo_code, cells)
+            total_rows += saved
+            print(f"  ✅ {saved:,}行を保存")
+
+        with conn.cursor() as cur:
+            save_watermark(cur, watermark)
+        conn.commit()
+
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {CUBE_TABLE}")
+        conn.commit()
+        reset_cube_availability()
+
+        print(f"\n✅ キューブ構築完了: {total_rows:,}行（処理時間: {datetime.now() - start_time}）")
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+前走テーブル構築・差分更新スクリプト
+================================================================================
+nvd_se の確定済み出走ごとに、直前の出走（前走、競馬場は問わない）の着順・人気・距離・
+馬場・コーナー順位・休養週数などを LAG で計算し、nar_prev_race に保存する。
+
+ファクター統計（core/factor_stats_calculator.py）は prev_* ファクターの条件として
+このテーブルを nvd_se に結合し、競馬場 × 前走の値のインデックスで絞り込む。
+
+- --rebuild: 競馬場ごとに全出走を再計算して入れ替える
+             （前走は他の競馬場の出走も含めて LAG を計算する）
+- 省略時:    テーブル内の最終開催日以降に確定した出走を追加する
+             （最終開催日も再計算するため、結果の取り込み途中だった開催日も揃う）
+             （その馬の過去走を含めて LAG を計算するため、前走は全期間から正しく引ける）
+
+使用方法:
+    python scripts/build_prev_race_table.py --rebuild            # 全競馬場を再構築
+    python scripts/build_prev_race_table.py --rebuild --keibajo 44 45
+    python scripts/build_prev_race_table.py                      # 差分の反映
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from config.db_config import get_db_connection
+from core.sql_conditions import build_date_sql_condition
+from core.prev_race_table import (
+    PREV_RACE_TABLE,
+    PREV_RACE_SOURCE_COLUMNS,
+    build_prev_race_select_sql,
+    reset_prev_race_availability
+)
+
+
+DDL_FILE = os.path.join(project_root, 'sql', 'create_prev_race_table.sql')
+
+KEY_COLUMNS = ['kaisai_nen', 'kaisai_tsukihi', 'keibajo_code', 'race_bango', 'umaban']
+
+# build_prev_race_select_sql() の出力列の順
+TABLE_COLUMNS = KEY_COLUMNS + ['ketto_toroku_bango'] + list(PREV_RACE_SOURCE_COLUMNS) + ['kyuyo_weeks']
+
+
+def ensure_prev_race_table(conn):
+    """
+    sql/create_prev_race_table.sql を実行してテーブルを作成（存在する場合は何もしない）
+    """
+    with open(DDL_FILE, encoding='utf-8') as f:
+        ddl = f.read()
+    with conn.cursor() as cur:
+        cur.execute(ddl)
+    conn.commit()
+
+
+def get_target_keibajo_codes(conn):
+    """
+    出走データのある競馬場コード一覧を取得（競馬場コード61は除外）
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT keibajo_code
+            FROM nvd_se
+            WHERE keibajo_code != '61'
+            ORDER BY keibajo_code
+        """)
+        return [row[0] for row in cur.fetchall()]
+
+
+def get_latest_date(conn):
+    """
+    テーブルに反映済みの最終開催日を取得
+
+    Returns:
+        str or None: YYYYMMDD形式の日付（空の場合は None）
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT kaisai_nen, kaisai_tsukihi
+            FROM {PREV_RACE_TABLE}
+            ORDER BY kaisai_nen DESC, kaisai_tsukihi DESC
+            LIMIT 1
+        """)
+        row = cur.fetchone()
+    return row[0] + row[1] if row else None
+
+
+def build_upsert_sql(select_sql, outer_condition='TRUE'):
+    """
+    build_prev_race_select_sql() の結果を nar_prev_race に挿入（既存行は更新）するSQLを生成
+
+    Args:
+        select_sql: build_prev_race_select_sql() のSELECT文
+        outer_condition: LAG 計算後の行の絞り込み（別名 t）
+
+    Returns:
+        str: INSERT文
+    """
+    columns = ', '.join(TABLE_COLUMNS)
+    updates = ',\n            '.join(
+        f"{column} = EXCLUDED.{column}"
+        for column in TABLE_COLUMNS if column not in KEY_COLUMNS
+    )
+    return f"""
+        INSERT INTO {PREV_RACE_TABLE} ({columns})
+        SELECT {columns}
+        FROM ({select_sql}) t
+        WHERE {outer_condition}
+        ON CONFLICT ({', '.join(KEY_COLUMNS)}) DO UPDATE SET
+            {updates},
+            updated_at = CURRENT_TIMESTAMP
+    """
+
+
+def rebuild_keibajo(conn, keibajo_code):
+    """
+    1競馬場分の前走情報を再計算して入れ替え（削除 → 挿入を1トランザクションで実行）
+
+    前走は他の競馬場の出走でもよいため、この競馬場に出走した馬の全出走で LAG を計算し、
+    この競馬場の行だけを保存する。
+
+    Returns:
+        int: 保存した行数
+    """
+    horse_condition = """
+        se.ketto_toroku_bango IN (
+            SELECT venue_se.ketto_toroku_bango
+            FROM nvd_se venue_se
+            WHERE venue_se.keibajo_code = %s
+        )"""
+    query = build_upsert_sql(build_prev_race_select_sql(horse_condition), "t.keibajo_code = %s")
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {PREV_RACE_TABLE} WHERE keibajo_code = %s", (keibajo_code,))
+            cur.execute(query, (keibajo_code, keibajo_code))
+            saved = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return saved
+
+
+def apply_delta(conn, latest_date):
+    """
+    latest_date 以降に確定した出走の前走情報を追加
+
+    対象の出走がある馬（血統登録番号）の全出走で LAG を計算し、
+    latest_date 以降の行だけを保存する。
+    latest_date 当日も対象に含めるのは、結果の取り込み途中で前回反映した開催日の
+    残りの出走を取りこぼさないため（既存行は同じ値で更新されるだけ）。
+
+    Args:
+        conn: データベース接続
+        latest_date: 反映済みの最終開催日（YYYYMMDD）
+
+    Returns:
+        int: 保存した行数
+    """
+    new_condition, new_params = build_date_sql_condition('new_se', '>=', latest_date)
+    outer_condition, outer_params = build_date_sql_condition('t', '>=', latest_date)
+
+    horse_condition = f"""
+        se.ketto_toroku_bango IN (
+            SELECT new_se.ketto_toroku_bango
+            FROM nvd_se new_se
+            WHERE {new_condition}
+        )"""
+    query = build_upsert_sql(build_prev_race_select_sql(horse_condition), outer_condition)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, new_params + outer_params)
+            saved = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return saved
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='前走テーブル（nar_prev_race）を構築・差分更新')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='競馬場ごとに全出走を再計算する（省略時は差分のみ反映）')
+    parser.add_argument('--keibajo', nargs='*', default=None,
+                        help='再構築する競馬場コード（--rebuild 時のみ。省略時は全競馬場）')
+    args = parser.parse_args()
+
+    print("\n" + "="*80)
+    print("前走テーブル構築")
+    print("="*80 + "\n")
+
+    conn = get_db_connection()
+    start_time = datetime.now()
+
+    try:
+        ensure_prev_race_table(conn)
+
+        latest_date = None if args.rebuild else get_latest_date(conn)
+
+        if latest_date is None:
+            keibajo_codes = args.keibajo or get_target_keibajo_codes(conn)
+            print(f"対象競馬場: {', '.join(keibajo_codes)}\n")
+
+            total_rows = 0
+            for keibajo_code in keibajo_codes:
+                print(f"📊 競馬場 {keibajo_code}: 計算中...")
+                saved = rebuild_keibajo(conn, keibajo_code)
+                total_rows += saved
+                print(f"  ✅ {saved:,}行を保存")
+        else:
+            print(f"📊 差分反映: {latest_date} 以降に確定した出走")
+            total_rows = apply_delta(conn, latest_date)
+
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {PREV_RACE_TABLE}")
+        conn.commit()
+        reset_prev_race_availability()
+
+        print(f"\n✅ 前走テーブル更新完了: {total_rows:,}行（処理時間: {datetime.now() - start_time}）")
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -44,6 +44,7 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from config.db_config import get_db_connection
+from core.sql_conditions import build_date_range_sql_condition
 from core.index_calculator import (
     calculate_ten_index,
     calculate_position_index,
@@ -253,7 +254,9 @@ def collect_race_data(conn, keibajo_code: str, start_date: str, end_date: str) -
     """
     cursor = conn.cursor()
     
-    query = """
+    date_condition, date_params = build_date_range_sql_condition('ra', start_date, end_date)
+    
+    query = f"""
     SELECT 
         ra.kaisai_nen,
         ra.kaisai_tsukihi,
@@ -284,8 +287,7 @@ def collect_race_data(conn, keibajo_code: str, start_date: str, end_date: str) -
         ra.keibajo_code = od.keibajo_code AND
         ra.race_bango = od.race_bango
     WHERE ra.keibajo_code = %s
-        AND ra.kaisai_nen || ra.kaisai_tsukihi >= %s
-        AND ra.kaisai_nen || ra.kaisai_tsukihi <= %s
+        AND {date_condition}
         AND CAST(ra.kyori AS INTEGER) >= 1400
         AND se.kakutei_chakujun IS NOT NULL
         AND se.kakutei_chakujun != ''
@@ -298,7 +300,7 @@ def collect_race_data(conn, keibajo_code: str, start_date: str, end_date: str) -
     
     query += " ORDER BY ra.kaisai_nen, ra.kaisai_tsukihi, ra.race_bango"
     
-    cursor.execute(query, (keibajo_code, start_date, end_date))
+    cursor.execute(query, [keibajo_code] + date_params)
     
     columns = [desc[0] for desc in cursor.description]
     races = []
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+正規化器の推論用テーブル書き出しスクリプト
+================================================================================
+学習済みの正規化器（models/normalizers/*_normalizer.pkl）から分位点テーブルを取り出し、
+同じ名前の .npz に書き出す。core/index_calculator.get_normalizers() は .npz があれば
+それを読み込み、scikit-learn なしで正規化する（core/index_normalizer_runtime.py）。
+
+新しく学習した正規化器は RacingIndexNormalizer.save() が .npz も書き出すため、
+このスクリプトは既存の .pkl の変換にだけ使う。
+
+使用方法:
+    python scripts/export_normalizer_runtime.py
+    python scripts/export_normalizer_runtime.py --dir models/normalizers
+================================================================================
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.index_normalizer import RacingIndexNormalizer
+
+
+DEFAULT_NORMALIZERS_DIR = os.path.join(project_root, 'models', 'normalizers')
+
+
+def export_normalizer(pkl_path):
+    """
+    1つの正規化器を書き出し、元の正規化器と同じ値になるか確認
+
+    Returns:
+        tuple: (書き出し先のパス, 元の transform との最大差)
+    """
+    normalizer = RacingIndexNormalizer.load(pkl_path)
+    npz_path = os.path.splitext(pkl_path)[0] + '.npz'
+    runtime = normalizer.export_runtime(npz_path)
+
+    # 分位点の範囲の外側まで含めて比較
+    quantiles = runtime.quantiles
+    margin = (quantiles[-1] - quantiles[0]) * 0.1
+    samples = np.linspace(quantiles[0] - margin, quantiles[-1] + margin, 100001)
+    samples = np.concatenate([samples, quantiles])
+    max_diff = float(np.max(np.abs(normalizer.transform(samples) - runtime.transform(samples))))
+
+    return npz_path, max_diff
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='正規化器（.pkl）から推論用の分位点テーブル（.npz）を書き出す')
+    parser.add_argument('--dir', default=DEFAULT_NORMALIZERS_DIR, help='正規化器のディレクトリ')
+    args = parser.parse_args()
+
+    pkl_paths = sorted(glob.glob(os.path.join(args.dir, '*_normalizer.pkl')))
+    if not pkl_paths:
+        print(f"❌ 正規化器が見つかりません: {args.dir}")
+        sys.exit(1)
+
+    for pkl_path in pkl_paths:
+        npz_path, max_diff = export_normalizer(pkl_path)
+        print(f"✅ {os.path.basename(pkl_path)} → {os.path.basename(npz_path)} "
+              f"（{os.path.getsize(npz_path) / 1024:.1f}KB, 最大差 {max_diff:.2e}）")
+
+
+if __name__ == '__main__':
+    main()
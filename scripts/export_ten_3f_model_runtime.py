@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Ten3F推定モデルの推論用配列書き出しスクリプト
+================================================================================
+学習済みの LightGBM モデル（models/ten_3f_lgbm_model.pkl）から木の分岐と葉の値を取り出し、
+同じ名前の .npz に書き出す。Ten3FEstimator.load_model() は .npz があれば
+それを読み込み、lightgbm なしで予測する（core/tree_model_runtime.py）。
+
+新しく学習したモデルは scripts/train_ten_3f_model.py の save_model() が .npz も書き出すため、
+このスクリプトは既存の .pkl の変換にだけ使う。
+
+使用方法:
+    python scripts/export_ten_3f_model_runtime.py
+    python scripts/export_ten_3f_model_runtime.py --model models/ten_3f_lgbm_model.pkl
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from core.tree_model_runtime import TreeEnsembleModel
+
+
+DEFAULT_MODEL_PATH = os.path.join(project_root, 'models', 'ten_3f_lgbm_model.pkl')
+
+# 一致確認に使う乱数サンプルの数
+CHECK_SAMPLES = 100000
+
+
+def make_check_samples(runtime, size=CHECK_SAMPLES, seed=0):
+    """
+    分岐の閾値の前後・欠損値を含む確認用の特徴量
+    """
+    rng = np.random.default_rng(seed)
+    X = np.empty((size, runtime.num_features))
+    for feature in range(runtime.num_features):
+        thresholds = runtime.threshold[runtime.split_feature == feature]
+        if len(thresholds) == 0:
+            X[:, feature] = rng.normal(0, 1, size)
+            continue
+        # 閾値そのもの・前後の値・範囲外を混ぜる
+        values = rng.choice(thresholds, size)
+        offsets = rng.choice([0.0, -1e-9, 1e-9, -1.0, 1.0], size)
+        X[:, feature] = values + offsets * np.maximum(np.abs(values), 1.0)
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def export_model(model_path):
+    """
+    モデルを書き出し、元のモデルと同じ予測になるか確認
+
+    Returns:
+        tuple: (書き出し先のパス, 元の predict との最大差)
+    """
+    model = joblib.load(model_path)
+    runtime = TreeEnsembleModel.from_lightgbm(model)
+    npz_path = os.path.splitext(model_path)[0] + '.npz'
+    runtime.save(npz_path)
+
+    X = make_check_samples(runtime)
+    max_diff = float(np.max(np.abs(model.predict(X) - TreeEnsembleModel.load(npz_path).predict(X))))
+
+    return npz_path, max_diff
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='Ten3F推定モデル（.pkl）から推論用の木の配列（.npz）を書き出す')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='LightGBM モデルのパス')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"❌ モデルが見つかりません: {args.model}")
+        sys.exit(1)
+
+    npz_path, max_diff = export_model(args.model)
+    print(f"✅ {os.path.basename(args.model)} → {os.path.basename(npz_path)} "
+          f"（{os.path.getsize(npz_path) / 1024:.1f}KB, 最大差 {max_diff:.2e}）")
+    if max_diff != 0:
+        print("⚠️ 元のモデルと予測が一致しません")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
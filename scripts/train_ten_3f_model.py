@@ -16,6 +16,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 import joblib
 import logging
+import sys
 from pathlib import Path
 
 # ロギング設定
@@ -30,6 +31,9 @@ PROJECT_ROOT = Path(__file__).parent.parent
 MODEL_DIR = PROJECT_ROOT / "models"
 MODEL_DIR.mkdir(exist_ok=True)
 
+sys.path.insert(0, str(PROJECT_ROOT))
+from core.tree_model_runtime import TreeEnsembleModel
+
 
 def load_training_data(conn_params: dict) -> pd.DataFrame:
     """
@@ -217,12 +221,16 @@ def save_model(model: LGBMRegressor, model_path: Path):
     """
     モデルの保存
     
+    推論用の木の配列（拡張子を .npz にしたファイル）も同時に書き出す。
+    
     Args:
         model: 訓練済みモデル
         model_path: 保存先パス
     """
     joblib.dump(model, model_path)
     logger.info(f"モデル保存完了: {model_path}")
+    
+    TreeEnsembleModel.from_lightgbm(model).save(str(model_path.with_suffix('.npz')))
 
 
 def main():
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ファクター統計キューブ差分更新スクリプト
+================================================================================
+nar_factor_stats_cube_state のハイウォーターマーク（反映済みの最終開催日）より後に
+確定したレースだけを集計し、nar_factor_stats_cube に加算する。
+
+- ハイウォーターマークは全レースの確定着順が揃った開催日までしか進めない。
+  結果の取り込み途中の開催日は、揃った後の実行でまとめて加算する
+
+- 差分の加算とハイウォーターマークの更新は1トランザクションで行うため、
+  途中で失敗しても再実行で二重加算にならない（冪等）
+- 集計期間（CUBE_START_YEAR〜CUBE_END_YEAR）外のレースは対象外。
+  集計期間を変更した場合は scripts/build_factor_stats_cube.py で再構築する
+
+初回は scripts/build_factor_stats_cube.py でキューブを構築しておくこと。
+
+使用方法:
+    python scripts/update_factor_stats_cube.py                  # 前日までの確定分を反映
+    python scripts/update_factor_stats_cube.py --until 20250105
+    python scripts/update_factor_stats_cube.py --dry-run        # 差分の件数だけ表示
+================================================================================
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from psycopg2.extras import execute_values
+
+from config.db_config import get_db_connection
+from core.sql_conditions import build_date_sql_condition
+from core.factor_stats_cube import CUBE_TABLE
+from scripts.build_factor_stats_cube import (
+    ensure_cube_table,
+    aggregate_cells,
+    get_latest_finalized_date,
+    get_watermark,
+    save_watermark
+)
+
+
+def aggregate_delta(conn, watermark, until_date):
+    """
+    ハイウォーターマークより後、until_date 以前の出走を集計
+
+    Args:
+        conn: データベース接続
+        watermark: 反映済みの最終開催日（YYYYMMDD）
+        until_date: 今回反映する最終開催日（YYYYMMDD）
+
+    Returns:
+        dict: aggregate_cells() と同じ形式
+    """
+    after_condition, after_params = build_date_sql_condition('se', '>', watermark)
+    until_condition, until_params = build_date_sql_condition('se', '<=', until_date)
+    return aggregate_cells(
+        conn, f"{after_condition} AND {until_condition}", after_params + until_params
+    )
+
+
+def apply_delta(conn, cells, until_date):
+    """
+    差分をキューブに加算し、ハイウォーターマークを更新（1トランザクション）
+
+    Args:
+        conn: データベース接続
+        cells: aggregate_delta() の戻り値
+        until_date: 新しいハイウォーターマーク（YYYYMMDD）
+
+    Returns:
+        int: 加算した行数
+    """
+    rows = [
+        (*key, *cell)
+        for key, cell in cells.items()
+    ]
+
+    try:
+        with conn.cursor() as cur:
+            execute_values(cur, f"""
+                INSERT INTO {CUBE_TABLE} AS cube
+                (keibajo_code, kyori, factor_name, factor_value, year,
+                 total_count, win_hit, place_hit, bet_sum, win_payout_sum, place_payout_sum)
+                VALUES %s
+                ON CONFLICT (keibajo_code, kyori, factor_name, factor_value, year) DO UPDATE SET
+                    total_count = cube.total_count + EXCLUDED.total_count,
+                    win_hit = cube.win_hit + EXCLUDED.win_hit,
+                    place_hit = cube.place_hit + EXCLUDED.place_hit,
+                    bet_sum = cube.bet_sum + EXCLUDED.bet_sum,
+                    win_payout_sum = cube.win_payout_sum + EXCLUDED.win_payout_sum,
+                    place_payout_sum = cube.place_payout_sum + EXCLUDED.place_payout_sum,
+                    updated_at = CURRENT_TIMESTAMP
+            """, rows, page_size=5000)
+            save_watermark(cur, until_date)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return len(rows)
+
+
+def main():
+    """
+    メイン処理
+    """
+    parser = argparse.ArgumentParser(description='ファクター統計キューブに確定済みレースの差分を反映')
+    parser.add_argument('--until', type=str, default=None,
+                        help='反映する最終開催日 YYYYMMDD（省略時は前日）')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='差分を集計して件数だけ表示（キューブは更新しない）')
+    args = parser.parse_args()
+
+    until_date = args.until or (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+
+    print("\n" + "="*80)
+    print("ファクター統計キューブ差分更新")
+    print("="*80 + "\n")
+
+    conn = get_db_connection()
+    start_time = datetime.now()
+
+    try:
+        ensure_cube_table(conn)
+
+        watermark = get_watermark(conn)
+        if watermark is None:
+            print("❌ キューブが未構築です（先に scripts/build_factor_stats_cube.py を実行してください）")
+            return
+
+        latest = get_latest_finalized_date(conn, until_date)
+        if latest is None or latest <= watermark:
+            print(f"✅ 反映済み: {watermark}（新たに確定したレースはありません）")
+            return
+
+        print(f"📊 差分集計: {watermark} より後 〜 {latest}")
+        cells = aggregate_delta(conn, watermark, latest)
+
+        if args.dry_run:
+            conn.rollback()
+            print(f"  差分: {len(cells):,}行（--dry-run のため未反映）")
+            return
+
+        applied = apply_delta(conn, cells, latest)
+        print(f"\n✅ 差分反映完了: {applied:,}行（ハイウォーターマーク: {latest}、"
+              f"処理時間: {datetime.now() - start_time}）")
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+-- ============================================================
+-- 開催日付の複合インデックス作成（マイグレーション）
+-- ============================================================
+-- 目的: (kaisai_nen, kaisai_tsukihi) の行値比較で
+--       nvd_se / nvd_ra / nvd_o1 の全件走査を回避する
+--
+-- 前提: クエリ側の日付条件は core/sql_conditions.py で生成した
+--       (kaisai_nen, kaisai_tsukihi) の行値比較・等価条件を使用すること
+--       （kaisai_nen || kaisai_tsukihi の連結式ではインデックスが使われない）
+--
+-- 実行方法:
+--   psql -U postgres -d pckeiba -f sql/create_date_indexes.sql
+--
+-- 注意: CREATE INDEX CONCURRENTLY はトランザクション内で実行できないため、
+--       psql の自動コミットモードで実行すること（-1 / --single-transaction 不可）
+-- ============================================================
+
+-- ============================================================
+-- 1. nvd_se（出走馬成績）
+-- ============================================================
+
+-- 開催日・レース単位の取得（出走表、1レース分の全馬）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nvd_se_date_race
+    ON nvd_se (kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango);
+
+-- 馬IDごとの前走・過去3走の取得（ORDER BY 開催日 DESC LIMIT n）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nvd_se_ketto_date
+    ON nvd_se (ketto_toroku_bango, kaisai_nen, kaisai_tsukihi);
+
+-- 競馬場別・期間指定の集計（ファクター統計、指数統計）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nvd_se_keibajo_date
+    ON nvd_se (keibajo_code, kaisai_nen, kaisai_tsukihi);
+
+-- ============================================================
+-- 2. nvd_ra（レース詳細）
+-- ============================================================
+
+-- 開催日のレース情報一括取得・nvd_se との結合
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nvd_ra_date_race
+    ON nvd_ra (kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango);
+
+-- 競馬場別・期間指定のレース取得（collect_index_stats_fixed.py）
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nvd_ra_keibajo_date
+    ON nvd_ra (keibajo_code, kaisai_nen, kaisai_tsukihi);
+
+-- ============================================================
+-- 3. nvd_o1（単複オッズ）
+-- ============================================================
+
+-- nvd_ra との結合キー
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nvd_o1_date_race
+    ON nvd_o1 (kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango);
+
+-- ============================================================
+-- 4. 統計情報の更新
+-- ============================================================
+
+ANALYZE nvd_se;
+ANALYZE nvd_ra;
+ANALYZE nvd_o1;
+
+-- ============================================================
+-- 確認用クエリ
+-- ============================================================
+
+-- SELECT tablename, indexname, indexdef
+-- FROM pg_indexes
+-- WHERE tablename IN ('nvd_se', 'nvd_ra', 'nvd_o1')
+-- ORDER BY tablename, indexname;
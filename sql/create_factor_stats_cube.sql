@@ -0,0 +1,63 @@
+-- ============================================================
+-- ファクター統計キューブ（事前集計テーブル）
+-- ============================================================
+-- 目的: HQS計算時のファクター統計（補正回収率）を
+--       nvd_se ⨝ nvd_ra の全期間走査から主キー検索に置き換える
+--
+-- 粒度: (競馬場, 距離, ファクター, 値, 年)
+--       年度重みを掛ける前の合計値を保持するため、
+--       YEAR_WEIGHTS を変更しても再構築は不要
+--
+-- factor_name:
+--   nvd_se の列名（wakuban, umaban, seibetsu_code, barei,
+--   kishumei_ryakusho, chokyoshimei_ryakusho）、
+--   または条件なしの集計を表す '*'（factor_value も '*'）
+--
+-- 構築: python scripts/build_factor_stats_cube.py
+-- 差分: python scripts/update_factor_stats_cube.py
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS nar_factor_stats_cube (
+    -- 主キー
+    keibajo_code VARCHAR(2) NOT NULL,        -- 競馬場コード
+    kyori INTEGER NOT NULL,                  -- 距離（m）
+    factor_name VARCHAR(40) NOT NULL,        -- ファクター名（nvd_se列名 or '*'）
+    factor_value VARCHAR(40) NOT NULL,       -- ファクター値
+    year VARCHAR(4) NOT NULL,                -- 開催年
+
+    -- 集計値（年度重み適用前）
+    total_count INTEGER NOT NULL DEFAULT 0,               -- 出走数
+    win_hit INTEGER NOT NULL DEFAULT 0,                   -- 単勝的中数（1着）
+    place_hit INTEGER NOT NULL DEFAULT 0,                 -- 複勝的中数（3着以内）
+    bet_sum DOUBLE PRECISION NOT NULL DEFAULT 0,          -- ベット額合計（均等払戻方式）
+    win_payout_sum DOUBLE PRECISION NOT NULL DEFAULT 0,   -- 補正後単勝払戻金合計
+    place_payout_sum DOUBLE PRECISION NOT NULL DEFAULT 0, -- 補正後複勝払戻金合計
+
+    -- メタデータ
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (keibajo_code, kyori, factor_name, factor_value, year)
+);
+
+COMMENT ON TABLE nar_factor_stats_cube IS 'ファクター統計キューブ（競馬場・距離・ファクター・値・年別の事前集計）';
+COMMENT ON COLUMN nar_factor_stats_cube.bet_sum IS 'ベット額合計（TARGET_PAYOUT / 単勝オッズ）';
+COMMENT ON COLUMN nar_factor_stats_cube.win_payout_sum IS '補正後単勝払戻金合計（TARGET_PAYOUT × 単勝補正係数）';
+COMMENT ON COLUMN nar_factor_stats_cube.place_payout_sum IS '補正後複勝払戻金合計（TARGET_PAYOUT × 0.4 × 複勝補正係数）';
+
+-- ============================================================
+-- キューブの反映状況（ハイウォーターマーク）
+-- ============================================================
+-- キューブに反映済みの最終開催日を保持する。
+-- scripts/update_factor_stats_cube.py はこの日付より後の確定済みレースだけを集計し、
+-- 差分の加算とハイウォーターマークの更新を1トランザクションで行う
+-- （再実行しても同じレースが二重に加算されない）。
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS nar_factor_stats_cube_state (
+    cube_name VARCHAR(60) PRIMARY KEY,       -- キューブのテーブル名
+    kaisai_nen VARCHAR(4) NOT NULL,          -- 反映済みの最終開催年
+    kaisai_tsukihi VARCHAR(4) NOT NULL,      -- 反映済みの最終開催月日
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE nar_factor_stats_cube_state IS 'ファクター統計キューブの反映済み最終開催日';
@@ -0,0 +1,88 @@
+-- ============================================================
+-- 前走テーブル（LAG による前走情報の事前計算）
+-- ============================================================
+-- 目的: prev_* ファクター（前走着順・前走人気・前走距離・前走馬場・休養週数など）の
+--       ファクター統計を、条件なし（1=1）の全件走査から
+--       インデックスで絞り込める検索に置き換える
+--
+-- 粒度: nvd_se の確定済み出走1行につき1行
+--       前走は factor_extractor.get_previous_race_data と同じく競馬場を問わない直前の出走
+--       （着順確定済み・今走より前の最新走、競馬場コード61は除外）
+--       前走のない出走（初出走）は prev_* が NULL
+--
+-- 結合: nvd_se se と (kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango, umaban) で結合
+--       （core/prev_race_table.py の build_prev_race_join_sql）
+--
+-- 構築: python scripts/build_prev_race_table.py --rebuild
+-- 差分: python scripts/build_prev_race_table.py
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS nar_prev_race (
+    -- 主キー（nvd_se の出走）
+    kaisai_nen VARCHAR(4) NOT NULL,      -- 開催年
+    kaisai_tsukihi VARCHAR(4) NOT NULL,  -- 開催月日
+    keibajo_code VARCHAR(2) NOT NULL,    -- 競馬場コード
+    race_bango VARCHAR NOT NULL,         -- レース番号
+    umaban VARCHAR NOT NULL,             -- 馬番
+    ketto_toroku_bango VARCHAR,          -- 血統登録番号
+
+    -- 前走情報（nvd_se / nvd_ra の値をそのまま保持）
+    prev_chakujun VARCHAR,               -- 前走確定着順
+    prev_ninkijun VARCHAR,               -- 前走単勝人気順
+    prev_kyori VARCHAR,                  -- 前走距離
+    prev_baba VARCHAR,                   -- 前走馬場状態コード（babajotai_code_dirt）
+    prev_wakuban VARCHAR,                -- 前走枠番
+    prev_corner_1 VARCHAR,               -- 前走1コーナー順位
+    prev_corner_2 VARCHAR,               -- 前走2コーナー順位
+    prev_corner_3 VARCHAR,               -- 前走3コーナー順位
+    prev_corner_4 VARCHAR,               -- 前走4コーナー順位
+    prev_time_sa VARCHAR,                -- 前走タイム差
+    prev_kohan_3f VARCHAR,               -- 前走後半3F
+    prev_race_date VARCHAR,              -- 前走日付（YYYYMMDD）
+    kyuyo_weeks VARCHAR,                 -- 休養週数（前走からの日数 ÷ 7、切り捨て）
+
+    -- メタデータ
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (kaisai_nen, kaisai_tsukihi, keibajo_code, race_bango, umaban)
+);
+
+COMMENT ON TABLE nar_prev_race IS '出走ごとの前走情報（競馬場を問わない直前の確定済み出走、LAGで算出）';
+COMMENT ON COLUMN nar_prev_race.kyuyo_weeks IS '休養週数（factor_extractor.calculate_kyuyo_weeks と同じ定義。他の前走列と同じく文字列で保持）';
+
+-- ============================================================
+-- ファクター統計用インデックス
+-- ============================================================
+-- ファクター統計は「競馬場 × 前走の値」で絞り込むため、
+-- (keibajo_code, 前走列, kaisai_nen) の複合インデックスを列ごとに作成する
+-- （集計期間 kaisai_nen の範囲条件もインデックス内で評価できる）
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_chakujun
+    ON nar_prev_race (keibajo_code, prev_chakujun, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_ninkijun
+    ON nar_prev_race (keibajo_code, prev_ninkijun, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_kyori
+    ON nar_prev_race (keibajo_code, prev_kyori, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_baba
+    ON nar_prev_race (keibajo_code, prev_baba, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_wakuban
+    ON nar_prev_race (keibajo_code, prev_wakuban, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_corner_1
+    ON nar_prev_race (keibajo_code, prev_corner_1, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_corner_2
+    ON nar_prev_race (keibajo_code, prev_corner_2, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_corner_3
+    ON nar_prev_race (keibajo_code, prev_corner_3, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_corner_4
+    ON nar_prev_race (keibajo_code, prev_corner_4, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_time_sa
+    ON nar_prev_race (keibajo_code, prev_time_sa, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_kohan_3f
+    ON nar_prev_race (keibajo_code, prev_kohan_3f, kaisai_nen);
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_kyuyo_weeks
+    ON nar_prev_race (keibajo_code, kyuyo_weeks, kaisai_nen);
+
+-- 差分更新時の対象馬の過去走取得
+CREATE INDEX IF NOT EXISTS idx_nar_prev_race_ketto
+    ON nar_prev_race (ketto_toroku_bango);
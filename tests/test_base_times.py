@@ -0,0 +1,119 @@
+"""
+基準タイム参照テーブル（config/base_times.py）単体テスト
+
+事前コンパイルした参照テーブルの get_base_time / get_base_times が、
+BASE_TIMES の辞書を直接たどる従来の実装と同じ値を返すことを確認する。
+
+実行方法:
+    python -m pytest tests/test_base_times.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from config import base_times
+from config.base_times import BASE_TIMES, get_base_time, get_base_times
+
+
+def reference_get_base_time(keibajo_code, kyori, time_type, grade_code=None):
+    """従来の get_base_time（辞書を直接たどる実装）"""
+    if keibajo_code not in BASE_TIMES:
+        return 36.5 if time_type == 'zenhan_3f' else 39.0
+
+    venue_times = BASE_TIMES[keibajo_code]
+
+    def from_data(data):
+        if isinstance(data, dict) and any(k in data for k in ['上位クラス', 'E級', '一般戦']):
+            if grade_code:
+                if grade_code == 'E':
+                    class_name = 'E級'
+                elif grade_code in ['A', 'B', 'C', 'D', 'P', 'Q', 'R', 'S', 'T']:
+                    class_name = '上位クラス'
+                else:
+                    class_name = '一般戦'
+                if class_name in data and time_type in data[class_name]:
+                    return data[class_name][time_type]
+            if '一般戦' in data and time_type in data['一般戦']:
+                return data['一般戦'][time_type]
+            if 'E級' in data and time_type in data['E級']:
+                return data['E級'][time_type]
+        if time_type in data:
+            return data[time_type]
+        return None
+
+    if kyori in venue_times:
+        value = from_data(venue_times[kyori])
+        if value is not None:
+            return value
+
+    closest_kyori = min(venue_times.keys(), key=lambda k: abs(k - kyori))
+    value = from_data(venue_times[closest_kyori])
+    if value is not None:
+        return value
+
+    return 36.5 if time_type == 'zenhan_3f' else 39.0
+
+
+KEIBAJO_CODES = list(BASE_TIMES.keys()) + ['65', '99']
+GRADE_CODES = [None, '', 'A', 'E', 'T', 'Z']
+KYORI_VALUES = list(range(0, 3201, 50)) + [1230, 1250, 1249, 1251, 1600.0, 1625.5, -100, 10000]
+
+
+class TestGetBaseTime:
+    """スカラー版の参照"""
+
+    @pytest.mark.parametrize('time_type', ['zenhan_3f', 'kohan_3f', 'soha_time'])
+    def test_matches_reference(self, time_type):
+        for keibajo_code in KEIBAJO_CODES:
+            for grade_code in GRADE_CODES:
+                for kyori in KYORI_VALUES:
+                    expected = reference_get_base_time(keibajo_code, kyori, time_type, grade_code)
+                    actual = get_base_time(keibajo_code, kyori, time_type, grade_code)
+                    assert actual == expected, (keibajo_code, kyori, time_type, grade_code)
+
+    def test_numpy_scalars(self):
+        assert get_base_time('44', np.int64(1600), 'zenhan_3f') == reference_get_base_time('44', 1600, 'zenhan_3f')
+        assert get_base_time('44', np.float64(1601.0), 'kohan_3f') == reference_get_base_time('44', 1601, 'kohan_3f')
+
+    def test_recompile_after_change(self, monkeypatch):
+        monkeypatch.setitem(BASE_TIMES, '99', {1000: {'zenhan_3f': 30.0, 'kohan_3f': 35.0}})
+        base_times.compile_base_times()
+        try:
+            assert get_base_time('99', 1100, 'kohan_3f') == 35.0
+        finally:
+            monkeypatch.undo()
+            base_times.compile_base_times()
+        assert get_base_time('99', 1100, 'kohan_3f') == 39.0
+
+
+class TestGetBaseTimes:
+    """配列版の参照"""
+
+    @pytest.mark.parametrize('time_type', ['zenhan_3f', 'kohan_3f'])
+    def test_matches_scalar(self, time_type):
+        rows = [
+            (keibajo_code, kyori, grade_code)
+            for keibajo_code in KEIBAJO_CODES
+            for kyori in KYORI_VALUES
+            for grade_code in GRADE_CODES
+        ]
+        codes, kyori, grades = zip(*rows)
+        expected = [get_base_time(*row[:2], time_type, row[2]) for row in rows]
+
+        np.testing.assert_array_equal(get_base_times(np.array(codes), kyori, time_type, list(grades)), expected)
+        # object 配列・文字列配列のどちらでもよい
+        np.testing.assert_array_equal(
+            get_base_times(np.array(codes, dtype=object), np.array(kyori), time_type, np.array([g or '' for g in grades])),
+            [get_base_time(*row[:2], time_type, row[2] or '') for row in rows]
+        )
+
+    def test_without_grade_and_unknown_codes(self):
+        actual = get_base_times(['44', '99'], [1600, 1600], 'zenhan_3f')
+        assert list(actual) == [get_base_time('44', 1600, 'zenhan_3f'), 36.5]
+        # 整数の競馬場コードは get_base_time と同じく未対応扱い
+        assert list(get_base_times(np.array([44]), [1600], 'kohan_3f')) == [get_base_time(44, 1600, 'kohan_3f')]
+        assert len(get_base_times([], [], 'zenhan_3f')) == 0
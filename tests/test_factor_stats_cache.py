@@ -0,0 +1,51 @@
+"""
+ファクター統計キャッシュ（LRU）単体テスト
+
+実行方法:
+    python -m pytest tests/test_factor_stats_cache.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.factor_stats_cache import FactorStatsCache
+
+
+class TestFactorStatsCache:
+    """LRUキャッシュの基本動作"""
+
+    def test_hit_and_miss_counters(self):
+        cache = FactorStatsCache(max_size=10)
+        assert cache.get('44', 1600, 'wakuban', '1') is None
+        cache.put('44', 1600, 'wakuban', '1', {'cntWin': 5})
+        assert cache.get('44', '1600', 'wakuban', 1) == {'cntWin': 5}
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+
+    def test_returns_copy(self):
+        cache = FactorStatsCache()
+        cache.put('44', 1600, 'wakuban', '1', {'cntWin': 5})
+        cache.get('44', 1600, 'wakuban', '1')['cntWin'] = 99
+        assert cache.get('44', 1600, 'wakuban', '1') == {'cntWin': 5}
+
+    def test_evicts_least_recently_used(self):
+        cache = FactorStatsCache(max_size=2)
+        cache.put('44', 1600, 'wakuban', '1', {'v': 1})
+        cache.put('44', 1600, 'wakuban', '2', {'v': 2})
+        cache.get('44', 1600, 'wakuban', '1')
+        cache.put('44', 1600, 'wakuban', '3', {'v': 3})
+        assert cache.get('44', 1600, 'wakuban', '2') is None
+        assert cache.get('44', 1600, 'wakuban', '1') == {'v': 1}
+        assert cache.stats()['evictions'] == 1
+
+    def test_invalidate(self):
+        cache = FactorStatsCache()
+        cache.put('44', 1600, 'wakuban', '1', {'v': 1})
+        cache.put('44', 1200, 'kishu_mei', 'A', {'v': 2})
+        cache.put('45', 1600, 'wakuban', '1', {'v': 3})
+        assert cache.invalidate(keibajo_code='44', factor_name='wakuban') == 1
+        assert cache.invalidate(kyori=1600) == 1
+        assert len(cache) == 1
+        cache.clear()
+        assert len(cache) == 0 and cache.stats()['misses'] == 0
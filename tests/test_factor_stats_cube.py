@@ -0,0 +1,182 @@
+"""
+ファクター統計キューブ 単体テスト
+
+テスト項目:
+1. ファクター名・値 → キューブキーの解決（build_factor_condition と同じ規則）
+2. 年別集計行からの補正回収率が出走行からの計算と一致すること
+3. ハイウォーターマークが結果の取り込み途中の開催日に進まないこと
+
+実行方法:
+    python -m pytest tests/test_factor_stats_cube.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+from collections import defaultdict
+
+import pytest
+
+from core.factor_stats_calculator import (
+    summarize_corrected_return_rows,
+    calculate_row_payouts,
+    build_factor_condition
+)
+from core.factor_stats_cube import resolve_cube_key, aggregate_cube_rows, CUBE_ALL
+from scripts.build_factor_stats_cube import get_latest_finalized_date, get_watermark
+
+
+class FakeConnection:
+    """実行したSQLを記録し、用意した行を順に返す接続"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append((sql, params))
+
+    def fetchone(self):
+        return self.connection.rows.pop(0)
+
+
+def _sample_rows(n, seed=0):
+    rnd = random.Random(seed)
+    return [
+        {
+            'year': str(rnd.randint(2014, 2025)),  # 重み0の年（範囲外）も含める
+            'win_odds': rnd.choice(['', '1.4', '2.3', '5.8', '16.2', '48.5', '120.0', '450.0']),
+            'finish_position': rnd.choice(['', '1', '2', '3', '4', '9', '12']),
+            'prize_money': '0',
+        }
+        for _ in range(n)
+    ]
+
+
+def _to_cube_rows(rows):
+    """ビルダーと同じ規則で年別に集計"""
+    cells = defaultdict(lambda: [0, 0, 0, 0.0, 0.0, 0.0])
+    for row in rows:
+        win_odds = float(row['win_odds']) if row['win_odds'] else 1.0
+        finish = int(row['finish_position']) if row['finish_position'] else 99
+        bet, win_payout, place_payout, win_flag, place_flag = calculate_row_payouts(win_odds, finish)
+        cell = cells[row['year']]
+        cell[0] += 1
+        cell[1] += win_flag
+        cell[2] += place_flag
+        cell[3] += bet
+        cell[4] += win_payout
+        cell[5] += place_payout
+    return [
+        {
+            'year': year, 'total_count': c[0], 'win_hit': c[1], 'place_hit': c[2],
+            'bet_sum': c[3], 'win_payout_sum': c[4], 'place_payout_sum': c[5],
+        }
+        for year, c in cells.items()
+    ]
+
+
+class TestResolveCubeKey:
+    """キューブキーの解決"""
+
+    def test_conditioned_factor(self):
+        assert resolve_cube_key('wakuban', 3) == ('wakuban', '3')
+
+    def test_unconditioned_factor(self):
+        assert resolve_cube_key('kishu_mei', 'X') == (CUBE_ALL, CUBE_ALL)
+        assert resolve_cube_key('prev_soha_time', '1234') == (CUBE_ALL, CUBE_ALL)
+
+    def test_prev_race_factor(self):
+        assert resolve_cube_key('prev_chakujun', 1) == ('prev_chakujun', '1')
+        assert resolve_cube_key('kyuyo_weeks', 4) == ('kyuyo_weeks', '4')
+
+    def test_combination_with_one_condition(self):
+        assert resolve_cube_key('wakuban_x_prev_soha_time', '3_x_1234') == ('wakuban', '3')
+
+    def test_combination_with_two_conditions(self):
+        assert resolve_cube_key('wakuban_x_umaban', '3_x_5') is None
+        assert resolve_cube_key('wakuban_x_prev_chakujun', '3_x_1') is None
+
+
+class TestBuildFactorCondition:
+    """ファクター条件（値はパラメータ、SQLはファクターの種類ごとに同一）"""
+
+    def test_column_factor(self):
+        assert build_factor_condition('wakuban', 3) == ("se.wakuban = %s", ['3'])
+        assert build_factor_condition('wakuban', 5)[0] == build_factor_condition('wakuban', 3)[0]
+
+    def test_prev_race_factor(self):
+        assert build_factor_condition('prev_chakujun', '1') == ("pr.prev_chakujun = %s", ['1'])
+        assert build_factor_condition('prev_chakujun', '1', use_prev_race=False) == ("1=1", [])
+        assert build_factor_condition('prev_soha_time', '1234') == ("1=1", [])
+
+    def test_combination(self):
+        assert build_factor_condition('wakuban_x_prev_chakujun', '3_x_1') == (
+            "se.wakuban = %s AND pr.prev_chakujun = %s", ['3', '1']
+        )
+
+
+class TestAggregateCubeRows:
+    """年別集計からの補正回収率（出走行からの計算との一致）"""
+
+    @pytest.mark.parametrize('seed', [0, 1, 2])
+    def test_matches_live_calculation(self, seed):
+        rows = _sample_rows(500, seed)
+        live = summarize_corrected_return_rows(rows)
+        cube = aggregate_cube_rows(_to_cube_rows(rows))
+        assert cube['total_count'] == live['total_count']
+        assert cube['win_rate'] == live['win_rate']
+        assert cube['place_rate'] == live['place_rate']
+        assert cube['corrected_win_return'] == pytest.approx(live['corrected_win_return'], abs=0.01)
+        assert cube['corrected_place_return'] == pytest.approx(live['corrected_place_return'], abs=0.01)
+
+    def test_empty(self):
+        live = summarize_corrected_return_rows([])
+        assert aggregate_cube_rows([]) == live
+
+
+class TestLatestFinalizedDate:
+    """ハイウォーターマークにする開催日"""
+
+    def test_stops_before_pending_day(self):
+        # 20250104 に未確定のレースが残っている → 20250104 より前の最新の確定日
+        conn = FakeConnection([('2025', '0104'), ('2025', '0103')])
+        assert get_latest_finalized_date(conn, '20250105') == '20250103'
+
+        pending_sql, pending_params = conn.executed[0]
+        assert 'NOT EXISTS' in pending_sql
+        # 未確定とみなすのは until の SETTLE_DAYS 日前より後だけ
+        assert pending_params[2:] == ['2024', '1229', '2025', '0105']
+
+        latest_sql, latest_params = conn.executed[1]
+        assert '(kaisai_nen, kaisai_tsukihi) < (%s, %s)' in latest_sql
+        assert latest_params[2:] == ['2025', '0104']
+
+    def test_all_finalized_uses_until(self):
+        conn = FakeConnection([None, ('2025', '0105')])
+        assert get_latest_finalized_date(conn, '20250105') == '20250105'
+        latest_sql, latest_params = conn.executed[1]
+        assert '(kaisai_nen, kaisai_tsukihi) <= (%s, %s)' in latest_sql
+        assert latest_params[2:] == ['2025', '0105']
+
+    def test_no_concatenated_dates(self):
+        conn = FakeConnection([('2025', '0104'), None, ('2025', '0103')])
+        assert get_latest_finalized_date(conn, '20250105') is None
+        assert get_watermark(conn) == '20250103'
+        assert all('||' not in sql for sql, _ in conn.executed)
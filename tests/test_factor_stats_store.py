@@ -0,0 +1,82 @@
+"""
+ファクター統計の永続キャッシュ（SQLite）単体テスト
+
+実行方法:
+    python -m pytest tests/test_factor_stats_store.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.factor_stats_cache import FactorStatsCache
+from core.factor_stats_store import FactorStatsStore, build_namespace
+
+
+KEY = FactorStatsCache.make_key('44', 1600, 'wakuban', '1')
+WATERMARK = {'results': ['20250110', 120], 'cube': '20250110', 'prev_race': None}
+
+
+class TestFactorStatsStore:
+    """永続キャッシュの保存と無効化"""
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / 'stats.sqlite3')
+        store = FactorStatsStore(path, 'ns1')
+        store.put(KEY, {'total_count': 10})
+        assert store.get(KEY) == {'total_count': 10}
+        store.close()
+
+        store = FactorStatsStore(path, 'ns1')
+        assert store.get(KEY) == {'total_count': 10}
+        assert len(store) == 1
+        store.close()
+
+    def test_other_namespace_is_purged(self, tmp_path):
+        path = str(tmp_path / 'stats.sqlite3')
+        store = FactorStatsStore(path, 'ns1')
+        store.put(KEY, {'total_count': 10})
+        store.close()
+
+        store = FactorStatsStore(path, 'ns2')
+        assert store.purged == 1
+        assert store.get(KEY) is None
+        store.close()
+
+    def test_namespace_follows_watermark_and_config(self):
+        base = build_namespace(WATERMARK, 'config-a')
+        assert build_namespace(dict(WATERMARK), 'config-a') == base
+
+        newer = dict(WATERMARK, results=['20250111', 98])
+        assert build_namespace(newer, 'config-a') != base
+        assert build_namespace(WATERMARK, 'config-b') != base
+
+
+class TestFactorStatsCacheWithStore:
+    """LRUキャッシュから永続キャッシュへのフォールバック"""
+
+    def test_put_writes_through_and_get_falls_back(self, tmp_path):
+        store = FactorStatsStore(str(tmp_path / 'stats.sqlite3'), 'ns1')
+        cache = FactorStatsCache()
+        cache.attach_store(store)
+        cache.put('44', 1600, 'wakuban', '1', {'total_count': 10})
+
+        cache.clear()
+        assert cache.get('44', '1600', 'wakuban', 1) == {'total_count': 10}
+        assert cache.get('44', 1600, 'wakuban', '2') is None
+        stats = cache.stats()
+        assert (stats['hits'], stats['store_hits'], stats['misses']) == (1, 1, 1)
+
+        # 2回目はメモリから返す
+        cache.get('44', 1600, 'wakuban', '1')
+        assert cache.stats()['store_hits'] == 1
+        store.close()
+
+    def test_detach_store(self, tmp_path):
+        store = FactorStatsStore(str(tmp_path / 'stats.sqlite3'), 'ns1')
+        cache = FactorStatsCache()
+        cache.attach_store(store)
+        assert cache.attach_store(None) is store
+        cache.put('44', 1600, 'wakuban', '1', {'total_count': 10})
+        assert store.get(KEY) is None
+        store.close()
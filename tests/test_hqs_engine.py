@@ -0,0 +1,131 @@
+"""
+HQS行列計算エンジン 単体テスト
+
+テスト項目:
+1. 行列計算の総合HQS得点が、ファクターごとのループ計算と一致すること
+2. 全頭が同じ値のファクター・有効な値が1頭以下のファクターは得点0
+3. 複数レースの一括計算（score_races_hqs）がレースごとの計算と一致すること
+
+実行方法:
+    python -m pytest tests/test_hqs_engine.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import random
+
+import numpy as np
+import pytest
+
+from config.factor_weights import get_factor_weight
+from core.hqs_calculator import (
+    ALL_FACTORS,
+    calculate_hit_ret_raw,
+    calculate_shrinkage,
+    calculate_hqs_score_from_z
+)
+from core.hqs_engine import (
+    build_factor_matrices,
+    compute_hqs_matrix,
+    get_factor_weight_vector,
+    score_races_hqs
+)
+
+
+def _random_stats(rnd):
+    return {
+        'cntWin': rnd.randint(0, 3000),
+        'cntPlace': rnd.randint(0, 3000),
+        'rateWinHit': rnd.uniform(0, 30),
+        'ratePlaceHit': rnd.uniform(10, 60),
+        'adjWinRet': rnd.uniform(40, 140),
+        'adjPlaceRet': rnd.uniform(50, 130),
+    }
+
+
+def _random_race(rnd, n_horses):
+    """ファクターごとに一部の馬は値なし（mask=False）にする"""
+    return [
+        {
+            factor_name: _random_stats(rnd)
+            for factor_name in ALL_FACTORS
+            if rnd.random() > 0.15
+        }
+        for _ in range(n_horses)
+    ]
+
+
+def _loop_total_hqs(horses_factor_stats, keibajo_code):
+    """calculate_race_hqs_scores の従来のファクターごとのループ計算"""
+    totals = [0.0] * len(horses_factor_stats)
+    for factor_name in ALL_FACTORS:
+        entries = [
+            (i, calculate_hit_ret_raw(stats[factor_name]))
+            for i, stats in enumerate(horses_factor_stats)
+            if factor_name in stats
+        ]
+        if len(entries) <= 1:
+            continue
+        hit_raws = [hit for _, (hit, _, _) in entries]
+        ret_raws = [ret for _, (_, ret, _) in entries]
+        mu_h, sigma_h = np.mean(hit_raws), np.std(hit_raws)
+        mu_r, sigma_r = np.mean(ret_raws), np.std(ret_raws)
+        for i, (hit, ret, n_min) in entries:
+            zh = (hit - mu_h) / sigma_h if sigma_h > 0 else 0
+            zr = (ret - mu_r) / sigma_r if sigma_r > 0 else 0
+            hqs = calculate_hqs_score_from_z(zh, zr, calculate_shrinkage(n_min))
+            totals[i] += hqs * get_factor_weight(keibajo_code, factor_name)
+    return np.array(totals)
+
+
+def _engine_total_hqs(horses_factor_stats, keibajo_code):
+    hit, ret, n_min, mask = build_factor_matrices(horses_factor_stats, ALL_FACTORS)
+    weights = get_factor_weight_vector(keibajo_code, ALL_FACTORS)
+    return compute_hqs_matrix(hit, ret, n_min, mask, weights)['total_hqs']
+
+
+class TestComputeHqsMatrix:
+    """行列計算とループ計算の一致"""
+
+    @pytest.mark.parametrize('seed,keibajo_code,n_horses', [
+        (0, '44', 12), (1, '45', 8), (2, '30', 16), (3, '46', 5),
+    ])
+    def test_matches_loop(self, seed, keibajo_code, n_horses):
+        race = _random_race(random.Random(seed), n_horses)
+        np.testing.assert_allclose(
+            _engine_total_hqs(race, keibajo_code),
+            _loop_total_hqs(race, keibajo_code),
+            atol=1e-9
+        )
+
+    def test_constant_factor_scores_zero(self):
+        stats = _random_stats(random.Random(0))
+        race = [{'kishu_mei': dict(stats)} for _ in range(10)]
+        assert np.all(_engine_total_hqs(race, '44') == 0)
+
+    def test_single_valid_value_scores_zero(self):
+        rnd = random.Random(0)
+        race = [{'wakuban': _random_stats(rnd)}, {}, {}]
+        hit, ret, n_min, mask = build_factor_matrices(race, ALL_FACTORS)
+        result = compute_hqs_matrix(hit, ret, n_min, mask, np.ones(len(ALL_FACTORS)))
+        assert not result['scored'].any()
+        assert np.all(result['total_hqs'] == 0)
+
+
+class TestScoreRacesHqs:
+    """複数レースの一括計算"""
+
+    def test_matches_per_race(self):
+        rnd = random.Random(42)
+        races = [_random_race(rnd, rnd.randint(2, 16)) for _ in range(20)]
+        keibajo_codes = [rnd.choice(['30', '44', '45', '46', '47']) for _ in races]
+
+        batch = score_races_hqs(races, keibajo_codes, ALL_FACTORS)
+
+        for race, keibajo_code, totals in zip(races, keibajo_codes, batch):
+            np.testing.assert_allclose(totals, _engine_total_hqs(race, keibajo_code), atol=1e-9)
+
+    def test_empty(self):
+        assert score_races_hqs([], [], ALL_FACTORS) == []
@@ -0,0 +1,151 @@
+"""
+指数のバッチ計算（calculate_all_indexes_batch / normalize_index_results）単体テスト
+
+1頭ずつ calculate_all_indexes を呼んだ結果と一致することを確認する。
+
+実行方法:
+    python -m pytest tests/test_index_calculator_batch.py -v
+"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from core.index_calculator import (
+    calculate_all_indexes,
+    calculate_all_indexes_batch,
+    normalize_index_results,
+    safe_float,
+    safe_int,
+    _batch_int,
+    _batch_to_float
+)
+
+
+def make_horses(count, seed=0):
+    """欠損値・境界値を含むテスト用の馬データ"""
+    rng = random.Random(seed)
+    horses = []
+    for _ in range(count):
+        horses.append({
+            'zenhan_3f': rng.choice([None, '', 0, rng.randint(300, 420)]) if rng.random() < 0.2 else rng.randint(300, 420),
+            'kohan_3f': rng.choice([rng.randint(340, 450), rng.randint(340, 450), None]),
+            'corner_1': rng.randint(0, 14),
+            'corner_2': rng.randint(0, 14),
+            'corner_3': rng.randint(0, 14),
+            'corner_4': rng.choice([0, 1, 5, '']),
+            'kyori': rng.choice([800, 1000, 1200, 1300, 1400, 1600, 1800, 2000, 2600]),
+            'babajotai_code_dirt': rng.choice(['1', '2', '3', '4', '0']),
+            'keibajo_code': rng.choice(['42', '44', '30', '46', '50', '54', '99']),
+            'tosu': rng.choice([0, 5, 8, 12, 16]),
+            'furi_code': rng.choice(['00', '01', '10', '25', '28', '99']),
+            'wakuban': rng.randint(0, 8),
+            'kinryo': rng.choice([0, 52.0, 54.0, 56.5, None]),
+            'bataiju': rng.choice([0, 420, 460, 510]),
+            'soha_time': rng.randint(550, 1700),
+            'past_corners': rng.choice([[], [(2, 2, 3, 2), (1, 1, 2, 1)], [(8, 7, 6, 5), (0, 0, 0, 0), (9, 9, 9, 9)]]),
+        })
+    return horses
+
+
+def to_columns(horses):
+    return {key: [horse[key] for horse in horses] for key in horses[0]}
+
+
+def assert_same_as_scalar(horses, result, race_info, apply_normalization):
+    for i, horse in enumerate(horses):
+        expected = calculate_all_indexes(horse, race_info, apply_normalization=apply_normalization)
+        for key, value in expected.items():
+            if isinstance(value, str):
+                assert result[key][i] == value, (i, key)
+            else:
+                assert result[key][i] == pytest.approx(value, abs=1e-9), (i, key)
+        if 'estimated_ten_3f' not in expected:
+            assert np.isnan(result['estimated_ten_3f'][i])
+            assert result['ten_3f_method'][i] == 'actual'
+
+
+class TestCalculateAllIndexesBatch:
+    """スカラー版との一致"""
+
+    @pytest.mark.parametrize('apply_normalization', [False, True])
+    def test_matches_scalar(self, apply_normalization):
+        horses = make_horses(500)
+        race_info = {'grade_code': 'C'}
+        result = calculate_all_indexes_batch(to_columns(horses), race_info, apply_normalization)
+        assert_same_as_scalar(horses, result, race_info, apply_normalization)
+
+    def test_dataframe_with_missing_columns(self):
+        pd = pytest.importorskip('pandas')
+        horses = [
+            {'zenhan_3f': 365.0, 'kohan_3f': 390.0, 'corner_1': 3, 'kyori': 1600, 'keibajo_code': '44', 'tosu': 12},
+            {'zenhan_3f': np.nan, 'kohan_3f': 380.0, 'corner_1': 1, 'kyori': 1200, 'keibajo_code': '42', 'tosu': 10},
+        ]
+        result = calculate_all_indexes_batch(pd.DataFrame(horses), apply_normalization=False)
+
+        # NaN はキー欠損と同じ扱い
+        horses[1].pop('zenhan_3f')
+        assert_same_as_scalar(horses, result, None, False)
+        assert list(result['ten_3f_method']) == ['actual', 'direct_calculation']
+
+    def test_string_columns(self):
+        # DBの VARCHAR 列と同じく数値を文字列で渡す（変換不能な値を含む）
+        horses = [
+            {key: value if key == 'past_corners' or value is None else str(value) for key, value in horse.items()}
+            for horse in make_horses(300, seed=1)
+        ]
+        horses[0]['kinryo'] = 'abc'
+        horses[1]['soha_time'] = ' 1234 '
+        horses[2]['corner_1'] = '2.5'
+        race_info = {'grade_code': 'C'}
+        result = calculate_all_indexes_batch(to_columns(horses), race_info, apply_normalization=False)
+        assert_same_as_scalar(horses, result, race_info, False)
+
+    def test_conversion_matches_safe_functions(self):
+        values = np.array(['12', None, '', ' 7 ', 'abc', True, 4, 2.5, 'None'], dtype=object)
+        expected = [safe_float(value, np.nan) for value in values]
+        np.testing.assert_array_equal(_batch_to_float(values), expected)
+        np.testing.assert_array_equal(_batch_to_float(np.array(['1', '', '3.5'])), [1.0, np.nan, 3.5])
+
+        # 数値は0方向に切り捨て、小数の文字列は変換不能
+        values = [12.7, None, '12.5', ' 7 ', '', True, -2.5, 'abc']
+        expected = [safe_int(value, -1) for value in values]
+        np.testing.assert_array_equal(_batch_int({'kyori': values}, 'kyori', -1, len(values)), expected)
+
+    def test_empty(self):
+        result = calculate_all_indexes_batch({'kyori': []}, apply_normalization=False)
+        assert len(result['ten_index']) == 0
+
+
+class TestNormalizeIndexResults:
+    """正規化の後回し（defer_normalization）"""
+
+    def test_deferred_matches_immediate(self):
+        horses = make_horses(200, seed=1)
+        race_info = {'grade_code': 'C'}
+        deferred = [calculate_all_indexes(horse, race_info, defer_normalization=True) for horse in horses]
+        normalize_index_results(deferred)
+
+        for horse, result in zip(horses, deferred):
+            expected = calculate_all_indexes(horse, race_info)
+            assert result.keys() == expected.keys()
+            for key, value in expected.items():
+                if isinstance(value, str):
+                    assert result[key] == value
+                else:
+                    assert result[key] == pytest.approx(value, abs=1e-9)
+
+    def test_idempotent_and_skips_raw_only_results(self):
+        horses = make_horses(20, seed=2)
+        results = [calculate_all_indexes(horse, defer_normalization=True) for horse in horses]
+        plain = calculate_all_indexes(horses[0], apply_normalization=False)
+        normalize_index_results(results + [plain])
+        once = [dict(result) for result in results]
+        normalize_index_results(results)
+
+        assert results == once
+        assert plain == calculate_all_indexes(horses[0], apply_normalization=False)
@@ -0,0 +1,83 @@
+"""
+指数正規化の推論専用ランタイム（QuantileIndexNormalizer）単体テスト
+
+実行方法:
+    python -m pytest tests/test_index_normalizer_runtime.py -v
+"""
+
+import sys
+import os
+import subprocess
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from core.index_normalizer_runtime import QuantileIndexNormalizer, norm_ppf
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_index_data(size=20000, seed=0):
+    """張り付き（同じ値の繰り返し）を含む指数データ"""
+    rng = np.random.default_rng(seed)
+    data = np.round(rng.normal(0, 8, size), 1)
+    data[: size // 5] = -100.0
+    return data
+
+
+class TestNormPpf:
+    """正規分布の逆累積分布関数"""
+
+    def test_matches_scipy(self):
+        stats = pytest.importorskip('scipy.stats')
+        p = np.concatenate([np.linspace(0, 1, 10001), [1e-300, 1e-7, 1 - 1e-7]])
+        expected = stats.norm.ppf(p)
+        finite = np.isfinite(expected)
+        np.testing.assert_allclose(norm_ppf(p)[finite], expected[finite], rtol=1e-14, atol=1e-14)
+        assert norm_ppf([0.0])[0] == -np.inf
+        assert norm_ppf([1.0])[0] == np.inf
+        assert np.isnan(norm_ppf([np.nan, -0.1, 1.1])).all()
+
+
+class TestQuantileIndexNormalizer:
+    """RacingIndexNormalizer との一致と保存"""
+
+    @pytest.mark.parametrize('target_range', [(-100, 100), (0, 100)])
+    def test_matches_racing_index_normalizer(self, tmp_path, target_range):
+        pytest.importorskip('sklearn')
+        from core.index_normalizer import RacingIndexNormalizer
+
+        normalizer = RacingIndexNormalizer(target_range=target_range).fit(make_index_data())
+        normalizer.save(str(tmp_path / 'ten_index_normalizer.pkl'))
+        runtime = QuantileIndexNormalizer.load(str(tmp_path / 'ten_index_normalizer.npz'))
+
+        samples = np.concatenate([np.linspace(-120, 120, 4801), [-100.0, np.nan]])
+        expected = normalizer.transform(samples)
+        actual = runtime.transform(samples)
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-10)
+        assert np.isnan(actual[-1])
+
+    def test_input_shapes(self):
+        runtime = QuantileIndexNormalizer(np.array([-1.0, 0.0, 1.0]), np.array([0.0, 0.5, 1.0]), 25.0)
+        assert runtime.transform([0.0])[0] == pytest.approx(0.0)
+        assert runtime.transform(np.zeros((3, 1))).shape == (3,)
+        assert len(runtime.transform([])) == 0
+        with pytest.raises(ValueError):
+            runtime.transform(np.zeros((2, 2)))
+
+    def test_get_normalizers_does_not_import_sklearn(self):
+        if not all(
+            os.path.exists(os.path.join(PROJECT_ROOT, 'models', 'normalizers', f'{name}_normalizer.npz'))
+            for name in ('ten_index', 'agari_index', 'position_index', 'pace_index')
+        ):
+            pytest.skip('推論用の分位点テーブル未作成')
+
+        code = (
+            "import sys\n"
+            "from core.index_calculator import get_normalizers\n"
+            "normalizers = get_normalizers()\n"
+            "assert all(type(n).__name__ == 'QuantileIndexNormalizer' for n in normalizers.values())\n"
+            "assert 'sklearn' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, check=True)
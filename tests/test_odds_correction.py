@@ -0,0 +1,61 @@
+"""
+オッズ補正係数参照 単体テスト
+
+テスト項目:
+1. 二分探索（get_odds_correction）が旧実装の線形走査と一致すること
+2. NumPy版（get_odds_corrections）が線形走査と一致すること
+3. 区間の境界・範囲外・NaN の扱い
+
+実行方法:
+    python -m pytest tests/test_odds_correction.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from config.odds_correction import (
+    TANSHO_CORRECTION,
+    FUKUSHO_CORRECTION,
+    get_odds_correction,
+    get_odds_corrections,
+    get_odds_correction_linear
+)
+
+
+def _boundary_odds(table):
+    """各区間の下限・上限とその前後の値"""
+    odds = [-1.0, 1e7]
+    for from_odds, to_odds, _ in table:
+        odds += [from_odds, to_odds, from_odds + 0.01, to_odds - 0.01]
+    return odds
+
+
+@pytest.mark.parametrize('is_fukusho,table', [
+    (False, TANSHO_CORRECTION),
+    (True, FUKUSHO_CORRECTION),
+])
+class TestOddsCorrection:
+    """補正係数参照の一致"""
+
+    def test_scalar_matches_linear_scan(self, is_fukusho, table):
+        rng = np.random.default_rng(0)
+        odds = _boundary_odds(table) + np.round(rng.uniform(0, 600, 2000), 1).tolist()
+        for x in odds:
+            assert get_odds_correction(x, is_fukusho) == get_odds_correction_linear(x, is_fukusho)
+
+    def test_array_matches_linear_scan(self, is_fukusho, table):
+        rng = np.random.default_rng(1)
+        odds = np.array(_boundary_odds(table) + np.round(rng.uniform(0, 600, 2000), 1).tolist())
+        expected = [get_odds_correction_linear(x, is_fukusho) for x in odds.tolist()]
+        np.testing.assert_array_equal(get_odds_corrections(odds, is_fukusho), expected)
+
+    def test_out_of_range_and_nan(self, is_fukusho, table):
+        assert get_odds_correction(-0.1, is_fukusho) == 1.0
+        assert get_odds_correction(float('nan'), is_fukusho) == 1.0
+        np.testing.assert_array_equal(
+            get_odds_corrections([-0.1, np.nan, 1e9], is_fukusho), [1.0, 1.0, 1.0]
+        )
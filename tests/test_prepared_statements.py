@@ -0,0 +1,135 @@
+"""
+プリペアドステートメント実行モジュール単体テスト
+
+実行方法:
+    python -m pytest tests/test_prepared_statements.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from core import prepared_statements
+from core.prepared_statements import (
+    to_positional,
+    statement_name,
+    execute_prepared,
+    get_prepared_statement_stats,
+    reset_prepared_statement_stats,
+    CUSTOM_PLAN_EXECUTIONS,
+)
+
+
+class FakeConnection:
+    """実行したSQLを記録するだけの接続"""
+
+    autocommit = False
+
+    def __init__(self, fail_explain=False):
+        self.executed = []
+        self.fail_explain = fail_explain
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append((sql, params))
+        if self.connection.fail_explain and sql.startswith('EXPLAIN'):
+            raise RuntimeError('explain failed')
+
+    def fetchone(self):
+        return ([{'Planning Time': 2.0}],)
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    reset_prepared_statement_stats()
+    yield
+    reset_prepared_statement_stats()
+
+
+class TestToPositional:
+    """%s → $n の変換"""
+
+    def test_numbers_placeholders_in_order(self):
+        sql, count = to_positional("a = %s AND b = ANY(%s) AND c LIKE 'x%%'")
+        assert sql == "a = $1 AND b = ANY($2) AND c LIKE 'x%'"
+        assert count == 2
+
+    def test_same_template_same_name(self):
+        assert statement_name('q', 'SELECT %s') == statement_name('q', 'SELECT %s')
+        assert statement_name('q', 'SELECT %s') != statement_name('q', 'SELECT 1')
+
+
+class TestExecutePrepared:
+    """接続ごとに1回だけ PREPARE する"""
+
+    def test_prepares_once_per_connection(self):
+        conn = FakeConnection()
+        query = "SELECT * FROM t WHERE a = %s"
+        for value in ('1', '2', '3'):
+            execute_prepared(conn.cursor(), 'q', query, [value])
+
+        prepares = [sql for sql, _ in conn.executed if sql.startswith('PREPARE')]
+        executes = [(sql, params) for sql, params in conn.executed if sql.startswith('EXECUTE')]
+        name = statement_name('q', query)
+        assert prepares == [f"PREPARE {name} AS SELECT * FROM t WHERE a = $1"]
+        assert executes == [(f"EXECUTE {name} (%s)", [v]) for v in ('1', '2', '3')]
+
+        other = FakeConnection()
+        execute_prepared(other.cursor(), 'q', query, ['1'])
+        assert any(sql.startswith('PREPARE') for sql, _ in other.executed)
+
+    def test_parameter_count_mismatch(self):
+        with pytest.raises(ValueError):
+            execute_prepared(FakeConnection().cursor(), 'q', "SELECT %s, %s", ['1'])
+
+    def test_disabled_runs_query_directly(self, monkeypatch):
+        monkeypatch.setattr(prepared_statements, 'PREPARED_STATEMENTS_ENABLED', False)
+        conn = FakeConnection()
+        execute_prepared(conn.cursor(), 'q', "SELECT %s", ['1'])
+        assert conn.executed == [("SELECT %s", ['1'])]
+
+    def test_saved_planning_estimate(self):
+        conn = FakeConnection()
+        executions = CUSTOM_PLAN_EXECUTIONS + 3
+        for i in range(executions):
+            execute_prepared(conn.cursor(), 'q', "SELECT %s", [str(i)])
+
+        stats = get_prepared_statement_stats()
+        assert (stats['prepares'], stats['executions'], stats['reused']) == (1, executions, 3)
+        assert stats['avg_planning_ms'] == 2.0
+        assert stats['saved_planning_ms'] == 6.0
+        assert stats['by_prefix']['q']['executions'] == executions
+
+    def test_planning_time_inside_savepoint(self):
+        conn = FakeConnection()
+        execute_prepared(conn.cursor(), 'q', "SELECT %s", ['1'])
+        commands = [sql.split(' ')[0] for sql, _ in conn.executed]
+        assert commands == ['PREPARE', 'SAVEPOINT', 'EXPLAIN', 'RELEASE', 'EXECUTE']
+
+    def test_failed_measurement_rolls_back_to_savepoint(self, caplog):
+        conn = FakeConnection(fail_explain=True)
+        with caplog.at_level('WARNING', logger='core.prepared_statements'):
+            execute_prepared(conn.cursor(), 'q', "SELECT %s", ['1'])
+            execute_prepared(conn.cursor(), 'q', "SELECT %s", ['2'])
+
+        commands = [sql.split(' ')[0] for sql, _ in conn.executed]
+        assert commands == ['PREPARE', 'SAVEPOINT', 'EXPLAIN', 'ROLLBACK', 'RELEASE', 'EXECUTE', 'EXECUTE']
+        assert '計画時間の測定エラー' in caplog.text
+
+        stats = get_prepared_statement_stats()
+        assert (stats['prepares'], stats['executions'], stats['avg_planning_ms']) == (1, 2, 0.0)
@@ -0,0 +1,266 @@
+"""
+前走テーブル（nar_prev_race）SQL生成 単体テスト
+
+テスト項目:
+1. LAG のSELECT文の列・参照する列・ウィンドウ（前走の定義）
+2. UPSERT文・差分反映のSQLとパラメータ（テーブル定義の列と一致すること）
+3. 前走系ファクターの条件が pr.<列> になり（初出走は IS NULL）、nar_prev_race が結合されること
+
+実行方法:
+    python -m pytest tests/test_prev_race_table.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+
+import pytest
+
+from core import calculate_factor_stats
+from core.calculate_factor_stats import build_factor_sql_condition
+from core.prev_race_table import (
+    PREV_RACE_SOURCE_COLUMNS,
+    build_prev_race_select_sql,
+    build_prev_race_join_sql,
+    uses_prev_race
+)
+from scripts.build_prev_race_table import (
+    DDL_FILE,
+    KEY_COLUMNS,
+    TABLE_COLUMNS,
+    build_upsert_sql,
+    apply_delta,
+    rebuild_keibajo,
+    get_latest_date
+)
+
+
+class FakeConnection:
+    """実行したSQLを記録し、用意した行を返す接続"""
+
+    def __init__(self, row=None):
+        self.row = row
+        self.executed = []
+        self.committed = False
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append((sql, params))
+
+    def fetchone(self):
+        return self.connection.row
+
+    def close(self):
+        pass
+
+
+def _ddl_columns():
+    """sql/create_prev_race_table.sql の nar_prev_race の列（updated_at を除く）"""
+    with open(DDL_FILE, encoding='utf-8') as f:
+        ddl = f.read()
+    body = ddl[ddl.index('CREATE TABLE'):ddl.index('PRIMARY KEY')]
+    columns = re.findall(r'^\s+([a-z_0-9]+) (?:VARCHAR|TIMESTAMP)', body, re.MULTILINE)
+    return [column for column in columns if column != 'updated_at']
+
+
+class TestBuildPrevRaceSelectSql:
+    """LAG による前走情報のSELECT文"""
+
+    def test_selects_table_columns(self):
+        sql = build_prev_race_select_sql('TRUE')
+        for column in PREV_RACE_SOURCE_COLUMNS:
+            assert f"OVER w AS {column}" in sql
+        assert 'AS kyuyo_weeks' in sql
+        for column in KEY_COLUMNS + ['ketto_toroku_bango']:
+            assert f"se.{column}," in sql
+
+    def test_source_columns(self):
+        sql = build_prev_race_select_sql('TRUE')
+        assert 'LAG(ra.babajotai_code_dirt) OVER w AS prev_baba' in sql
+        assert 'LAG(se.tansho_ninkijun) OVER w AS prev_ninkijun' in sql
+        assert 'baba_jotai_code' not in sql
+        assert 'se.ninkijun' not in sql
+
+    def test_previous_race_definition(self):
+        # 競馬場を問わない・着順確定済み・開催日順（競馬場コード61は除外）
+        sql = build_prev_race_select_sql("se.keibajo_code = %s")
+        assert 'PARTITION BY se.ketto_toroku_bango\n' in sql
+        assert 'ORDER BY se.kaisai_nen, se.kaisai_tsukihi, se.race_bango' in sql
+        assert "se.keibajo_code != '61'" in sql
+        assert "se.kakutei_chakujun != ''" in sql
+        assert "se.keibajo_code = %s" in sql
+
+
+class TestBuildUpsertSql:
+    """nar_prev_race への挿入"""
+
+    def test_table_columns_match_ddl(self):
+        assert TABLE_COLUMNS == _ddl_columns()
+
+    def test_insert_and_update_columns(self):
+        sql = build_upsert_sql(build_prev_race_select_sql('TRUE'), "t.kaisai_nen = %s")
+        columns = ', '.join(TABLE_COLUMNS)
+        assert f"INSERT INTO nar_prev_race ({columns})" in sql
+        assert f"SELECT {columns}" in sql
+        assert "WHERE t.kaisai_nen = %s" in sql
+        assert f"ON CONFLICT ({', '.join(KEY_COLUMNS)})" in sql
+        for column in TABLE_COLUMNS:
+            if column in KEY_COLUMNS:
+                assert f"{column} = EXCLUDED.{column}" not in sql
+            else:
+                assert f"{column} = EXCLUDED.{column}" in sql
+
+
+class TestRebuildKeibajo:
+    """競馬場ごとの再構築"""
+
+    def test_lag_over_all_venues(self):
+        conn = FakeConnection()
+        rebuild_keibajo(conn, '44')
+
+        (delete_sql, delete_params), (sql, params) = conn.executed
+        assert delete_params == ('44',)
+        # LAG はこの競馬場に出走した馬の全出走（他の競馬場を含む）で計算し、保存はこの競馬場の行だけ
+        assert 'venue_se.keibajo_code = %s' in sql
+        assert "se.keibajo_code = %s" not in sql.replace('venue_se.', '')
+        assert 'WHERE t.keibajo_code = %s' in sql
+        assert params == ('44', '44')
+        assert conn.committed
+
+
+class TestApplyDelta:
+    """差分反映"""
+
+    def test_includes_latest_day(self):
+        conn = FakeConnection()
+        apply_delta(conn, '20250105')
+
+        (sql, params), = conn.executed
+        # 対象馬は最終開催日以降の出走から選び、保存も最終開催日以降の行（当日を再計算）
+        assert 'se.ketto_toroku_bango IN' in sql
+        assert 'new_se.keibajo_code' not in sql
+        assert '(new_se.kaisai_nen, new_se.kaisai_tsukihi) >= (%s, %s)' in sql
+        assert 'WHERE (t.kaisai_nen, t.kaisai_tsukihi) >= (%s, %s)' in sql
+        assert params == ['2025', '0105', '2025', '0105']
+        assert conn.committed
+
+    def test_latest_date(self):
+        conn = FakeConnection(('2025', '0105'))
+        assert get_latest_date(conn) == '20250105'
+        (sql, _), = conn.executed
+        assert '||' not in sql
+
+        assert get_latest_date(FakeConnection(None)) is None
+
+
+class TestPrevRaceFactorCondition:
+    """前走系ファクターの条件と nar_prev_race の結合"""
+
+    @pytest.mark.parametrize('factor_name, factor_value, expected', [
+        ('F09_prev_chakujun', '1', ['pr.prev_chakujun = ANY(%s)']),
+        ('F10_prev_ninki', '2', ['pr.prev_ninkijun = ANY(%s)']),
+        ('F11_prev_kyori', '1400', ['pr.prev_kyori = %s']),
+        ('F12_prev_baba', '1', ['pr.prev_baba = %s']),
+        ('F13_kyuyo_weeks', '4', ['pr.kyuyo_weeks = %s']),
+        ('C12_prev_chakujun_kyuyo', '1_4', ['pr.prev_chakujun = ANY(%s)', 'pr.kyuyo_weeks = %s']),
+        ('C13_prev_ninki_chakujun', '2_1', ['pr.prev_ninkijun = ANY(%s)', 'pr.prev_chakujun = ANY(%s)']),
+        ('C14_zogen_kyuyo', '4_4', ['se.zogen_sa = %s', 'pr.kyuyo_weeks = %s']),
+    ])
+    def test_prev_race_columns(self, factor_name, factor_value, expected):
+        condition, params = build_factor_sql_condition(factor_name, factor_value)
+        assert condition.split(' AND ') == expected
+        assert len(params) == len(expected)
+        assert uses_prev_race(condition)
+
+        # 前走テーブル未構築: 条件なし
+        assert build_factor_sql_condition(factor_name, factor_value, use_prev_race=False) == ("1=1", [])
+
+    def test_values_match_table(self):
+        # nar_prev_race の値は文字列で保持
+        assert build_factor_sql_condition('F09_prev_chakujun', '1')[1] == [['01', '1']]
+        assert build_factor_sql_condition('F11_prev_kyori', '1400')[1] == ['1400']
+        assert build_factor_sql_condition('C12_prev_chakujun_kyuyo', '1_4')[1] == [['01', '1'], '4']
+
+    @pytest.mark.parametrize('factor_name, factor_value, expected, params', [
+        ('F09_prev_chakujun', '0', ['(pr.prev_chakujun IS NULL OR pr.prev_chakujun = ANY(%s))'], [['0', '00']]),
+        ('F10_prev_ninki', '0', ['(pr.prev_ninkijun IS NULL OR pr.prev_ninkijun = ANY(%s))'], [['0', '00']]),
+        ('F11_prev_kyori', '0', ['(pr.prev_kyori IS NULL OR pr.prev_kyori = %s)'], ['0']),
+        ('F12_prev_baba', '不明', ['(pr.prev_baba IS NULL OR pr.prev_baba = %s)'], ['']),
+        ('F13_kyuyo_weeks', '0', ['(pr.kyuyo_weeks IS NULL OR pr.kyuyo_weeks = %s)'], ['0']),
+        ('C12_prev_chakujun_kyuyo', '0_0',
+         ['(pr.prev_chakujun IS NULL OR pr.prev_chakujun = ANY(%s))',
+          '(pr.kyuyo_weeks IS NULL OR pr.kyuyo_weeks = %s)'], [['0', '00'], '0']),
+        ('C13_prev_ninki_chakujun', '0_0',
+         ['(pr.prev_ninkijun IS NULL OR pr.prev_ninkijun = ANY(%s))',
+          '(pr.prev_chakujun IS NULL OR pr.prev_chakujun = ANY(%s))'], [['0', '00'], ['0', '00']]),
+        ('C14_zogen_kyuyo', '-4_0',
+         ['se.zogen_sa = %s', '(pr.kyuyo_weeks IS NULL OR pr.kyuyo_weeks = %s)'], [-4, '0']),
+    ])
+    def test_debut_matches_missing_prev_race(self, factor_name, factor_value, expected, params):
+        # 初出走（factor_extractor の値は 0 / '不明'）は LEFT JOIN で pr.<列> が NULL の出走に一致させる
+        condition, condition_params = build_factor_sql_condition(factor_name, factor_value)
+        assert condition.split(' AND ') == expected
+        assert condition_params == params
+
+    def test_debut_values_from_extractor(self):
+        from core.factor_extractor import calculate_kyuyo_weeks
+        assert calculate_kyuyo_weeks('', '20250105') == 0
+        condition, _ = build_factor_sql_condition('F13_kyuyo_weeks', calculate_kyuyo_weeks('', '20250105'))
+        assert 'pr.kyuyo_weeks IS NULL' in condition
+
+    def _capture_query(self, monkeypatch, factor_name, factor_value):
+        captured = {}
+
+        def fake_execute_prepared(cur, name, query, params):
+            captured['query'] = query
+            captured['params'] = params
+
+        monkeypatch.setattr(calculate_factor_stats, 'is_prev_race_table_available', lambda conn: True)
+        monkeypatch.setattr(calculate_factor_stats, 'execute_prepared', fake_execute_prepared)
+
+        totals = {
+            'win_total_count': 0, 'win_hit_count': 0,
+            'total_win_weighted_bet': 0, 'total_win_weighted_payout': 0,
+            'place_total_count': 0, 'place_hit_count': 0,
+            'total_place_weighted_bet': 0, 'total_place_weighted_payout': 0,
+        }
+        calculate_factor_stats.calculate_factor_corrected_return_rate(
+            FakeConnection(totals), '44', factor_name, factor_value
+        )
+        return captured
+
+    def test_joins_prev_race_table(self, monkeypatch):
+        captured = self._capture_query(monkeypatch, 'F12_prev_baba', '1')
+        query = captured['query']
+        assert 'LEFT JOIN nar_prev_race pr ON' in query
+        assert query.index('LEFT JOIN nar_prev_race pr') < query.index('AND pr.prev_baba = %s')
+        for column in KEY_COLUMNS:
+            assert f"pr.{column} = se.{column}" in query
+        assert '44' in captured['params'] and '1' in captured['params']
+
+    def test_no_join_without_prev_race_condition(self, monkeypatch):
+        captured = self._capture_query(monkeypatch, 'F01_kishu', '05658')
+        assert 'nar_prev_race' not in captured['query']
+        assert build_prev_race_join_sql('se').strip() not in captured['query']
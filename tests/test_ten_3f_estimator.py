@@ -0,0 +1,168 @@
+"""
+Ten3F推定（Ten3FEstimator.estimate_batch）単体テスト
+
+全行まとめて推定した結果が、1行ずつ estimate を呼んだ結果と一致することを確認する。
+
+実行方法:
+    python -m pytest tests/test_ten_3f_estimator.py -v
+"""
+
+import sys
+import os
+import random
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from core.ten_3f_estimator import Ten3FEstimator
+
+
+def make_rows(count, seed=0):
+    """欠損値・境界値を含む推定入力"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        kyori = rng.choice([800, 1000, 1200, 1230, 1300, 1400, 1500, 1600, 1650, 1800, 2000, 2600, 3000])
+        rows.append({
+            'time_seconds': rng.uniform(45.0, 200.0),
+            'kohan_3f_seconds': rng.choice([None, rng.uniform(35.0, 45.0)]),
+            'kyori': kyori,
+            'corner_1': rng.choice([None, 0, 1, 2, 4, 6, 12]),
+            'corner_2': rng.choice([None, 0, 1, 3, 5, 9]),
+            'field_size': rng.choice([0, 8, 12, 16]),
+            'keibajo_code': rng.choice([None, '30', '42', '44', '46', '55', '99']),
+            'grade_code': rng.choice([None, '', 'A', 'E', 'T', 'Z']),
+        })
+    return rows
+
+
+def estimate_rows(estimator, rows, use_ml=True):
+    """1行ずつ estimate を呼ぶ"""
+    return [estimator.estimate(**row, use_ml=use_ml) for row in rows]
+
+
+def estimate_batch_rows(estimator, rows, use_ml=True):
+    """rows を列に変換して estimate_batch を呼ぶ"""
+    def column(key):
+        return [row[key] for row in rows]
+
+    return estimator.estimate_batch(
+        time_seconds=column('time_seconds'),
+        kohan_3f_seconds=[np.nan if value is None else value for value in column('kohan_3f_seconds')],
+        kyori=column('kyori'),
+        corner_1=[np.nan if value is None else value for value in column('corner_1')],
+        corner_2=[np.nan if value is None else value for value in column('corner_2')],
+        field_size=column('field_size'),
+        use_ml=use_ml,
+        keibajo_code=column('keibajo_code'),
+        grade_code=column('grade_code')
+    )
+
+
+def reference_standard_total_time(df, keibajo_code, kyori, class_names):
+    """従来の _get_standard_total_time（DataFrame を絞り込む実装）"""
+    for class_name in class_names:
+        row = df[(df['競馬場コード'] == keibajo_code) & (df['距離(m)'] == kyori) & (df['クラス'] == class_name)]
+        if not row.empty:
+            return row.iloc[0]['基準タイム(秒)']
+    return None
+
+
+def assert_same(expected, actual):
+    for i, row in enumerate(expected):
+        assert actual['method'][i] == row['method'], i
+        for key in ('ten_3f_baseline', 'ten_3f_adjusted'):
+            assert actual[key][i] == row[key], (i, key)
+        if row['ten_3f_ml'] is None:
+            assert np.isnan(actual['ten_3f_ml'][i]), i
+            assert actual['ten_3f_final'][i] == row['ten_3f_final'], i
+        else:
+            # 行列の予測は1行ずつの予測と最下位桁が異なりうる
+            assert actual['ten_3f_ml'][i] == pytest.approx(row['ten_3f_ml'], abs=1e-12), i
+            assert actual['ten_3f_final'][i] == pytest.approx(row['ten_3f_final'], abs=1e-12), i
+
+
+class TestStandardTotalTime:
+    """標準走破タイムの参照"""
+
+    @pytest.mark.parametrize('as_str', [False, True])
+    def test_matches_dataframe_filter(self, as_str):
+        estimator = Ten3FEstimator()
+        df = estimator.standard_times_by_class
+        if as_str:
+            df['競馬場コード'] = df['競馬場コード'].astype(str)
+            estimator.index_standard_times()
+
+        keys = set(zip(df['競馬場コード'], df['距離(m)'])) | {('44', 1600), (44, 1600), ('99', 1200)}
+        rows = [(code, kyori, grade) for code, kyori in keys for grade in (None, '', 'A', 'E', 'Z')]
+        expected = [
+            reference_standard_total_time(
+                df, code, kyori, ([estimator._get_class_name(grade)] if grade else []) + ['一般戦']
+            )
+            for code, kyori, grade in rows
+        ]
+        assert [estimator._get_standard_total_time(*row) for row in rows] == expected
+
+        codes, kyori, grades = zip(*rows)
+        np.testing.assert_array_equal(
+            estimator.get_standard_total_times(codes, kyori, grades),
+            [np.nan if value is None else value for value in expected]
+        )
+
+    def test_without_table(self):
+        estimator = Ten3FEstimator()
+        estimator.standard_times_by_class = None
+        estimator.index_standard_times()
+        assert estimator._get_standard_total_time(44, 1600, 'A') is None
+        assert np.isnan(estimator.get_standard_total_times([44], [1600])).all()
+
+
+class TestEstimateBatch:
+    """estimate_batch と estimate の一致"""
+
+    def test_without_model(self):
+        estimator = Ten3FEstimator()
+        rows = make_rows(500)
+        assert_same(estimate_rows(estimator, rows), estimate_batch_rows(estimator, rows))
+
+    def test_speed_index(self):
+        # 競馬場コードを文字列にして、標準走破タイムによるスピード指数補正を通す
+        estimator = Ten3FEstimator()
+        estimator.standard_times_by_class['競馬場コード'] = estimator.standard_times_by_class['競馬場コード'].astype(str)
+        estimator.index_standard_times()
+        rows = make_rows(300, seed=2)
+        batch = estimate_batch_rows(estimator, rows)
+        assert 'speed_index' in set(batch['baseline_method'])
+        assert_same(estimate_rows(estimator, rows), batch)
+
+    def test_with_model(self):
+        estimator = Ten3FEstimator()
+        rng = np.random.default_rng(0)
+        X = rng.uniform([50, 35, 1000, 1, 1, 8, 10, 0, 1], [200, 45, 2600, 14, 14, 16, 20, 1, 14], size=(200, 9))
+        estimator.ml_model = LinearRegression().fit(X, X[:, 0] * 0.2 + rng.normal(0, 1, 200))
+
+        rows = make_rows(300, seed=1)
+        assert_same(estimate_rows(estimator, rows), estimate_batch_rows(estimator, rows))
+        # use_ml=False ではモデルを使わない
+        assert_same(estimate_rows(estimator, rows, use_ml=False), estimate_batch_rows(estimator, rows, use_ml=False))
+
+    def test_baseline_method(self):
+        estimator = Ten3FEstimator()
+        result = estimator.estimate_batch([70.0, 100.0, 100.0], [38.0, 38.0, 38.0], [1200, 1600, 1600],
+                                          keibajo_code=['44', '44', None])
+        assert list(result['baseline_method']) == ['direct', 'base_time', 'ratio']
+
+    def test_scalar_arguments(self):
+        estimator = Ten3FEstimator()
+        result = estimator.estimate_batch([100.0, 101.0], [38.0, 39.0], [1600, 1600], field_size=12, keibajo_code='44')
+        for i, row in enumerate(estimate_rows(estimator, [
+            {'time_seconds': 100.0, 'kohan_3f_seconds': 38.0, 'kyori': 1600, 'keibajo_code': '44'},
+            {'time_seconds': 101.0, 'kohan_3f_seconds': 39.0, 'kyori': 1600, 'keibajo_code': '44'},
+        ])):
+            assert result['ten_3f_final'][i] == row['ten_3f_final']
+
+    def test_empty(self):
+        result = Ten3FEstimator().estimate_batch([], [], [])
+        assert len(result['ten_3f_final']) == 0
@@ -0,0 +1,120 @@
+"""
+決定木アンサンブルの推論専用ランタイム（TreeEnsembleModel）単体テスト
+
+LightGBM の predict() と同じ予測になることを確認する。
+
+実行方法:
+    python -m pytest tests/test_tree_model_runtime.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from core.tree_model_runtime import TreeEnsembleModel
+from core.ten_3f_estimator import Ten3FEstimator
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.path.join(PROJECT_ROOT, 'models', 'ten_3f_lgbm_model.pkl')
+
+
+def make_data(size=3000, num_features=9, seed=0):
+    """欠損値・0 を含む回帰データ"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 1, (size, num_features))
+    X[:, 1] = np.round(X[:, 1])
+    y = X[:, 0] * 2.0 + np.sin(X[:, 2]) + (X[:, 1] > 0) + rng.normal(0, 0.1, size)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X, y
+
+
+def make_samples(runtime, size=20000, seed=1):
+    """分岐の閾値ちょうど・前後・欠損値・0 を含む予測用の特徴量"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 1.5, (size, runtime.num_features))
+    thresholds = rng.choice(runtime.threshold, size)
+    columns = rng.integers(0, runtime.num_features, size)
+    X[np.arange(size), columns] = thresholds + rng.choice([0.0, -1e-12, 1e-12], size)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    X[rng.random(X.shape) < 0.05] = 0.0
+    return X
+
+
+class TestTreeEnsembleModel:
+    """LightGBM との一致と保存"""
+
+    @pytest.mark.parametrize('params', [
+        {},
+        {'use_missing': False},
+        {'zero_as_missing': True},
+        {'objective': 'huber'},
+    ])
+    def test_matches_lightgbm(self, tmp_path, params):
+        lightgbm = pytest.importorskip('lightgbm')
+        X, y = make_data()
+        model = lightgbm.LGBMRegressor(n_estimators=50, num_leaves=15, verbose=-1, random_state=0, **params).fit(X, y)
+
+        runtime = TreeEnsembleModel.from_lightgbm(model)
+        runtime.save(str(tmp_path / 'model.npz'))
+        loaded = TreeEnsembleModel.load(str(tmp_path / 'model.npz'))
+
+        samples = make_samples(runtime)
+        expected = model.predict(samples)
+        np.testing.assert_array_equal(runtime.predict(samples), expected)
+        np.testing.assert_array_equal(loaded.predict(samples), expected)
+        assert loaded.feature_names == runtime.feature_names
+
+    def test_single_row_and_empty(self):
+        lightgbm = pytest.importorskip('lightgbm')
+        X, y = make_data(size=500)
+        model = lightgbm.LGBMRegressor(n_estimators=5, verbose=-1).fit(X, y)
+        runtime = TreeEnsembleModel.from_lightgbm(model)
+
+        assert runtime.predict(X[0]) == pytest.approx(model.predict(X[:1]), abs=0)
+        assert len(runtime.predict(np.empty((0, 9)))) == 0
+        with pytest.raises(ValueError):
+            runtime.predict(np.zeros((1, 8)))
+
+    def test_unsupported_objective(self):
+        lightgbm = pytest.importorskip('lightgbm')
+        X, y = make_data(size=500)
+        model = lightgbm.LGBMClassifier(n_estimators=5, verbose=-1).fit(X, y > 0)
+        with pytest.raises(ValueError):
+            TreeEnsembleModel.from_lightgbm(model)
+
+    def test_exported_ten_3f_model(self):
+        joblib = pytest.importorskip('joblib')
+        pytest.importorskip('lightgbm')
+        model = joblib.load(MODEL_PATH)
+        runtime = TreeEnsembleModel.load(os.path.splitext(MODEL_PATH)[0] + '.npz')
+
+        samples = make_samples(runtime)
+        np.testing.assert_array_equal(runtime.predict(samples), model.predict(samples))
+
+
+class TestTen3FEstimatorLoadModel:
+    """Ten3FEstimator.load_model"""
+
+    def test_loads_runtime_model(self, tmp_path):
+        lightgbm = pytest.importorskip('lightgbm')
+        X, y = make_data(num_features=Ten3FEstimator.NUM_FEATURES)
+        runtime = TreeEnsembleModel.from_lightgbm(lightgbm.LGBMRegressor(n_estimators=5, verbose=-1).fit(X, y))
+        runtime.save(str(tmp_path / 'model.npz'))
+
+        estimator = Ten3FEstimator()
+        estimator.load_model(str(tmp_path / 'model.pkl'))
+        assert isinstance(estimator.ml_model, TreeEnsembleModel)
+
+    def test_rejects_feature_mismatch(self):
+        # 現行の Ten3F モデルは15特徴量で、_engineer_features（9特徴量）と合わない
+        estimator = Ten3FEstimator()
+        with pytest.raises(ValueError):
+            estimator.load_model(MODEL_PATH)
+        assert estimator.ml_model is None
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            Ten3FEstimator().load_model(str(tmp_path / 'missing.pkl'))
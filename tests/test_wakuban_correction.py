@@ -0,0 +1,103 @@
+"""
+枠順補正（get_wakuban_correction / get_wakuban_corrections）単体テスト
+
+配列に展開したベイズ推定係数テーブルの参照結果が、
+JSON の辞書を直接たどる従来の実装と一致することを確認する。
+
+実行方法:
+    python -m pytest tests/test_wakuban_correction.py -v
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import core.index_calculator as index_calculator
+from core.index_calculator import (
+    get_wakuban_correction,
+    get_wakuban_corrections,
+    load_wakuban_coefficients_bayesian
+)
+
+
+def reference_get_wakuban_correction(wakuban, tosu, kyori, keibajo_code=None):
+    """従来の get_wakuban_correction（辞書を直接たどる実装）"""
+    if wakuban <= 0 or tosu <= 0:
+        return (0.0, 'データなし')
+
+    coefficients = load_wakuban_coefficients_bayesian()
+    if keibajo_code and str(keibajo_code) in coefficients:
+        keibajo_data = coefficients[str(keibajo_code)]
+        if str(kyori) in keibajo_data:
+            kyori_data = keibajo_data[str(kyori)]
+            if str(wakuban) in kyori_data:
+                coefficient = kyori_data[str(wakuban)]
+                return (round(coefficient / 10.0, 2), f'ベイズ推定（係数: {coefficient:.1f}）')
+
+    relative_position = (wakuban - 1) / max(tosu - 1, 1)
+    if kyori < 1400:
+        return (round((0.5 - relative_position) * 0.6, 2), '短距離・内枠有利（フォールバック）')
+    elif kyori < 1800:
+        if 0.3 <= relative_position <= 0.7:
+            return (round(0.2, 2), 'マイル・中枠有利（フォールバック）')
+        return (round((0.5 - abs(relative_position - 0.5)) * 0.3, 2), 'マイル・端枠やや不利（フォールバック）')
+    return (round((relative_position - 0.5) * 0.2, 2), '中長距離・外枠やや有利（フォールバック）')
+
+
+def make_rows():
+    """全競馬場・距離・枠番に未対応の値を加えた組み合わせ"""
+    coefficients = load_wakuban_coefficients_bayesian()
+    keibajo_codes = list(coefficients) + [None, '', '99']
+    distances = sorted({int(kyori) for data in coefficients.values() for kyori in data}) + [0, 1250, 5000]
+    return [
+        (wakuban, tosu, kyori, keibajo_code)
+        for keibajo_code in keibajo_codes
+        for kyori in distances
+        for wakuban in range(0, 10)
+        for tosu in (0, 1, 7, 12)
+    ]
+
+
+class TestGetWakubanCorrection:
+    """1件ずつの計算"""
+
+    def test_matches_reference(self):
+        for row in make_rows():
+            assert get_wakuban_correction(*row) == reference_get_wakuban_correction(*row), row
+
+    def test_int_keibajo_code(self):
+        code = next(iter(load_wakuban_coefficients_bayesian()))
+        assert get_wakuban_correction(1, 12, 1200, int(code)) == reference_get_wakuban_correction(1, 12, 1200, int(code))
+
+    def test_rebuilds_when_coefficients_change(self, monkeypatch):
+        monkeypatch.setattr(index_calculator, '_WAKUBAN_COEFFICIENTS_BAYESIAN', {'99': {'1000': {'1': 5.0}}})
+        assert get_wakuban_correction(1, 12, 1000, '99') == (0.5, 'ベイズ推定（係数: 5.0）')
+        assert list(get_wakuban_corrections([1], [12], [1000], ['99'])) == [0.5]
+
+
+class TestGetWakubanCorrections:
+    """配列でまとめて計算"""
+
+    def test_matches_scalar(self):
+        rows = make_rows()
+        wakuban, tosu, kyori, keibajo_codes = zip(*rows)
+        expected = [get_wakuban_correction(*row)[0] for row in rows]
+
+        np.testing.assert_array_equal(get_wakuban_corrections(wakuban, tosu, kyori, list(keibajo_codes)), expected)
+        np.testing.assert_array_equal(
+            get_wakuban_corrections(wakuban, tosu, kyori, np.array([code or '' for code in keibajo_codes])),
+            expected
+        )
+
+    def test_without_keibajo_code(self):
+        rows = [row[:3] for row in make_rows()]
+        wakuban, tosu, kyori = zip(*rows)
+        np.testing.assert_array_equal(
+            get_wakuban_corrections(wakuban, tosu, kyori),
+            [get_wakuban_correction(*row)[0] for row in rows]
+        )
+
+    def test_empty(self):
+        assert len(get_wakuban_corrections([], [], [], [])) == 0